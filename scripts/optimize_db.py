@@ -51,6 +51,13 @@ def optimize_database(db_path):
         # cursor.execute("VACUUM;") 
         # logger.info("VACUUM completed.")
 
+        # 6. Rebuild the external-content FTS index
+        # updates_fts is keyed on updates.rowid, which VACUUM may renumber
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'updates_fts'")
+        if cursor.fetchone():
+            cursor.execute("INSERT INTO updates_fts(updates_fts) VALUES('rebuild');")
+            logger.info("Rebuilt updates_fts full-text index.")
+
         conn.commit()
         conn.close()
         logger.info("Database optimization settings applied successfully.")
@@ -23,6 +23,8 @@ try:
 except ImportError:
     litellm = None
 
+from src.utils.config import ensure_env_loaded
+
 
 class GeminiClient:
     """LiteLLM 客户端（兼容旧 GeminiClient 调用名）"""
@@ -64,6 +66,7 @@ class GeminiClient:
 
         # 获取 API Key。DashScope/Gemini 默认分别读取 DASHSCOPE_API_KEY/GEMINI_API_KEY。
         self.api_key_env = config.get('api_key_env') or self._PROVIDER_API_KEY_ENV.get(self.provider)
+        ensure_env_loaded()
         api_key = os.getenv(self.api_key_env) if self.api_key_env else None
         
         if not api_key:
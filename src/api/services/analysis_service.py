@@ -325,11 +325,9 @@ class AnalysisService:
         Returns:
             (任务列表, 分页元数据) 元组
         """
-        # 1. 查询总数（简化版，直接用全部任务数）
-        # TODO: 如果需要按status过滤，需要在UpdateDataLayer添加count方法
         offset = (page - 1) * page_size
         
-        # 2. 查询当前页
+        # 1-2. 查询当前页（总数随结果行返回）
         rows = self.db.list_tasks_paginated(
             limit=page_size,
             offset=offset,
@@ -338,9 +336,23 @@ class AnalysisService:
         
         # 3. 处理任务数据
         items = []
+        total_rows = None
         for row in rows:
             task = dict(row)
-            task_result_raw = task.get('task_result', {})
+            # total_rows 为 COUNT OVER 窗口列，只用于分页元数据，不出现在返回项中
+            total_rows = task.pop('total_rows', total_rows)
+            
+            if 'task_result' not in task:
+                # 摘要行：filters 与计数字段已由 SQL 从 task_result 投影为独立列
+                task_result_raw = {
+                    'filters': task.pop('filters', None),
+                    'total_count': task.pop('total_count', 0),
+                    'completed_count': task.pop('completed_count', 0),
+                    'success_count': task.pop('success_count', 0),
+                    'fail_count': task.pop('fail_count', 0),
+                }
+            else:
+                task_result_raw = task.pop('task_result')
             
             # task_result 可能是 JSON 字符串，需要解析
             if isinstance(task_result_raw, str):
@@ -389,8 +401,14 @@ class AnalysisService:
             
             items.append(task)
         
-        # 4. 构建分页元数据（简化版）
-        total = len(rows)  # 实际应该查询真实总数
+        # 4. 构建分页元数据（total_rows 由 COUNT OVER 窗口随分页查询一并返回）
+        if rows:
+            total = total_rows if total_rows is not None else len(rows)
+        elif offset > 0:
+            # 页码越界时没有结果行携带窗口计数，单独查询总数
+            total = self.db.count_tasks(status=status)
+        else:
+            total = 0
         total_pages = (total + page_size - 1) // page_size if total > 0 else 0
         
         pagination = PaginationMeta(
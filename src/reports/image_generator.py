@@ -17,6 +17,8 @@ from urllib.parse import urljoin
 
 import requests
 
+from src.utils.config import ensure_env_loaded
+
 logger = logging.getLogger(__name__)
 
 
@@ -47,6 +49,7 @@ class ReportImageGenerator:
         poll_interval_seconds: int = DEFAULT_POLL_INTERVAL_SECONDS,
         session: Optional[requests.Session] = None,
     ):
+        ensure_env_loaded()
         self.base_url = (base_url or os.getenv("REPORT_IMAGE_API_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
         self.style_id = os.getenv("REPORT_IMAGE_STYLE_ID") or DEFAULT_STYLE_ID
         self.timeout_seconds = timeout_seconds
@@ -10,7 +10,7 @@ import os
 import sqlite3
 import logging
 import threading
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
@@ -31,6 +31,15 @@ def get_default_db_path() -> str:
     return os.path.join(base_dir, 'data', 'sqlite', 'updates.db')
 
 
+# updates_fts 全文索引覆盖的 updates 列
+_FTS_COLUMNS = 'title, title_translated, content, content_translated, content_summary'
+
+
+def _fts_values(alias: str) -> str:
+    """触发器中引用 NEW/OLD 行全文索引列的取值列表"""
+    return ', '.join(f'{alias}.{column}' for column in _FTS_COLUMNS.split(', '))
+
+
 class DatabaseManager:
     """
     数据库连接管理器（单例模式）
@@ -58,6 +67,7 @@ class DatabaseManager:
         self.logger = logging.getLogger(__name__)
         self.db_path = db_path or get_default_db_path()
         self.lock = threading.RLock()
+        self._tls = threading.local()
         
         # 确保数据库目录存在
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
@@ -126,6 +136,135 @@ class DatabaseManager:
                 CREATE INDEX IF NOT EXISTS idx_updates_vendor_product 
                 ON updates(vendor, product_name)
             ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_updates_channel_date 
+                ON updates(source_channel, publish_date DESC)
+            ''')
+            # has_analysis: 由 title_translated 推导的虚拟生成列（排除空串/单字符/占位值），
+            # 索引中保存写入时计算的结果，过滤时无需逐行做字符串判定
+            cursor.execute("PRAGMA table_xinfo(updates)")
+            update_columns = {row[1] for row in cursor.fetchall()}
+            if 'has_analysis' not in update_columns:
+                cursor.execute('''
+                    ALTER TABLE updates ADD COLUMN has_analysis INTEGER GENERATED ALWAYS AS (
+                        CASE WHEN title_translated IS NOT NULL
+                            AND title_translated != ''
+                            AND LENGTH(TRIM(title_translated)) >= 2
+                            AND title_translated NOT IN ('N/A', '暂无', 'None', 'null')
+                        THEN 1 ELSE 0 END
+                    ) VIRTUAL
+                ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_updates_has_analysis 
+                ON updates(has_analysis)
+            ''')
+            # 批量插入去重按 (vendor, source_channel, source_identifier) 查重
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_updates_vendor_channel_ident 
+                ON updates(vendor, source_channel, source_identifier)
+            ''')
+            
+            # ==================== updates_fts 全文索引 ====================
+            # trigram 分词支持中英文任意子串匹配（>=3 字符）；外部内容表（content='updates'），
+            # 文本只存一份，索引按 updates.rowid 对齐。VACUUM 可能改变无 INTEGER PRIMARY KEY 表的
+            # rowid，执行后需调用 rebuild_fts_index 重建
+            cursor.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'updates_fts'"
+            )
+            row = cursor.fetchone()
+            if row is not None and "content='updates'" not in row[0]:
+                # 旧版自带内容副本的独立 FTS 表：连同触发器一起删除后按外部内容表重建
+                for trigger in ('trg_updates_fts_insert', 'trg_updates_fts_update', 'trg_updates_fts_delete'):
+                    cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+                cursor.execute('DROP TABLE updates_fts')
+                row = None
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS updates_fts USING fts5(
+                    {_FTS_COLUMNS},
+                    content='updates', tokenize = 'trigram'
+                )
+            ''')
+            if row is None:
+                cursor.execute("INSERT INTO updates_fts(updates_fts) VALUES('rebuild')")
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_updates_fts_insert
+                AFTER INSERT ON updates
+                BEGIN
+                    INSERT INTO updates_fts(rowid, {_FTS_COLUMNS})
+                    VALUES (NEW.rowid, {_fts_values('NEW')});
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_updates_fts_update
+                AFTER UPDATE OF {_FTS_COLUMNS}
+                ON updates
+                BEGIN
+                    INSERT INTO updates_fts(updates_fts, rowid, {_FTS_COLUMNS})
+                    VALUES ('delete', OLD.rowid, {_fts_values('OLD')});
+                    INSERT INTO updates_fts(rowid, {_FTS_COLUMNS})
+                    VALUES (NEW.rowid, {_fts_values('NEW')});
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_updates_fts_delete
+                AFTER DELETE ON updates
+                BEGIN
+                    INSERT INTO updates_fts(updates_fts, rowid, {_FTS_COLUMNS})
+                    VALUES ('delete', OLD.rowid, {_fts_values('OLD')});
+                END
+            ''')
+            
+            # ==================== update_tags 标签表 ====================
+            # 由 updates.tags（JSON 数组）展开，供标签过滤做索引查找
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'update_tags'"
+            )
+            tags_exists = cursor.fetchone() is not None
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS update_tags (
+                    update_id TEXT NOT NULL,
+                    tag TEXT NOT NULL COLLATE NOCASE,
+                    PRIMARY KEY (update_id, tag)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_update_tags_tag 
+                ON update_tags(tag)
+            ''')
+            if not tags_exists:
+                cursor.execute('''
+                    INSERT OR IGNORE INTO update_tags(update_id, tag)
+                    SELECT u.update_id, j.value
+                    FROM updates u, json_each(u.tags) j
+                    WHERE json_valid(u.tags) AND j.type = 'text'
+                ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_update_tags_insert
+                AFTER INSERT ON updates
+                BEGIN
+                    DELETE FROM update_tags WHERE update_id = NEW.update_id;
+                    INSERT OR IGNORE INTO update_tags(update_id, tag)
+                    SELECT NEW.update_id, value FROM json_each(NEW.tags)
+                    WHERE json_valid(NEW.tags) AND type = 'text';
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_update_tags_update
+                AFTER UPDATE OF tags ON updates
+                BEGIN
+                    DELETE FROM update_tags WHERE update_id = OLD.update_id;
+                    INSERT OR IGNORE INTO update_tags(update_id, tag)
+                    SELECT NEW.update_id, value FROM json_each(NEW.tags)
+                    WHERE json_valid(NEW.tags) AND type = 'text';
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_update_tags_delete
+                AFTER DELETE ON updates
+                BEGIN
+                    DELETE FROM update_tags WHERE update_id = OLD.update_id;
+                END
+            ''')
             
             # ==================== analysis_tasks 表 ====================
             cursor.execute('''
@@ -159,6 +298,27 @@ class DatabaseManager:
                 CREATE INDEX IF NOT EXISTS idx_analysis_tasks_update_task 
                 ON analysis_tasks(update_id, task_name)
             ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_atasks_list 
+                ON analysis_tasks(task_name, task_status, created_at DESC)
+            ''')
+            
+            # is_done: 由 task_result 中的计数推导的虚拟生成列
+            cursor.execute("PRAGMA table_xinfo(analysis_tasks)")
+            task_columns = {row[1] for row in cursor.fetchall()}
+            if 'is_done' not in task_columns:
+                cursor.execute('''
+                    ALTER TABLE analysis_tasks ADD COLUMN is_done INTEGER GENERATED ALWAYS AS (
+                        CASE WHEN json_valid(task_result) THEN
+                            json_extract(task_result, '$.completed_count')
+                                >= json_extract(task_result, '$.total_count')
+                        END
+                    ) VIRTUAL
+                ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_atasks_done 
+                ON analysis_tasks(is_done, task_status)
+            ''')
             
             # ==================== quality_issues 表（新增）====================
             cursor.execute('''
@@ -268,6 +428,28 @@ class DatabaseManager:
                 CREATE INDEX IF NOT EXISTS idx_task_reports_type 
                 ON task_reports(task_type)
             ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_task_reports_type_date 
+                ON task_reports(task_type, task_date DESC, created_at DESC)
+            ''')
+            
+            # ==================== task_report_items 表（任务报告问题项）====================
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS task_report_items (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    report_id INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    vendor TEXT,
+                    title TEXT,
+                    update_id TEXT,
+                    reason TEXT,
+                    FOREIGN KEY (report_id) REFERENCES task_reports(id)
+                )
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_task_report_items_report_kind 
+                ON task_report_items(report_id, kind)
+            ''')
             
             # ==================== reports 表（周报/月报）====================
             cursor.execute('''
@@ -301,46 +483,90 @@ class DatabaseManager:
             
             conn.commit()
             
-            # 配置数据库参数
+            # journal_mode 持久化在数据库文件中，只需设置一次；连接级参数见 _configure_connection
             cursor.execute('PRAGMA journal_mode=WAL')
-            cursor.execute('PRAGMA synchronous=NORMAL')
-            cursor.execute('PRAGMA cache_size=-64000')  # 64MB缓存
-            cursor.execute('PRAGMA temp_store=MEMORY')
-            cursor.execute('PRAGMA mmap_size=2147483648') # 2GB mmap
-            cursor.execute('PRAGMA foreign_keys=ON')
+    
+    @staticmethod
+    def _configure_connection(conn: sqlite3.Connection):
+        """
+        为新建连接设置连接级参数
+        
+        journal_mode=WAL 持久化在数据库文件中，已在 _init_database 设置一次；
+        其余 PRAGMA 仅对当前连接生效，需在每个新连接上设置，
+        否则不同线程的连接行为不一致（如外键约束只在初始化线程上生效）。
+        """
+        conn.row_factory = sqlite3.Row  # 使结果可以通过列名访问
+        conn.execute('PRAGMA foreign_keys=ON')
+        conn.execute('PRAGMA mmap_size=2147483648')  # 2GB
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA cache_size=-64000')  # 64MB缓存
+        # INSERT OR REPLACE 删除旧行时同样触发 DELETE 触发器（全文索引/标签表依赖）
+        conn.execute('PRAGMA recursive_triggers=ON')
     
     @contextmanager
     def get_connection(self):
         """
         获取数据库连接的上下文管理器
         
+        每个线程复用一条长连接（避免反复打开 .db/.db-wal/.db-shm）。
+        同一线程内嵌套获取时返回同一连接，仅最外层退出时做收尾：
+        未提交的事务会被回滚，与原先关闭连接时的语义一致。
+        
         Yields:
             sqlite3.Connection: 数据库连接对象
         """
-        conn = None
+        tls = self._tls
+        conn = getattr(tls, 'conn', None)
+        if conn is None or tls.pid != os.getpid():
+            # fork 出的子进程不能沿用父进程的连接
+            conn = sqlite3.connect(self.db_path, timeout=30.0, cached_statements=256)
+            self._configure_connection(conn)
+            tls.conn = conn
+            tls.pid = os.getpid()
+            tls.depth = 0
+        
+        tls.depth += 1
         try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
-            conn.row_factory = sqlite3.Row  # 使结果可以通过列名访问
-            
-            # Apply performance optimizations for every connection
-            conn.execute('PRAGMA mmap_size=2147483648') # 2GB
-            conn.execute('PRAGMA temp_store=MEMORY')
-            conn.execute('PRAGMA synchronous=NORMAL')
-            
             yield conn
         except Exception as e:
-            if conn:
+            if tls.depth == 1:
                 conn.rollback()
-            self.logger.error(f"数据库操作失败: {e}")
+                self.logger.error(f"数据库操作失败: {e}")
             raise
         finally:
-            if conn:
-                conn.close()
+            tls.depth -= 1
+            if tls.depth == 0 and conn.in_transaction:
+                conn.rollback()
+    
+    def rebuild_fts_index(self):
+        """
+        按 updates 当前内容重建 updates_fts 全文索引
+        
+        VACUUM 改变 rowid、或外部连接在未开启 recursive_triggers 时执行
+        INSERT OR REPLACE 后，索引会与 updates 不一致，需调用本方法修复。
+        """
+        with self.get_connection() as conn:
+            conn.execute("INSERT INTO updates_fts(updates_fts) VALUES('rebuild')")
+            conn.commit()
+    
+    def close_connection(self):
+        """关闭当前线程的复用连接（关闭前执行 PRAGMA optimize 刷新查询规划统计）"""
+        conn = getattr(self._tls, 'conn', None)
+        if conn is not None:
+            self._tls.conn = None
+            try:
+                conn.execute('PRAGMA optimize')
+            except sqlite3.Error as e:
+                self.logger.debug(f"PRAGMA optimize 失败: {e}")
+            conn.close()
     
     @classmethod
     def reset_instance(cls):
         """重置单例实例（仅用于测试）"""
         with cls._lock:
+            if cls._instance is not None and cls._instance._initialized:
+                cls._instance.close_connection()
             cls._instance = None
 
 
@@ -376,3 +602,15 @@ class BaseRepository:
         """获取数据库连接"""
         with self._db_manager.get_connection() as conn:
             yield conn
+    
+    @staticmethod
+    def _fetch_dicts(cursor: sqlite3.Cursor) -> List[Dict[str, Any]]:
+        """
+        将已执行游标的剩余结果转换为字典列表
+        
+        列名只从 description 取一次，行以元组读出后 dict(zip(...))，
+        避免 dict(sqlite3.Row) 逐行重新解析列名。
+        """
+        columns = [column[0] for column in cursor.description]
+        cursor.row_factory = None
+        return [dict(zip(columns, row)) for row in cursor]
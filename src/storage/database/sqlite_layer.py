@@ -206,15 +206,23 @@ class UpdateDataLayer:
         """根据 task_id 获取任务记录"""
         return self._tasks.get_task_by_id(task_id)
     
+    def get_task_detail(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务完整记录（含 task_result 解析）"""
+        return self._tasks.get_task_detail(task_id)
+    
     def list_tasks_paginated(
         self, 
         limit: int = 20, 
         offset: int = 0,
         status: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """分页查询任务列表"""
+        """分页查询任务列表（摘要字段）"""
         return self._tasks.list_tasks_paginated(limit, offset, status)
     
+    def count_tasks(self, status: Optional[str] = None) -> int:
+        """统计任务数量"""
+        return self._tasks.count_tasks(status)
+    
     # ==================== Stats ====================
     
     def get_database_stats(self) -> Dict[str, Any]:
@@ -389,7 +397,9 @@ class UpdateDataLayer:
         Returns:
             任务结束时间（优先）或开始时间，ISO 格式字符串。如果没有记录返回 None。
         """
-        report = self._task_reports.get_latest_report(task_type="daily_crawl_analyze")
+        report = self._task_reports.get_latest_report(
+            task_type="daily_crawl_analyze", include_items=False
+        )
         if report:
             # 优先返回结束时间，如果没有结束时间（可能正在运行），则返回开始时间
             return report.get('end_time') or report.get('start_time')
@@ -135,14 +135,7 @@ class StatsRepository(BaseRepository):
                     SELECT 
                         vendor,
                         COUNT(*) as count,
-                        SUM(CASE 
-                            WHEN title_translated IS NOT NULL 
-                                AND title_translated != '' 
-                                AND LENGTH(TRIM(title_translated)) >= 2
-                                AND title_translated NOT IN ('N/A', '暂无', 'None', 'null')
-                            THEN 1 
-                            ELSE 0 
-                        END) as analyzed
+                        SUM(has_analysis) as analyzed
                     FROM updates
                     WHERE {where_clause}
                     GROUP BY vendor
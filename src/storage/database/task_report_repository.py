@@ -8,15 +8,31 @@
 import json
 import logging
 from datetime import datetime
-from typing import Dict, Any, List, Optional
-from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, Iterator, List, Optional
+from dataclasses import dataclass, field
 
 from src.storage.database.base import BaseRepository
 
 logger = logging.getLogger(__name__)
 
+_RECENT_REPORTS_SQL = '''
+    SELECT * FROM task_reports
+    WHERE task_type = ? AND task_date >= date('now', ?)
+    ORDER BY task_date DESC
+'''
 
-@dataclass
+_RECENT_REPORTS_SUMMARY_SQL = '''
+    SELECT
+        id, task_date, task_type, start_time, end_time, duration_seconds, status,
+        crawl_total, analyze_pending, analyze_success, analyze_failed,
+        marked_non_network, missing_subcategory, created_at
+    FROM task_reports
+    WHERE task_type = ? AND task_date >= date('now', ?)
+    ORDER BY task_date DESC
+'''
+
+
+@dataclass(slots=True)
 class IssueItem:
     """问题项"""
     vendor: str
@@ -25,7 +41,7 @@ class IssueItem:
     reason: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class TaskReport:
     """
     任务执行报告数据类
@@ -110,10 +126,20 @@ class TaskReport:
     
     def get_issue_details(self) -> Dict[str, Any]:
         """获取问题详情 JSON"""
+        # IssueItem 字段固定，直接构造字典，避免 asdict 的逐字段深拷贝
         return {
-            "non_network": [asdict(item) for item in self.non_network_items],
-            "missing_subcategory": [asdict(item) for item in self.missing_subcat_items],
-            "failed": [asdict(item) for item in self.failed_items]
+            "non_network": [
+                {"vendor": it.vendor, "title": it.title, "update_id": it.update_id, "reason": it.reason}
+                for it in self.non_network_items
+            ],
+            "missing_subcategory": [
+                {"vendor": it.vendor, "title": it.title, "update_id": it.update_id, "reason": it.reason}
+                for it in self.missing_subcat_items
+            ],
+            "failed": [
+                {"vendor": it.vendor, "title": it.title, "update_id": it.update_id, "reason": it.reason}
+                for it in self.failed_items
+            ]
         }
 
 
@@ -124,6 +150,9 @@ class TaskReportRepository(BaseRepository):
         """
         保存任务报告
         
+        问题项写入 task_report_items 子表（与主记录同一事务），
+        不再序列化为 issue_details 大字段。
+        
         Args:
             report: TaskReport 对象
             
@@ -139,8 +168,9 @@ class TaskReportRepository(BaseRepository):
                         task_date, task_type, start_time, end_time, duration_seconds,
                         status, crawl_stats, crawl_total, analyze_pending, analyze_success,
                         analyze_failed, marked_non_network, missing_subcategory,
-                        issue_details, report_content
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        report_content
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    RETURNING id, created_at
                 ''', (
                     report.task_date,
                     report.task_type,
@@ -155,24 +185,120 @@ class TaskReportRepository(BaseRepository):
                     report.analyze_failed,
                     report.marked_non_network,
                     report.missing_subcategory,
-                    json.dumps(report.get_issue_details(), ensure_ascii=False),
                     report.report_content
                 ))
                 
+                # RETURNING 的结果需在提交前取出
+                report_id = cursor.fetchone()['id']
+                
+                item_rows = [
+                    (report_id, kind, it.vendor, it.title, it.update_id, it.reason)
+                    for kind, items in (
+                        ('non_network', report.non_network_items),
+                        ('missing_subcategory', report.missing_subcat_items),
+                        ('failed', report.failed_items),
+                    )
+                    for it in items
+                ]
+                if item_rows:
+                    cursor.executemany('''
+                        INSERT INTO task_report_items (
+                            report_id, kind, vendor, title, update_id, reason
+                        ) VALUES (?, ?, ?, ?, ?, ?)
+                    ''', item_rows)
+                
                 conn.commit()
-                return cursor.lastrowid
+                return report_id
                 
         except Exception as e:
             self.logger.error(f"保存任务报告失败: {e}")
             raise
     
-    def get_report_by_date(self, task_date: str, task_type: str = "daily_crawl_analyze") -> Optional[Dict[str, Any]]:
+    def get_report_items(
+        self,
+        report_id: int,
+        kind: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        分页获取报告问题项
+        
+        Args:
+            report_id: 报告 ID
+            kind: 问题类型（non_network/missing_subcategory/failed），None 表示全部
+            limit: 每页数量
+            offset: 偏移量
+            
+        Returns:
+            问题项列表
+        """
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                
+                if kind:
+                    cursor.execute('''
+                        SELECT kind, vendor, title, update_id, reason FROM task_report_items
+                        WHERE report_id = ? AND kind = ?
+                        ORDER BY id
+                        LIMIT ? OFFSET ?
+                    ''', (report_id, kind, limit, offset))
+                else:
+                    cursor.execute('''
+                        SELECT kind, vendor, title, update_id, reason FROM task_report_items
+                        WHERE report_id = ?
+                        ORDER BY id
+                        LIMIT ? OFFSET ?
+                    ''', (report_id, limit, offset))
+                
+                return [dict(row) for row in cursor.fetchall()]
+                
+        except Exception as e:
+            self.logger.error(f"获取报告问题项失败: {e}")
+            return []
+    
+    def _row_to_report(self, cursor, row, include_items: bool) -> Dict[str, Any]:
+        """将 task_reports 行转换为报告字典，按需加载问题详情"""
+        result = dict(row)
+        if result.get('crawl_stats'):
+            result['crawl_stats'] = json.loads(result['crawl_stats'])
+        
+        legacy_details = result.pop('issue_details', None)
+        if include_items:
+            if legacy_details:
+                # 旧记录：问题详情仍保存在 issue_details 字段中
+                result['issue_details'] = json.loads(legacy_details)
+            else:
+                details = {'non_network': [], 'missing_subcategory': [], 'failed': []}
+                cursor.execute('''
+                    SELECT kind, vendor, title, update_id, reason FROM task_report_items
+                    WHERE report_id = ?
+                    ORDER BY id
+                ''', (result['id'],))
+                for item in cursor.fetchall():
+                    details.setdefault(item['kind'], []).append({
+                        'vendor': item['vendor'],
+                        'title': item['title'],
+                        'update_id': item['update_id'],
+                        'reason': item['reason'],
+                    })
+                result['issue_details'] = details
+        return result
+    
+    def get_report_by_date(
+        self,
+        task_date: str,
+        task_type: str = "daily_crawl_analyze",
+        include_items: bool = True
+    ) -> Optional[Dict[str, Any]]:
         """
         按日期获取报告
         
         Args:
             task_date: 日期字符串 YYYY-MM-DD
             task_type: 任务类型
+            include_items: 是否加载 issue_details 问题详情（仅需摘要时传 False）
             
         Returns:
             报告数据字典
@@ -190,60 +316,88 @@ class TaskReportRepository(BaseRepository):
                 
                 row = cursor.fetchone()
                 if row:
-                    result = dict(row)
-                    if result.get('crawl_stats'):
-                        result['crawl_stats'] = json.loads(result['crawl_stats'])
-                    if result.get('issue_details'):
-                        result['issue_details'] = json.loads(result['issue_details'])
-                    return result
+                    return self._row_to_report(cursor, row, include_items)
                 return None
                 
         except Exception as e:
             self.logger.error(f"获取任务报告失败: {e}")
             return None
     
-    def get_recent_reports(self, days: int = 7, task_type: str = "daily_crawl_analyze") -> List[Dict[str, Any]]:
+    def iter_recent_reports(
+        self,
+        days: int = 7,
+        task_type: str = "daily_crawl_analyze",
+        summary_only: bool = False,
+        include_items: bool = True
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        流式获取最近的报告（生成器，按 fetchmany 分批读取）
+        
+        Args:
+            days: 天数
+            task_type: 任务类型
+            summary_only: 仅返回数值/时间等摘要列，不读取 crawl_stats、report_content
+            include_items: 是否加载 issue_details 问题详情（仅需摘要时传 False；summary_only 时忽略）
+            
+        Yields:
+            报告字典
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.arraysize = 256
+            cursor.execute(
+                _RECENT_REPORTS_SUMMARY_SQL if summary_only else _RECENT_REPORTS_SQL,
+                (task_type, f'-{days} days')
+            )
+            
+            # 问题项查询使用独立游标，避免打断主查询的分批读取
+            item_cursor = conn.cursor() if include_items and not summary_only else None
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                for row in rows:
+                    if summary_only:
+                        yield dict(row)
+                    else:
+                        yield self._row_to_report(item_cursor, row, include_items)
+    
+    def get_recent_reports(
+        self,
+        days: int = 7,
+        task_type: str = "daily_crawl_analyze",
+        include_items: bool = True,
+        summary_only: bool = False
+    ) -> List[Dict[str, Any]]:
         """
         获取最近的报告列表
         
         Args:
             days: 天数
             task_type: 任务类型
+            include_items: 是否加载 issue_details 问题详情（仅需摘要时传 False）
+            summary_only: 仅返回摘要列
             
         Returns:
             报告列表
         """
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    SELECT * FROM task_reports
-                    WHERE task_type = ? AND task_date >= date('now', ?)
-                    ORDER BY task_date DESC
-                ''', (task_type, f'-{days} days'))
-                
-                results = []
-                for row in cursor.fetchall():
-                    result = dict(row)
-                    if result.get('crawl_stats'):
-                        result['crawl_stats'] = json.loads(result['crawl_stats'])
-                    if result.get('issue_details'):
-                        result['issue_details'] = json.loads(result['issue_details'])
-                    results.append(result)
-                
-                return results
-                
+            return list(self.iter_recent_reports(days, task_type, summary_only, include_items))
         except Exception as e:
             self.logger.error(f"获取报告列表失败: {e}")
             return []
 
-    def get_latest_report(self, task_type: str = "daily_crawl_analyze") -> Optional[Dict[str, Any]]:
+    def get_latest_report(
+        self,
+        task_type: str = "daily_crawl_analyze",
+        include_items: bool = True
+    ) -> Optional[Dict[str, Any]]:
         """
         获取最新的任务报告
         
         Args:
             task_type: 任务类型
+            include_items: 是否加载 issue_details 问题详情（仅需摘要时传 False）
             
         Returns:
             最新的报告字典，无记录返回 None
@@ -261,12 +415,7 @@ class TaskReportRepository(BaseRepository):
                 
                 row = cursor.fetchone()
                 if row:
-                    result = dict(row)
-                    if result.get('crawl_stats'):
-                        result['crawl_stats'] = json.loads(result['crawl_stats'])
-                    if result.get('issue_details'):
-                        result['issue_details'] = json.loads(result['issue_details'])
-                    return result
+                    return self._row_to_report(cursor, row, include_items)
                 return None
                 
         except Exception as e:
@@ -7,12 +7,113 @@ Tasks Repository - 批量分析任务管理
 """
 
 import json
-from datetime import datetime
 from typing import Dict, List, Any, Optional
 
 from src.storage.database.base import BaseRepository
 
 
+def _build_status_update_sql(has_progress: bool, has_error: bool, is_terminal: bool) -> str:
+    """生成 update_task_status 的 UPDATE 语句"""
+    fields = ['task_status = ?']
+    if has_progress:
+        fields.append('task_result = ?')
+    if has_error:
+        fields.append('error_message = ?')
+    if is_terminal:
+        # 完成时间由 SQLite 生成，与 increment_task_progress 自动完成时的格式一致
+        fields.append("completed_at = strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')")
+    return f"UPDATE analysis_tasks SET {', '.join(fields)} WHERE task_id = ?"
+
+
+# 预生成的 UPDATE 语句，键为 (has_progress, has_error, is_terminal)
+# SQL 文本固定，sqlite3 语句缓存可直接复用已编译的语句
+_STATUS_UPDATE_SQL = {
+    (p, e, t): _build_status_update_sql(p, e, t)
+    for p in (False, True)
+    for e in (False, True)
+    for t in (False, True)
+}
+
+# 本次递增后已处理数达到总数（SET 中各表达式读取的都是更新前的行）
+_INCREMENT_REACHES_TOTAL = (
+    "COALESCE(json_extract(task_result, '$.completed_count'), 0) + 1 "
+    ">= json_extract(task_result, '$.total_count')"
+)
+
+# increment_task_progress 共用的状态更新：达到总数时标记完成并记录完成时间，否则 queued -> running；
+# 自动完成只发生在递增路径上，update_task_status 写入的进度不会改变任务状态
+_INCREMENT_STATUS_SQL = f'''
+        task_status = CASE
+            WHEN {_INCREMENT_REACHES_TOTAL} THEN 'completed'
+            WHEN task_status = 'queued' THEN 'running'
+            ELSE task_status
+        END,
+        completed_at = CASE
+            WHEN {_INCREMENT_REACHES_TOTAL} THEN strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')
+            ELSE completed_at
+        END
+    WHERE task_id = ?
+'''
+
+# increment_task_progress 的单条 UPDATE：计数在 SQLite 内用 json_set 累加，状态见 _INCREMENT_STATUS_SQL
+_INCREMENT_PROGRESS_SQL = '''
+    UPDATE analysis_tasks SET
+        task_result = json_set(
+            task_result,
+            '$.completed_count', COALESCE(json_extract(task_result, '$.completed_count'), 0) + 1,
+            '$.success_count', COALESCE(json_extract(task_result, '$.success_count'), 0) + ?,
+            '$.fail_count', COALESCE(json_extract(task_result, '$.fail_count'), 0) + ?
+        ),''' + _INCREMENT_STATUS_SQL
+
+# 同上，并追加错误消息（errors 仅保留最近 100 条）
+_INCREMENT_PROGRESS_WITH_ERROR_SQL = '''
+    UPDATE analysis_tasks SET
+        task_result = json_set(
+            task_result,
+            '$.completed_count', COALESCE(json_extract(task_result, '$.completed_count'), 0) + 1,
+            '$.success_count', COALESCE(json_extract(task_result, '$.success_count'), 0) + ?,
+            '$.fail_count', COALESCE(json_extract(task_result, '$.fail_count'), 0) + ?,
+            '$.errors', json_insert(
+                CASE
+                    WHEN json_array_length(COALESCE(json_extract(task_result, '$.errors'), '[]')) >= 100
+                    THEN json_remove(json_extract(task_result, '$.errors'), '$[0]')
+                    ELSE COALESCE(json_extract(task_result, '$.errors'), '[]')
+                END,
+                '$[#]', ?
+            )
+        ),''' + _INCREMENT_STATUS_SQL
+
+_LIST_TASKS_COLUMNS = '''
+    SELECT
+        task_id, task_status, error_message,
+        started_at, completed_at, created_at,
+        json_extract(task_result, '$.filters') AS filters,
+        COALESCE(json_extract(task_result, '$.total_count'), 0) AS total_count,
+        COALESCE(json_extract(task_result, '$.completed_count'), 0) AS completed_count,
+        COALESCE(json_extract(task_result, '$.success_count'), 0) AS success_count,
+        COALESCE(json_extract(task_result, '$.fail_count'), 0) AS fail_count,
+        COUNT(*) OVER () AS total_rows
+    FROM analysis_tasks
+'''
+
+# 任务列表与计数共用的过滤条件
+# 状态过滤使用两条固定语句，而非 "(? IS NULL OR task_status = ?)" 形式：
+# 后者会让 SQLite 放弃 idx_atasks_list 并对 created_at 额外排序
+_LIST_TASKS_WHERE = "    WHERE task_name = 'batch_analysis'"
+_LIST_TASKS_BY_STATUS_WHERE = _LIST_TASKS_WHERE + " AND task_status = ?"
+
+_LIST_TASKS_PAGE = '''
+    ORDER BY created_at DESC
+    LIMIT ? OFFSET ?
+'''
+
+_LIST_TASKS_SQL = _LIST_TASKS_COLUMNS + _LIST_TASKS_WHERE + _LIST_TASKS_PAGE
+_LIST_TASKS_BY_STATUS_SQL = _LIST_TASKS_COLUMNS + _LIST_TASKS_BY_STATUS_WHERE + _LIST_TASKS_PAGE
+
+_COUNT_TASKS_SQL = "SELECT COUNT(*) FROM analysis_tasks\n" + _LIST_TASKS_WHERE
+_COUNT_TASKS_BY_STATUS_SQL = "SELECT COUNT(*) FROM analysis_tasks\n" + _LIST_TASKS_BY_STATUS_WHERE
+
+
 class TasksRepository(BaseRepository):
     """批量分析任务管理"""
     
@@ -88,24 +189,18 @@ class TasksRepository(BaseRepository):
                 with self._get_connection() as conn:
                     cursor = conn.cursor()
                     
-                    update_fields = ['task_status = ?']
                     params = [status]
                     
                     if progress:
-                        update_fields.append('task_result = ?')
                         params.append(json.dumps(progress))
                     
                     if error:
-                        update_fields.append('error_message = ?')
                         params.append(error)
                     
-                    if status in ['completed', 'failed']:
-                        update_fields.append('completed_at = ?')
-                        params.append(datetime.now().isoformat())
-                    
+                    is_terminal = status in ('completed', 'failed')
                     params.append(task_id)
                     
-                    sql = f"UPDATE analysis_tasks SET {', '.join(update_fields)} WHERE task_id = ?"
+                    sql = _STATUS_UPDATE_SQL[(bool(progress), bool(error), is_terminal)]
                     cursor.execute(sql, params)
                     conn.commit()
                     
@@ -133,63 +228,32 @@ class TasksRepository(BaseRepository):
             成功返回 True
         """
         try:
+            success_inc = 1 if success else 0
             with self.lock:
                 with self._get_connection() as conn:
                     cursor = conn.cursor()
                     
-                    # 获取当前进度
-                    cursor.execute(
-                        'SELECT task_result, task_status FROM analysis_tasks WHERE task_id = ?',
-                        (task_id,)
-                    )
-                    row = cursor.fetchone()
-                    if not row:
-                        return False
-                    
-                    result = json.loads(row['task_result'])
-                    result['completed_count'] = result.get('completed_count', 0) + 1
-                    
-                    if success:
-                        result['success_count'] = result.get('success_count', 0) + 1
-                    else:
-                        result['fail_count'] = result.get('fail_count', 0) + 1
-                        if error_msg:
-                            errors = result.get('errors', [])
-                            errors.append(error_msg)
-                            result['errors'] = errors[-100:]  # 保留最近 100 条错误
-                    
-                    # 判断是否完成
-                    if result['completed_count'] >= result['total_count']:
-                        status = 'completed'
-                        completed_at = datetime.now().isoformat()
+                    if not success and error_msg:
                         cursor.execute(
-                            'UPDATE analysis_tasks SET task_status = ?, task_result = ?, completed_at = ? WHERE task_id = ?',
-                            (status, json.dumps(result), completed_at, task_id)
+                            _INCREMENT_PROGRESS_WITH_ERROR_SQL,
+                            (success_inc, 1 - success_inc, error_msg, task_id)
                         )
                     else:
-                        # 更新为 running 状态
-                        current_status = row['task_status']
-                        if current_status == 'queued':
-                            cursor.execute(
-                                'UPDATE analysis_tasks SET task_status = ?, task_result = ? WHERE task_id = ?',
-                                ('running', json.dumps(result), task_id)
-                            )
-                        else:
-                            cursor.execute(
-                                'UPDATE analysis_tasks SET task_result = ? WHERE task_id = ?',
-                                (json.dumps(result), task_id)
-                            )
+                        cursor.execute(
+                            _INCREMENT_PROGRESS_SQL,
+                            (success_inc, 1 - success_inc, task_id)
+                        )
                     
                     conn.commit()
-                    return True
+                    return cursor.rowcount > 0
                     
         except Exception as e:
             self.logger.error(f"更新任务进度失败: {e}")
             return False
     
-    def get_task_by_id(self, task_id: str) -> Optional[Dict[str, Any]]:
+    def get_task_detail(self, task_id: str) -> Optional[Dict[str, Any]]:
         """
-        根据 task_id 获取任务记录
+        获取任务完整记录（含 task_result JSON 解析）
         
         Args:
             task_id: 任务 ID
@@ -215,6 +279,18 @@ class TasksRepository(BaseRepository):
             self.logger.error(f"获取任务记录失败: {e}")
             return None
     
+    def get_task_by_id(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        根据 task_id 获取任务记录（兼容旧接口，等同于 get_task_detail）
+        
+        Args:
+            task_id: 任务 ID
+            
+        Returns:
+            任务数据字典，不存在返回 None
+        """
+        return self.get_task_detail(task_id)
+    
     def list_tasks_paginated(
         self, 
         limit: int = 20, 
@@ -224,45 +300,54 @@ class TasksRepository(BaseRepository):
         """
         分页查询任务列表（按创建时间倒序）
         
+        只投影列表页需要的摘要字段，计数字段由 SQLite json_extract 直接取出，
+        不在 Python 侧解析 task_result；total_rows 为过滤后的总行数（COUNT OVER 窗口），
+        与分页查询合并为一次往返。完整记录请使用 get_task_detail。
+        
         Args:
             limit: 每页数量
             offset: 偏移量
             status: 状态过滤（可选：queued/running/completed/failed）
             
         Returns:
-            任务列表
+            任务摘要列表
         """
         try:
             with self._get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # 构建 SQL
-                where_clauses = ["task_name = 'batch_analysis'"]
-                params = []
-                
                 if status:
-                    where_clauses.append("task_status = ?")
-                    params.append(status)
+                    cursor.execute(_LIST_TASKS_BY_STATUS_SQL, (status, limit, offset))
+                else:
+                    cursor.execute(_LIST_TASKS_SQL, (limit, offset))
                 
-                where_clause = " AND ".join(where_clauses)
-                params.extend([limit, offset])
+                return [dict(row) for row in cursor.fetchall()]
                 
-                cursor.execute(f'''
-                    SELECT * FROM analysis_tasks
-                    WHERE {where_clause}
-                    ORDER BY created_at DESC
-                    LIMIT ? OFFSET ?
-                ''', params)
+        except Exception as e:
+            self.logger.error(f"查询任务列表失败: {e}")
+            return []
+    
+    def count_tasks(self, status: Optional[str] = None) -> int:
+        """
+        统计任务数量（与 list_tasks_paginated 使用相同的过滤条件）
+        
+        Args:
+            status: 状态过滤（可选）
+            
+        Returns:
+            任务数量
+        """
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
                 
-                tasks = []
-                for row in cursor.fetchall():
-                    task = dict(row)
-                    if task.get('task_result'):
-                        task['task_result'] = json.loads(task['task_result'])
-                    tasks.append(task)
+                if status:
+                    cursor.execute(_COUNT_TASKS_BY_STATUS_SQL, (status,))
+                else:
+                    cursor.execute(_COUNT_TASKS_SQL)
                 
-                return tasks
+                return cursor.fetchone()[0]
                 
         except Exception as e:
-            self.logger.error(f"查询任务列表失败: {e}")
-            return []
+            self.logger.error(f"统计任务数量失败: {e}")
+            return 0
@@ -6,17 +6,129 @@ Updates 表 Repository - CRUD 操作
 提供 updates 表的增删改查基础操作。
 """
 
+import operator
 import sqlite3
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Callable, Dict, List, Any, Optional, Tuple
 
 from src.storage.database.base import BaseRepository
 
 
+# insert_update / batch_insert_updates 共用的写入列（按 SQL 中的顺序）
+_INSERT_FIELDS = (
+    'update_id', 'vendor', 'source_channel', 'update_type', 'source_url', 'source_identifier',
+    'title', 'title_translated', 'description', 'content', 'content_translated', 'content_summary',
+    'publish_date', 'crawl_time', 'product_name', 'product_category', 'product_subcategory',
+    'priority', 'tags', 'raw_filepath', 'analysis_filepath', 'file_hash', 'metadata_json',
+)
+
+# 缺省值：未提供的字段为 NULL
+_INSERT_DEFAULTS = dict.fromkeys(_INSERT_FIELDS)
+_INSERT_DEFAULTS.update(source_channel='unknown', source_identifier='')
+
+# 通用路径：与 _INSERT_DEFAULTS 合并后一次 C 层调用取出整行参数元组
+_GET_INSERT_PARAMS = operator.itemgetter(*_INSERT_FIELDS)
+
+# 按输入字典键序生成的参数构建函数：同一爬虫产出的记录键集合固定，
+# 生成的函数直接按下标取已有键、缺省值内联为常量，省去逐行合并缺省字典
+_PARAM_BUILDERS: Dict[Tuple[str, ...], Callable[[Dict[str, Any]], tuple]] = {}
+_MAX_PARAM_BUILDERS = 64
+
+
+def _build_params_generic(update_data: Dict[str, Any]) -> tuple:
+    return _GET_INSERT_PARAMS({**_INSERT_DEFAULTS, **update_data})
+
+
+def _param_builder(keys: Tuple[str, ...]) -> Callable[[Dict[str, Any]], tuple]:
+    """获取（必要时生成）给定键序的参数构建函数，单条与批量插入共用"""
+    builder = _PARAM_BUILDERS.get(keys)
+    if builder is None:
+        if len(_PARAM_BUILDERS) >= _MAX_PARAM_BUILDERS:
+            return _build_params_generic
+        present = set(keys)
+        items = ', '.join(
+            f"d[{field!r}]" if field in present else repr(_INSERT_DEFAULTS[field])
+            for field in _INSERT_FIELDS
+        )
+        namespace: Dict[str, Any] = {}
+        exec(f"def build(d):\n    return ({items},)", namespace)
+        builder = _PARAM_BUILDERS[keys] = namespace['build']
+    return builder
+
+
+# trigram 分词的最短可检索长度
+_FTS_MIN_KEYWORD_LENGTH = 3
+
+_REQUIRED_FIELDS = ('update_id', 'vendor', 'source_channel', 'source_url', 'title', 'publish_date')
+_URL_PREFIXES = ('http://', 'https://')
+
+
+def _validate_update_data(
+    update_data: Dict[str, Any],
+    _required: Tuple[str, ...] = _REQUIRED_FIELDS,
+    _prefixes: Tuple[str, ...] = _URL_PREFIXES,
+) -> tuple:
+    """
+    校验 Update 数据（批量路径逐行调用，常量通过默认参数绑定为局部变量）
+    
+    Returns:
+        (is_valid, error_message)
+    """
+    get = update_data.get
+    
+    # 必填字段校验
+    for field in _required:
+        value = get(field)
+        if not value or (type(value) is str and not value.strip()):
+            return False, f"必填字段 {field} 为空"
+    
+    # URL 格式校验
+    source_url = get('source_url')
+    if not source_url.startswith(_prefixes):
+        return False, f"source_url 格式无效 - {source_url}"
+    
+    return True, None
+
+
+def _validate_updates_batch(
+    rows: List[Dict[str, Any]],
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    批量校验 Update 数据，一次遍历拆分为合法记录与错误信息
+    
+    Returns:
+        (合法记录列表, 错误信息列表)
+    """
+    valid: List[Dict[str, Any]] = []
+    errors: List[str] = []
+    append_valid = valid.append
+    append_error = errors.append
+    validate = _validate_update_data
+    for row in rows:
+        is_valid, error_msg = validate(row)
+        if is_valid:
+            append_valid(row)
+        else:
+            append_error(error_msg)
+    return valid, errors
+
+
+def _insert_sql(verb: str, fields: Tuple[str, ...] = _INSERT_FIELDS) -> str:
+    return (
+        f"{verb} INTO updates ({', '.join(fields)}) "
+        f"VALUES ({', '.join('?' * len(fields))})"
+    )
+
+
+_INSERT_SQL = _insert_sql('INSERT')
+_INSERT_OR_IGNORE_SQL = _insert_sql('INSERT OR IGNORE')
+_INSERT_OR_REPLACE_SQL = _insert_sql('INSERT OR REPLACE')
+
+
 class UpdatesRepository(BaseRepository):
     """Updates 表 CRUD 操作"""
     
     # 必填字段列表
-    REQUIRED_FIELDS = ['update_id', 'vendor', 'source_channel', 'source_url', 'title', 'publish_date']
+    REQUIRED_FIELDS = list(_REQUIRED_FIELDS)
     
     def _validate_update_data(self, update_data: Dict[str, Any]) -> tuple:
         """
@@ -25,18 +137,7 @@ class UpdatesRepository(BaseRepository):
         Returns:
             (is_valid, error_message)
         """
-        # 必填字段校验
-        for field in self.REQUIRED_FIELDS:
-            value = update_data.get(field)
-            if not value or (isinstance(value, str) and not value.strip()):
-                return False, f"必填字段 {field} 为空"
-        
-        # URL 格式校验
-        source_url = update_data.get('source_url', '')
-        if not source_url.startswith(('http://', 'https://')):
-            return False, f"source_url 格式无效 - {source_url}"
-        
-        return True, None
+        return _validate_update_data(update_data)
     
     def insert_update(self, update_data: Dict[str, Any]) -> bool:
         """
@@ -59,38 +160,10 @@ class UpdatesRepository(BaseRepository):
                 with self._get_connection() as conn:
                     cursor = conn.cursor()
                     
-                    cursor.execute('''
-                        INSERT INTO updates (
-                            update_id, vendor, source_channel, update_type, source_url, source_identifier,
-                            title, title_translated, description, content, content_translated, content_summary, 
-                            publish_date, crawl_time, product_name, product_category, product_subcategory, 
-                            priority, tags, raw_filepath, analysis_filepath, file_hash, metadata_json
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        update_data.get('update_id'),
-                        update_data.get('vendor'),
-                        update_data.get('source_channel', 'unknown'),
-                        update_data.get('update_type'),
-                        update_data.get('source_url'),
-                        update_data.get('source_identifier', ''),
-                        update_data.get('title'),
-                        update_data.get('title_translated'),
-                        update_data.get('description'),
-                        update_data.get('content'),
-                        update_data.get('content_translated'),
-                        update_data.get('content_summary'),
-                        update_data.get('publish_date'),
-                        update_data.get('crawl_time'),
-                        update_data.get('product_name'),
-                        update_data.get('product_category'),
-                        update_data.get('product_subcategory'),
-                        update_data.get('priority'),
-                        update_data.get('tags'),
-                        update_data.get('raw_filepath'),
-                        update_data.get('analysis_filepath'),
-                        update_data.get('file_hash'),
-                        update_data.get('metadata_json')
-                    ))
+                    cursor.execute(
+                        _INSERT_SQL,
+                        _param_builder(tuple(update_data))(update_data)
+                    )
                     
                     conn.commit()
                     self.logger.debug(f"插入 Update 记录: {update_data.get('update_id')}")
@@ -153,103 +226,78 @@ class UpdatesRepository(BaseRepository):
         if not updates_data:
             return (0, 0)
         
-        success_count = 0
         fail_count = 0
+        params_list = []
         
         try:
             with self.lock:
                 with self._get_connection() as conn:
                     cursor = conn.cursor()
                     
-                    for update_data in updates_data:
-                        try:
-                            # 数据校验
-                            is_valid, error_msg = self._validate_update_data(update_data)
-                            if not is_valid:
-                                self.logger.error(f"批量插入跳过: {error_msg}")
-                                fail_count += 1
-                                continue
-
-                            if (
-                                not force_update
-                                and update_data.get('source_identifier')
-                                and update_data.get('vendor')
-                                and update_data.get('source_channel')
-                                and self.check_update_exists(
-                                    update_data.get('source_url', ''),
-                                    update_data.get('source_identifier', ''),
-                                    vendor=update_data.get('vendor'),
-                                    source_channel=update_data.get('source_channel'),
-                                )
-                            ):
+                    # 1. 校验：整批一次完成，再对合法记录去重并产出参数元组列表
+                    valid_rows, errors = _validate_updates_batch(updates_data)
+                    for error_msg in errors:
+                        self.logger.error(f"批量插入跳过: {error_msg}")
+                    fail_count += len(errors)
+                    
+                    for update_data in valid_rows:
+                        if (
+                            not force_update
+                            and update_data.get('source_identifier')
+                            and update_data.get('vendor')
+                            and update_data.get('source_channel')
+                        ):
+                            cursor.execute('''
+                                SELECT 1 FROM updates
+                                WHERE vendor = ? AND source_channel = ? AND source_identifier = ?
+                                LIMIT 1
+                            ''', (
+                                update_data['vendor'],
+                                update_data['source_channel'],
+                                update_data['source_identifier'],
+                            ))
+                            if cursor.fetchone() is not None:
                                 fail_count += 1
                                 self.logger.warning(
                                     f"插入跳过(已存在identifier): {update_data.get('vendor')}/"
                                     f"{update_data.get('source_channel')}/{update_data.get('source_identifier')}"
                                 )
                                 continue
-                            
-                            self.logger.debug(
-                                f"插入数据: update_id={update_data.get('update_id')}, "
-                                f"vendor={update_data.get('vendor')}, "
-                                f"source_channel={update_data.get('source_channel')}"
-                            )
-                            
-                            # 根据 force_update 决定使用 IGNORE 还是 REPLACE
-                            sql_prefix = 'INSERT OR REPLACE' if force_update else 'INSERT OR IGNORE'
-                            cursor.execute(f'''
-                                {sql_prefix} INTO updates (
-                                    update_id, vendor, source_channel, update_type, source_url, source_identifier,
-                                    title, title_translated, content, content_translated, content_summary, 
-                                    publish_date, crawl_time, product_name, product_category, product_subcategory, 
-                                    priority, tags, raw_filepath, analysis_filepath, file_hash, metadata_json
-                                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            ''', (
-                                update_data.get('update_id'),
-                                update_data.get('vendor'),
-                                update_data.get('source_channel', 'unknown'),
-                                update_data.get('update_type'),
-                                update_data.get('source_url'),
-                                update_data.get('source_identifier', ''),
-                                update_data.get('title'),
-                                update_data.get('title_translated'),
-                                update_data.get('content'),
-                                update_data.get('content_translated'),
-                                update_data.get('content_summary'),
-                                update_data.get('publish_date'),
-                                update_data.get('crawl_time'),
-                                update_data.get('product_name'),
-                                update_data.get('product_category'),
-                                update_data.get('product_subcategory'),
-                                update_data.get('priority'),
-                                update_data.get('tags'),
-                                update_data.get('raw_filepath'),
-                                update_data.get('analysis_filepath'),
-                                update_data.get('file_hash'),
-                                update_data.get('metadata_json')
-                            ))
-                            
-                            if cursor.rowcount > 0:
-                                success_count += 1
-                            else:
-                                fail_count += 1
-                                self.logger.warning(
-                                    f"插入失败(rowcount=0): {update_data.get('source_url')}"
-                                )
-                                
-                        except Exception as e:
-                            self.logger.error(
-                                f"批量插入单条记录失败: {e}, "
-                                f"数据: {update_data.get('source_url')}"
-                            )
-                            fail_count += 1
+                        
+                        params_list.append(_param_builder(tuple(update_data))(update_data))
                     
+                    if not params_list:
+                        return (0, fail_count)
+                    
+                    # 2. 单个事务内 executemany，复用同一条预编译语句
+                    # 根据 force_update 决定使用 IGNORE 还是 REPLACE
+                    sql = _INSERT_OR_REPLACE_SQL if force_update else _INSERT_OR_IGNORE_SQL
+                    try:
+                        cursor.executemany(sql, params_list)
+                        # executemany 的 rowcount 为整批写入行数，被 IGNORE 的重复记录不计入，
+                        # 也不含触发器（全文索引/标签）产生的写入；total_changes() 差值会包含后者
+                        success_count = cursor.rowcount
+                    except sqlite3.Error as e:
+                        # 个别记录无法写入（如字段值类型无法绑定）时回滚整批，
+                        # 改为逐条写入，只让出错的记录计入失败
+                        conn.rollback()
+                        self.logger.warning(f"批量写入失败，改为逐条写入: {e}")
+                        success_count = 0
+                        for params in params_list:
+                            try:
+                                cursor.execute(sql, params)
+                            except sqlite3.Error as row_error:
+                                self.logger.error(f"批量插入跳过: {params[0]} - {row_error}")
+                                continue
+                            success_count += cursor.rowcount
                     conn.commit()
+                    
+                    fail_count += len(params_list) - success_count
                     self.logger.debug(f"批量插入: 成功 {success_count}, 失败 {fail_count}")
                     
         except Exception as e:
             self.logger.error(f"批量插入 Update 记录失败: {e}")
-            fail_count = len(updates_data)
+            return (0, len(updates_data))
         
         return (success_count, fail_count)
     
@@ -341,7 +389,7 @@ class UpdatesRepository(BaseRepository):
                     ''',
                     (vendor, source_channel, publish_date, product_name, title),
                 )
-                return [dict(row) for row in cursor.fetchall()]
+                return self._fetch_dicts(cursor)
         except Exception as e:
             self.logger.error(f"按业务键查询 Update 失败: {e}")
             return []
@@ -500,7 +548,8 @@ class UpdatesRepository(BaseRepository):
                 params.extend([limit, offset])
                 
                 cursor.execute(sql, params)
-                return [dict(row) for row in cursor.fetchall()]
+                # 直接迭代游标逐行转换，不先物化整页 Row 列表
+                return self._fetch_dicts(cursor)
                 
         except Exception as e:
             self.logger.error(f"分页查询失败: {e}")
@@ -589,22 +638,10 @@ class UpdatesRepository(BaseRepository):
             where_clauses.append("publish_date <= ?")
             params.append(filters['date_to'])
         
-        # has_analysis 过滤（增强判定）
+        # has_analysis 过滤（增强判定由 has_analysis 生成列完成）
         if filters.get('has_analysis') is not None:
-            if filters['has_analysis']:
-                where_clauses.append(
-                    "title_translated IS NOT NULL "
-                    "AND title_translated != '' "
-                    "AND LENGTH(TRIM(title_translated)) >= 2 "
-                    "AND title_translated NOT IN ('N/A', '暂无', 'None', 'null')"
-                )
-            else:
-                where_clauses.append(
-                    "(title_translated IS NULL "
-                    "OR title_translated = '' "
-                    "OR LENGTH(TRIM(title_translated)) < 2 "
-                    "OR title_translated IN ('N/A', '暂无', 'None', 'null'))"
-                )
+            where_clauses.append("has_analysis = ?")
+            params.append(1 if filters['has_analysis'] else 0)
 
         # exclude_backfill 过滤：仅排除“crawl_time 为今天且 publish_date 早于今天至少 7 天”的临时补全项
         if filters.get('exclude_backfill'):
@@ -619,20 +656,29 @@ class UpdatesRepository(BaseRepository):
         
         # keyword 关键词搜索（中英文标题 + 内容 + 摘要）
         if filters.get('keyword'):
-            where_clauses.append(
-                "(title LIKE ? OR title_translated LIKE ? OR content LIKE ? "
-                "OR content_translated LIKE ? OR content_summary LIKE ?)"
-            )
-            keyword_param = f"%{filters['keyword']}%"
-            params.extend([keyword_param] * 5)
+            keyword = filters['keyword']
+            if len(keyword) >= _FTS_MIN_KEYWORD_LENGTH:
+                # trigram 全文索引：整词作为短语做子串匹配
+                where_clauses.append(
+                    "rowid IN (SELECT rowid FROM updates_fts WHERE updates_fts MATCH ?)"
+                )
+                params.append('"' + keyword.replace('"', '""') + '"')
+            else:
+                # 不足 3 个字符 trigram 无法匹配，回退到 LIKE
+                where_clauses.append(
+                    "(title LIKE ? OR title_translated LIKE ? OR content LIKE ? "
+                    "OR content_translated LIKE ? OR content_summary LIKE ?)"
+                )
+                keyword_param = f"%{keyword}%"
+                params.extend([keyword_param] * 5)
         
         # tags 标签过滤
         if filters.get('tags'):
             tag_list = [t.strip() for t in filters['tags'].split(',')]
-            tag_conditions = []
-            for tag in tag_list:
-                tag_conditions.append("tags LIKE ?")
-                params.append(f'%"{tag}"%')
-            where_clauses.append(f"({' OR '.join(tag_conditions)})")
+            placeholders = ', '.join('?' * len(tag_list))
+            where_clauses.append(
+                f"update_id IN (SELECT update_id FROM update_tags WHERE tag IN ({placeholders}))"
+            )
+            params.extend(tag_list)
         
         return where_clauses, params
@@ -10,11 +10,64 @@ import hashlib
 import datetime
 import logging
 import threading
+from functools import lru_cache
 from typing import Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
 
+# Markdown 模板：一次格式化生成完整内容，避免逐行拼接再 join
+_MD_TEMPLATE = (
+    "# {title}\n\n"
+    "**原始链接:** [{url}]({url})\n\n"
+    "**发布时间:** {display_date}\n\n"
+    "**厂商:** {vendor}\n\n"
+    "**类型:** {source_type}\n\n"
+    "{extra}"
+    "---\n\n"
+    "{content}"
+)
+
+
+def _write_text(path: str, text: str) -> None:
+    """
+    以 UTF-8 编码原子写入文件（覆盖）
+    
+    先写入进程/线程私有的临时文件，再 os.replace 到目标路径，
+    并发写入同一路径时读者只会看到某一次完整的内容，无需加锁。
+    """
+    data = text.encode('utf-8')
+    tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        try:
+            view = memoryview(data)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@lru_cache(maxsize=8192)
+def _url_hash(url: str) -> str:
+    """URL 短哈希（MD5 前8位，与爬虫侧文件名保持一致）"""
+    return hashlib.md5(url.encode()).hexdigest()[:8]
+
+
+@lru_cache(maxsize=1024)
+def _normalize_date(pub_date: str) -> str:
+    """标准化日期格式为 YYYY_MM_DD"""
+    return pub_date.replace('-', '_')
+
+
 class FileStorage:
     """文件存储管理器"""
     
@@ -32,9 +85,6 @@ class FileStorage:
         self.source_type = source_type
         self.output_dir = os.path.join(base_dir, 'data', 'raw', vendor, source_type)
         os.makedirs(self.output_dir, exist_ok=True)
-        
-        # 文件写入锁
-        self.lock = threading.RLock()
     
     def create_filename(self, url: str, pub_date: str, ext: str = '.md') -> str:
         """
@@ -48,13 +98,8 @@ class FileStorage:
         Returns:
             格式为: YYYY_MM_DD_URLHASH.md 的文件名
         """
-        # 标准化日期格式
-        pub_date = pub_date.replace('-', '_')
-        
-        # 生成URL的哈希值（取前8位）
-        url_hash = hashlib.md5(url.encode()).hexdigest()[:8]
-        
-        return f"{pub_date}_{url_hash}{ext}"
+        # 标准化日期格式 + URL哈希值（取前8位），同一 URL 在一次爬取中会被多次计算，均已缓存
+        return f"{_normalize_date(pub_date)}_{_url_hash(url)}{ext}"
     
     def save_markdown(
         self, 
@@ -83,39 +128,24 @@ class FileStorage:
         # 构建Markdown内容
         display_date = pub_date.replace('_', '-')
         
-        lines = [
-            f"# {title}",
-            "",
-            f"**原始链接:** [{url}]({url})",
-            "",
-            f"**发布时间:** {display_date}",
-            "",
-            f"**厂商:** {self.vendor.upper()}",
-            "",
-            f"**类型:** {self.source_type.upper()}",
-            "",
-        ]
-        
-        # 添加额外元数据
-        if extra_metadata:
-            for key, value in extra_metadata.items():
-                if value:
-                    lines.append(f"**{key}:** {value}")
-                    lines.append("")
-        
-        lines.extend([
-            "---",
-            "",
-            content
-        ])
-        
-        final_content = "\n".join(lines)
-        
-        # 线程安全地写入文件
-        with self.lock:
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(final_content)
+        # 额外元数据
+        extra = "".join([
+            f"**{key}:** {value}\n\n"
+            for key, value in extra_metadata.items() if value
+        ]) if extra_metadata else ""
+        
+        final_content = _MD_TEMPLATE.format(
+            title=title,
+            url=url,
+            display_date=display_date,
+            vendor=self.vendor.upper(),
+            source_type=self.source_type.upper(),
+            extra=extra,
+            content=content,
+        )
+        
+        # 原子写入文件（输出目录已在初始化时创建）
+        _write_text(file_path, final_content)
         
         return file_path
     
@@ -141,10 +171,7 @@ class FileStorage:
             filename = self.create_filename(source_url, publish_date)
             filepath = os.path.join(self.output_dir, filename)
             
-            with self.lock:
-                os.makedirs(self.output_dir, exist_ok=True)
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(markdown_content)
+            _write_text(filepath, markdown_content)
             
             return filepath
             
@@ -181,39 +208,28 @@ class MarkdownGenerator:
         """
         生成标准化的更新Markdown内容
         """
-        lines = [
-            f"# {title}",
-            "",
-            f"**发布时间:** {publish_date}",
-            "",
-            f"**厂商:** {vendor.upper()}",
-            "",
-        ]
-        
-        if product_name:
-            lines.extend([f"**产品:** {product_name}", ""])
-        
-        if update_type:
-            lines.extend([f"**类型:** {update_type}", ""])
-        else:
-            lines.extend([f"**类型:** {source_type.upper()}", ""])
-        
-        lines.extend([
-            f"**原始链接:** {source_url}",
-            "",
-            "---",
-            "",
-            content
-        ])
+        product_line = f"**产品:** {product_name}\n\n" if product_name else ""
+        type_label = update_type or source_type.upper()
+        
+        markdown = (
+            f"# {title}\n\n"
+            f"**发布时间:** {publish_date}\n\n"
+            f"**厂商:** {vendor.upper()}\n\n"
+            f"{product_line}"
+            f"**类型:** {type_label}\n\n"
+            f"**原始链接:** {source_url}\n\n"
+            f"---\n\n"
+            f"{content}"
+        )
         
         if doc_links:
-            lines.extend(["", "## 相关文档", ""])
-            for doc_link in doc_links:
-                text = doc_link.get('text', 'Link')
-                url = doc_link.get('url', '')
-                lines.append(f"- [{text}]({url})")
+            links = "\n".join([
+                f"- [{doc_link.get('text', 'Link')}]({doc_link.get('url', '')})"
+                for doc_link in doc_links
+            ])
+            markdown = f"{markdown}\n\n## 相关文档\n\n{links}"
         
-        return "\n".join(lines)
+        return markdown
     
     @staticmethod
     def generate_blog_markdown(
@@ -227,20 +243,12 @@ class MarkdownGenerator:
         """生成博客文章的Markdown内容"""
         display_date = pub_date.replace('_', '-')
         
-        lines = [
-            f"# {title}",
-            "",
-            f"**原始链接:** [{url}]({url})",
-            "",
-            f"**发布时间:** {display_date}",
-            "",
-            f"**厂商:** {vendor.upper()}",
-            "",
-            f"**类型:** {source_type.upper()}",
-            "",
-            "---",
-            "",
-            content
-        ]
-        
-        return "\n".join(lines)
+        return _MD_TEMPLATE.format(
+            title=title,
+            url=url,
+            display_date=display_date,
+            vendor=vendor.upper(),
+            source_type=source_type.upper(),
+            extra="",
+            content=content,
+        )
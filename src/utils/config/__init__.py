@@ -14,6 +14,7 @@ from src.utils.config.config_loader import (
     load_config_directory,
     merge_configs,
     file_has_changed,
+    ensure_env_loaded,
 )
 
 __all__ = [
@@ -22,4 +23,5 @@ __all__ = [
     'load_config_directory',
     'merge_configs',
     'file_has_changed',
+    'ensure_env_loaded',
 ]
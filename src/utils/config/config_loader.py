@@ -4,30 +4,60 @@
 import os
 import yaml
 import logging
-import hashlib
+import threading
 from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
 from copy import deepcopy
 from functools import lru_cache
 
-# 加载 .env 文件中的环境变量
+# 项目根目录与默认配置目录（模块位置固定，只计算一次）
+_PROJECT_ROOT = os.path.abspath(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+_CONFIG_DIR = os.path.join(_PROJECT_ROOT, 'config')
+
+# 优先使用 libyaml 的 C 解析器，未编译时回退到纯 Python 实现
 try:
-    from dotenv import load_dotenv
-    # 从项目根目录加载 .env
-    _base_dir = os.path.abspath(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
-    _env_path = os.path.join(_base_dir, '.env')
-    if os.path.exists(_env_path):
-        load_dotenv(_env_path)
+    from yaml import CSafeLoader as _YamlLoader
 except ImportError:
-    pass  # python-dotenv 未安装时静默跳过
+    from yaml import SafeLoader as _YamlLoader
 
 logger = logging.getLogger(__name__)
 
-# 全局缓存，保存文件路径和最后修改时间的映射
-_file_mtimes = {}
-# 全局缓存，保存文件路径和内容哈希的映射
-_file_hashes = {}
+# 全局缓存，保存文件路径和 (修改时间ns, 大小) 的映射
+_file_sentinels: Dict[str, Tuple[int, int]] = {}
+# 全局缓存，保存配置目录和其 YAML 文件快照的映射
+_dir_sentinels: Dict[str, frozenset] = {}
+# YAML 解析结果缓存（LRU）：文件路径 -> ((mtime_ns, size), 解析并替换环境变量后的内容)
+_yaml_cache: "OrderedDict[str, Tuple[Tuple[int, int], Dict[str, Any]]]" = OrderedDict()
+_YAML_CACHE_SIZE = 128
 # 全局标志，表示是否是第一次加载配置
 _first_load = True
+# get_config 结果缓存：(base_dir, config_path) -> (依赖路径, 路径签名, 待合并配置列表)
+_config_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_CONFIG_CACHE_SIZE = 32
+_config_lock = threading.RLock()
+# get_config 加载期间登记的依赖路径（非加载期间为 None）
+_watched_paths: Optional[List[str]] = None
+# .env 是否已加载（首次读取配置时才加载，避免 import 时的文件系统调用）
+_env_loaded = False
+
+
+def ensure_env_loaded() -> None:
+    """首次使用时从项目根目录加载 .env 中的环境变量，之后直接返回"""
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _config_lock:
+        if _env_loaded:
+            return
+        try:
+            from dotenv import load_dotenv
+            _env_path = os.path.join(_PROJECT_ROOT, '.env')
+            if os.path.exists(_env_path):
+                load_dotenv(_env_path)
+        except ImportError:
+            pass  # python-dotenv 未安装时静默跳过
+        _env_loaded = True
+
 
 def merge_configs(base_config: Dict[str, Any], override_config: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -38,9 +68,10 @@ def merge_configs(base_config: Dict[str, Any], override_config: Dict[str, Any])
         override_config: 覆盖配置字典
         
     Returns:
-        合并后的配置字典
+        合并后的配置字典（新字典，不修改输入；未被覆盖的嵌套值与输入共享，
+        需要独立副本的调用方自行 deepcopy，如 get_config）
     """
-    result = deepcopy(base_config)
+    result = dict(base_config)
     
     for key, value in override_config.items():
         # 如果键存在且两个值都是字典，则递归合并
@@ -52,9 +83,25 @@ def merge_configs(base_config: Dict[str, Any], override_config: Dict[str, Any])
             
     return result
 
+def _merge_into(dst: Dict[str, Any], src: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    将 src 就地深度合并到 dst（不复制；src 中的嵌套字典可能被直接挂到 dst 上，
+    仅用于合并 load_yaml_file 返回的独立副本）
+    
+    Returns:
+        合并后的 dst
+    """
+    for key, value in src.items():
+        current = dst.get(key)
+        if isinstance(current, dict) and isinstance(value, dict):
+            _merge_into(current, value)
+        else:
+            dst[key] = value
+    return dst
+
 def file_has_changed(file_path: str) -> bool:
     """
-    检查文件是否已更改（通过比较修改时间和内容哈希）
+    检查文件是否已更改（通过比较 (mtime_ns, size)，无需读取文件内容）
     
     Args:
         file_path: 文件路径
@@ -62,48 +109,48 @@ def file_has_changed(file_path: str) -> bool:
     Returns:
         bool: 如果文件已更改或是第一次加载，则返回True，否则返回False
     """
-    global _first_load
-    
-    # 文件不存在
-    if not os.path.exists(file_path):
+    # 单次 stat：文件不存在时直接返回
+    try:
+        st = os.stat(file_path)
+    except FileNotFoundError:
         return False
     
-    current_mtime = os.path.getmtime(file_path)
-    previous_mtime = _file_mtimes.get(file_path)
-    
-    # 如果是第一次加载，则记录并返回True
-    if _first_load or previous_mtime is None:
-        _file_mtimes[file_path] = current_mtime
-        return True
+    current = (st.st_mtime_ns, st.st_size)
+    previous = _file_sentinels.get(file_path)
+    _file_sentinels[file_path] = current
     
-    # 如果修改时间未变，直接返回False
-    if current_mtime == previous_mtime:
-        return False
-    
-    # 修改时间变了，检查内容哈希
-    try:
-        with open(file_path, 'rb') as file:
-            content = file.read()
-            current_hash = hashlib.md5(content).hexdigest()
-            
-        previous_hash = _file_hashes.get(file_path)
-        
-        # 更新修改时间
-        _file_mtimes[file_path] = current_mtime
-        
-        # 内容也变了
-        if previous_hash is None or current_hash != previous_hash:
-            _file_hashes[file_path] = current_hash
-            return True
-    except Exception:
-        # 如果出错，保守地认为文件已更改
-        return True
-        
-    # 内容未变
-    return False
+    # 第一次加载或 (修改时间, 大小) 变化
+    return _first_load or previous is None or current != previous
+
+def _dir_sentinel(config_dir: str) -> frozenset:
+    """单次 scandir 计算目录内 YAML 文件的 (文件名, mtime_ns, size) 集合"""
+    with os.scandir(config_dir) as entries:
+        return frozenset(
+            (entry.name, st.st_mtime_ns, st.st_size)
+            for entry in entries
+            if entry.name.endswith(('.yaml', '.yml'))
+            for st in (entry.stat(),)
+        )
+
+
+def _dir_has_changed(config_dir: str) -> bool:
+    """检查配置目录中的 YAML 文件是否有新增、删除或修改"""
+    current = _dir_sentinel(config_dir)
+    previous = _dir_sentinels.get(config_dir)
+    _dir_sentinels[config_dir] = current
+    return previous is None or current != previous
 
 import re
 
+# 环境变量引用 ${VAR_NAME}
+_ENV_RE = re.compile(r'\$\{([^}]+)\}')
+
+
+def _replace_env(match) -> str:
+    # 如果环境变量不存在，保留原值
+    return os.environ.get(match.group(1), match.group(0))
+
+
 def _expand_env_vars(value):
     """
     递归替换配置值中的环境变量引用 ${VAR_NAME}
@@ -115,12 +162,9 @@ def _expand_env_vars(value):
         替换后的值
     """
     if isinstance(value, str):
-        # 匹配 ${VAR_NAME} 格式
-        pattern = r'\$\{([^}]+)\}'
-        def replace_env(match):
-            env_var = match.group(1)
-            return os.getenv(env_var, match.group(0))  # 如果环境变量不存在，保留原值
-        return re.sub(pattern, replace_env, value)
+        if '${' not in value:
+            return value
+        return _ENV_RE.sub(_replace_env, value)
     elif isinstance(value, dict):
         return {k: _expand_env_vars(v) for k, v in value.items()}
     elif isinstance(value, list):
@@ -132,28 +176,51 @@ def load_yaml_file(file_path: str) -> Dict[str, Any]:
     """
     加载YAML文件
     
+    解析结果按 (mtime, size) 缓存，文件未变化时只需一次 stat。
+    
     Args:
         file_path: YAML文件路径
         
     Returns:
         Dict: YAML文件内容
     """
+    _watch(file_path)
     try:
-        file_changed = file_has_changed(file_path)
+        st = os.stat(file_path)
+        sentinel = (st.st_mtime_ns, st.st_size)
+        with _config_lock:
+            cached = _yaml_cache.get(file_path)
+            if cached is not None and cached[0] == sentinel:
+                _yaml_cache.move_to_end(file_path)
+                return deepcopy(cached[1])
         
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-            yaml_content = yaml.safe_load(content) or {}
-            
-            # 替换环境变量引用
+        # 单次打开读取：以打开后的 fstat 作为缓存与变更检测的依据，避免二次 stat/读取
+        with open(file_path, 'rb') as file:
+            st = os.fstat(file.fileno())
+            content = file.read().decode('utf-8')
+        sentinel = (st.st_mtime_ns, st.st_size)
+        
+        previous = _file_sentinels.get(file_path)
+        _file_sentinels[file_path] = sentinel
+        file_changed = _first_load or previous != sentinel
+        
+        yaml_content = yaml.load(content, Loader=_YamlLoader) or {}
+        
+        # 替换环境变量引用（原文中没有 "${" 时无需遍历整个结构）
+        if '${' in content:
+            ensure_env_loaded()
             yaml_content = _expand_env_vars(yaml_content)
-            
-            if file_changed:
-                # 更新文件哈希
-                _file_hashes[file_path] = hashlib.md5(content.encode('utf-8')).hexdigest()
-                logger.info(f"配置文件已加载: {file_path}")
-                
-            return yaml_content
+        
+        if file_changed:
+            logger.info(f"配置文件已加载: {file_path}")
+        
+        with _config_lock:
+            _yaml_cache[file_path] = (sentinel, yaml_content)
+            _yaml_cache.move_to_end(file_path)
+            if len(_yaml_cache) > _YAML_CACHE_SIZE:
+                _yaml_cache.popitem(last=False)
+        
+        return deepcopy(yaml_content)
     except FileNotFoundError:
         logger.warning(f"配置文件不存在: {file_path}")
         return {}
@@ -173,6 +240,7 @@ def load_config_directory(config_dir: str) -> Dict[str, Any]:
     """
     # 先查找main.yaml作为主配置文件
     main_config_path = os.path.join(config_dir, 'main.yaml')
+    _watch(main_config_path)
     if not os.path.exists(main_config_path):
         # 如果没有main.yaml，则按字母顺序加载所有yaml文件
         logger.warning(f"在配置目录 {config_dir} 中未找到main.yaml，将按字母顺序加载所有yaml文件")
@@ -186,26 +254,21 @@ def load_config_directory(config_dir: str) -> Dict[str, Any]:
         logger.debug(f"main.yaml中没有imports字段，将仅使用main.yaml中的配置")
         return main_config
     
-    # 创建最终合并的配置
-    final_config = {}
-    
-    # 按照imports列表顺序加载配置文件
+    # 按照imports列表顺序收集配置（日志已在load_yaml_file中处理），main.yaml 中除 imports 外的配置最后覆盖
+    parts = []
     for import_file in main_config.get('imports', []):
         import_path = os.path.join(config_dir, import_file)
+        _watch(import_path)
         if os.path.exists(import_path):
-            config_data = load_yaml_file(import_path)
-            final_config = merge_configs(final_config, config_data)
-            # 日志已在load_yaml_file中处理
+            parts.append(load_yaml_file(import_path))
         else:
             logger.warning(f"导入的配置文件不存在: {import_path}")
+    parts.append({k: v for k, v in main_config.items() if k != 'imports'})
     
-    # 移除imports字段，避免干扰实际配置
-    if 'imports' in main_config:
-        del main_config['imports']
-    
-    # 将main.yaml中的其他配置合并到最终配置中
-    if main_config:
-        final_config = merge_configs(final_config, main_config)
+    # 各部分均为 load_yaml_file 返回的独立副本，可就地合并，无需逐次复制
+    final_config = {}
+    for part in parts:
+        _merge_into(final_config, part)
     
     return final_config
 
@@ -221,22 +284,40 @@ def load_all_yaml_files(config_dir: str) -> Dict[str, Any]:
     """
     merged_config = {}
     
-    # 获取目录中所有的yaml文件，并按字母顺序排序
-    yaml_files = sorted([f for f in os.listdir(config_dir) 
-                         if f.endswith('.yaml') or f.endswith('.yml')])
+    # 单次 scandir 获取目录中所有的yaml文件路径，并按字母顺序排序
+    with os.scandir(config_dir) as entries:
+        yaml_paths = sorted(entry.path for entry in entries
+                            if entry.name.endswith(('.yaml', '.yml')) and entry.is_file())
     
-    # 依次加载每个文件
-    for yaml_file in yaml_files:
-        file_path = os.path.join(config_dir, yaml_file)
+    # 依次加载每个文件（均为 load_yaml_file 返回的独立副本，可就地合并）
+    for file_path in yaml_paths:
         try:
             config_data = load_yaml_file(file_path)
-            merged_config = merge_configs(merged_config, config_data)
+            _merge_into(merged_config, config_data)
             # 日志已在load_yaml_file中处理
         except Exception as e:
-            logger.warning(f"加载配置文件 {yaml_file} 失败: {e}")
+            logger.warning(f"加载配置文件 {os.path.basename(file_path)} 失败: {e}")
     
     return merged_config
 
+def _stat_signature(paths: Tuple[str, ...]) -> tuple:
+    """计算一组路径的 (mtime_ns, size) 签名，不存在的路径记为 None"""
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            signature.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def _watch(path: str):
+    """在 get_config 加载期间登记依赖路径（文件或目录）"""
+    if _watched_paths is not None:
+        _watched_paths.append(path)
+
+
 def get_config(base_dir: Optional[str] = None, config_path: Optional[str] = None, default_config: Dict[str, Any] = None) -> Dict[str, Any]:
     """
     加载配置，支持以下方式：
@@ -244,6 +325,9 @@ def get_config(base_dir: Optional[str] = None, config_path: Optional[str] = None
     2. get_config() - 加载整个 config 目录
     3. get_config(config_path="/path/to/config") - 加载指定路径
     
+    解析结果按 (base_dir, config_path) 缓存（LRU，最多 32 项），加载时读取/探测过的文件和目录
+    任一 mtime 或大小变化即重新加载；每次返回独立的副本，调用方可随意修改。
+    
     Args:
         base_dir: 配置文件名称（不带.yaml后缀）或项目根目录路径
         config_path: 指定的配置文件或目录路径
@@ -252,42 +336,70 @@ def get_config(base_dir: Optional[str] = None, config_path: Optional[str] = None
     Returns:
         Dict: 加载的配置字典
     """
-    global _first_load
+    global _watched_paths
+    
+    ensure_env_loaded()
+    key = (base_dir, config_path)
+    with _config_lock:
+        cached = _config_cache.get(key)
+        if cached is None or _stat_signature(cached[0]) != cached[1]:
+            _watched_paths = []
+            try:
+                parts = _load_config_parts(base_dir, config_path)
+                watched = tuple(dict.fromkeys(_watched_paths))
+            finally:
+                _watched_paths = None
+            cached = (watched, _stat_signature(watched), parts)
+            _config_cache[key] = cached
+            if len(_config_cache) > _CONFIG_CACHE_SIZE:
+                _config_cache.popitem(last=False)
+        _config_cache.move_to_end(key)
+        parts = cached[2]
     
     # 如果没有提供默认配置，使用空字典
-    if default_config is None:
-        default_config = {}
+    config = default_config or {}
+    for part in parts:
+        config = merge_configs(config, part)
     
-    config = deepcopy(default_config)
+    return deepcopy(config)
+
+
+def _load_config_parts(base_dir: Optional[str], config_path: Optional[str]) -> List[Dict[str, Any]]:
+    """
+    按 get_config 的查找规则加载配置
+    
+    Returns:
+        List: 需依次合并到默认配置上的配置字典列表
+    """
+    global _first_load
     
-    # 确定项目根目录
-    project_root = os.path.abspath(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+    parts = []
     
     # 如果 base_dir 是配置文件名称（不是路径），加载单个配置文件
     if base_dir and not os.path.isabs(base_dir) and not os.path.exists(base_dir):
-        config_file = os.path.join(project_root, 'config', f'{base_dir}.yaml')
+        config_file = os.path.join(_CONFIG_DIR, f'{base_dir}.yaml')
+        _watch(config_file)
         if os.path.exists(config_file):
             if _first_load or file_has_changed(config_file):
                 logger.debug(f"加载配置文件: {config_file}")
             config_data = load_yaml_file(config_file)
             _first_load = False
-            return merge_configs(config, config_data)
+            return [config_data]
     
     # 如果没有提供项目根目录，自动确定
     if base_dir is None:
-        base_dir = project_root
+        base_dir = _PROJECT_ROOT
     
     # 如果提供了指定的配置路径
     if config_path:
         # 处理相对路径
         if not os.path.isabs(config_path):
             config_path = os.path.abspath(os.path.join(base_dir, config_path))
+        _watch(config_path)
         
         # 判断是文件还是目录
         if os.path.isdir(config_path):
-            config_dir_changed = any(file_has_changed(os.path.join(config_path, f)) 
-                                for f in os.listdir(config_path) 
-                                if f.endswith('.yaml') or f.endswith('.yml'))
+            config_dir_changed = _dir_has_changed(config_path)
             
             if _first_load or config_dir_changed:
                 logger.info(f"从指定的配置目录加载: {config_path}")
@@ -299,44 +411,44 @@ def get_config(base_dir: Optional[str] = None, config_path: Optional[str] = None
             
             config_data = load_yaml_file(config_path)
         
-        # 合并配置
-        config = merge_configs(config, config_data)
+        parts.append(config_data)
     else:
         # 尝试从config目录加载
         config_dir = os.path.join(base_dir, 'config')
+        _watch(config_dir)
         if os.path.exists(config_dir) and os.path.isdir(config_dir):
-            config_dir_changed = any(file_has_changed(os.path.join(config_dir, f)) 
-                                for f in os.listdir(config_dir) 
-                                if f.endswith('.yaml') or f.endswith('.yml'))
+            config_dir_changed = _dir_has_changed(config_dir)
             
             if _first_load or config_dir_changed:
                 logger.info(f"从配置目录加载: {config_dir}")
             
             config_data = load_config_directory(config_dir)
-            config = merge_configs(config, config_data)
+            parts.append(config_data)
         else:
             # 回退到从单一配置文件加载
             config_file = os.path.join(base_dir, 'config.yaml')
+            _watch(config_file)
             if os.path.exists(config_file):
                 if _first_load or file_has_changed(config_file):
                     logger.info(f"从配置文件加载: {config_file}")
                 
                 config_data = load_yaml_file(config_file)
-                config = merge_configs(config, config_data)
+                parts.append(config_data)
             else:
                 if _first_load:
                     logger.warning(f"未找到配置文件或目录，使用默认配置")
     
     # 加载敏感配置文件
     secret_config_path = os.path.join(base_dir, 'config.secret.yaml')
+    _watch(secret_config_path)
     if os.path.exists(secret_config_path):
         if _first_load or file_has_changed(secret_config_path):
             logger.info(f"加载敏感配置文件: {secret_config_path}")
         
         secret_config_data = load_yaml_file(secret_config_path)
-        config = merge_configs(config, secret_config_data)
+        parts.append(secret_config_data)
     
     # 更新首次加载标志
     _first_load = False
     
-    return config
+    return parts
@@ -11,6 +11,20 @@ import logging
 from typing import Optional
 from contextlib import contextmanager
 
+# 本进程内已确认存在的锁目录，避免每次实例化都 makedirs
+_ensured_dirs = set()
+
+# 当前进程 PID 字符串（fork 后在子进程中刷新）
+_PID_STR = str(os.getpid())
+
+
+def _refresh_pid_str():
+    global _PID_STR
+    _PID_STR = str(os.getpid())
+
+
+os.register_at_fork(after_in_child=_refresh_pid_str)
+
 
 class DistributedLock:
     """
@@ -28,12 +42,14 @@ class DistributedLock:
         """
         self.lock_file_path = lock_file_path
         self.logger = logger or logging.getLogger(__name__)
-        self._lock_file = None
+        self._fd: Optional[int] = None
         self._acquired = False
         
-        # 确保锁文件目录存在
+        # 确保锁文件目录存在（每个目录每进程只检查一次）
         lock_dir = os.path.dirname(self.lock_file_path)
-        os.makedirs(lock_dir, exist_ok=True)
+        if lock_dir and lock_dir not in _ensured_dirs:
+            os.makedirs(lock_dir, exist_ok=True)
+            _ensured_dirs.add(lock_dir)
     
     def acquire(self, blocking: bool = True) -> bool:
         """
@@ -46,36 +62,34 @@ class DistributedLock:
             是否成功获取锁
         """
         try:
-            # 以读写模式打开锁文件，如果不存在则创建
-            self._lock_file = open(self.lock_file_path, 'w+')
+            # 以读写模式打开锁文件（不截断，避免在拿到锁之前清掉持有者的 PID）
+            self._fd = os.open(self.lock_file_path, os.O_RDWR | os.O_CREAT, 0o644)
             
             # 尝试获取锁
             if blocking:
-                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
             else:
                 try:
-                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
-                except IOError:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
                     # 锁已被其他进程持有
-                    self._lock_file.close()
-                    self._lock_file = None
+                    os.close(self._fd)
+                    self._fd = None
                     return False
             
             # 获取锁成功后写入进程ID
-            self._lock_file.seek(0)
-            self._lock_file.truncate()
-            self._lock_file.write(str(os.getpid()))
-            self._lock_file.flush()
+            os.ftruncate(self._fd, 0)
+            os.pwrite(self._fd, _PID_STR.encode(), 0)
             
             self._acquired = True
-            self.logger.debug(f"成功获取分布式锁: {self.lock_file_path}, PID: {os.getpid()}")
+            self.logger.debug(f"成功获取分布式锁: {self.lock_file_path}, PID: {_PID_STR}")
             return True
             
-        except (IOError, OSError) as e:
+        except OSError as e:
             self.logger.error(f"获取分布式锁失败: {e}")
-            if self._lock_file:
-                self._lock_file.close()
-                self._lock_file = None
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
             return False
     
     def release(self) -> bool:
@@ -85,14 +99,14 @@ class DistributedLock:
         Returns:
             是否成功释放锁
         """
-        if not self._acquired or not self._lock_file:
+        if not self._acquired or self._fd is None:
             return False
         
         try:
             # 释放文件锁
-            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
-            self._lock_file.close()
-            self._lock_file = None
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
             self._acquired = False
             
             # 删除锁文件
@@ -104,7 +118,7 @@ class DistributedLock:
             self.logger.debug(f"成功释放分布式锁: {self.lock_file_path}")
             return True
             
-        except (IOError, OSError) as e:
+        except OSError as e:
             self.logger.error(f"释放分布式锁失败: {e}")
             return False
     
@@ -116,21 +130,24 @@ class DistributedLock:
             锁是否被其他进程持有
         """
         try:
-            # 尝试以非阻塞方式获取锁
-            test_file = open(self.lock_file_path, 'w+')
-            try:
-                fcntl.flock(test_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
-                # 如果能获取到锁，说明之前没有其他进程持有锁
-                fcntl.flock(test_file.fileno(), fcntl.LOCK_UN)
-                test_file.close()
-                return False
-            except IOError:
-                # 无法获取锁，说明被其他进程持有
-                test_file.close()
-                return True
+            # 只读打开，不创建/截断锁文件，避免破坏持有者写入的 PID
+            fd = os.open(self.lock_file_path, os.O_RDONLY)
         except OSError:
             # 文件不存在或其他错误，认为没有锁
             return False
+        
+        try:
+            # 共享锁探测：与持有者的排他锁冲突即说明被占用
+            fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+        else:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            return False
+        finally:
+            os.close(fd)
     
     def __enter__(self):
         """上下文管理器入口"""
@@ -56,24 +56,30 @@ class ColoredFormatter(logging.Formatter):
     def __init__(self, fmt: str = None, datefmt: str = None, use_colors: bool = True):
         super().__init__(fmt=fmt, datefmt=datefmt)
         self.use_colors = use_colors
+        
+        # 预先生成各级别带颜色的格式样式，避免每条记录改写 self._style._fmt
+        base_fmt = self._style._fmt
+        style_cls = type(self._style)
+        self._level_styles = {
+            level: style_cls(f"{color}{base_fmt}{Colors.RESET}")
+            for level, color in self.LEVEL_COLORS.items()
+        }
+        self._override_styles: Dict[str, logging.PercentStyle] = {}
     
-    def format(self, record):
-        original_fmt = self._style._fmt
+    def formatMessage(self, record):
+        if not self.use_colors:
+            return self._style.format(record)
         
         color_override = getattr(record, 'color_override', None)
-
-        if self.use_colors:
-            if color_override:
-                self._style._fmt = f"{color_override}{original_fmt}{Colors.RESET}"
-            elif record.levelno in self.LEVEL_COLORS:
-                color = self.LEVEL_COLORS[record.levelno]
-                self._style._fmt = f"{color}{original_fmt}{Colors.RESET}"
-            # If no override and not a standard level with color, use default (no color for this part)
-            # else: pass # Or handle explicitly if needed
+        if color_override:
+            style = self._override_styles.get(color_override)
+            if style is None:
+                style = type(self._style)(f"{color_override}{self._style._fmt}{Colors.RESET}")
+                self._override_styles[color_override] = style
+            return style.format(record)
         
-        result = logging.Formatter.format(self, record)
-        self._style._fmt = original_fmt
-        return result
+        # 非标准级别不着色
+        return self._level_styles.get(record.levelno, self._style).format(record)
 
 def setup_colored_logging(level: int = logging.INFO, 
                          log_file: Optional[str] = None,
@@ -88,7 +94,7 @@ def setup_colored_logging(level: int = logging.INFO,
         log_file: 日志文件路径，如果为None则不输出到文件
         fmt: 日志格式
         datefmt: 日期格式
-        use_colors: 是否使用彩色输出
+        use_colors: 是否使用彩色输出（stdout 非终端或设置了 NO_COLOR 时自动关闭）
     """
     # 获取根日志记录器
     root_logger = logging.getLogger()
@@ -102,9 +108,20 @@ def setup_colored_logging(level: int = logging.INFO,
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(level)
     
-    # 使用彩色格式化器
-    colored_formatter = ColoredFormatter(fmt=fmt, datefmt=datefmt, use_colors=use_colors)
-    console_handler.setFormatter(colored_formatter)
+    # 输出被重定向到文件/管道或设置了 NO_COLOR 时不输出 ANSI 颜色码
+    isatty = getattr(sys.stdout, 'isatty', None)
+    use_colors = (
+        use_colors
+        and isatty is not None and isatty()
+        and 'NO_COLOR' not in os.environ
+    )
+    
+    if use_colors:
+        # 使用彩色格式化器
+        console_formatter = ColoredFormatter(fmt=fmt, datefmt=datefmt, use_colors=True)
+    else:
+        console_formatter = logging.Formatter(fmt=fmt, datefmt=datefmt)
+    console_handler.setFormatter(console_formatter)
     root_logger.addHandler(console_handler)
     
     # 如果指定了日志文件，添加文件处理器
@@ -3,20 +3,131 @@
 
 import os
 import sys
+import atexit
 import time
-import json
+import struct
 import logging
 import threading
 import fcntl
 import errno
 import socket
-import psutil
-import datetime
-from typing import Dict, Any, Optional, List, Set
+from functools import lru_cache
+from typing import Dict, Any, Iterable, Optional, List, Set, Tuple
 from enum import Enum, auto
 
 logger = logging.getLogger(__name__)
 
+# 主机名与命令行在进程生命周期内不变，导入时计算一次
+_HOSTNAME = socket.gethostname()
+_COMMAND = " ".join(sys.argv)
+
+# 锁文件记录：pid、时间戳（微秒）、进程类型、主机名、命令行；定长二进制，单次写入即完整
+_LOCK_STRUCT = struct.Struct('<IQ16s64s256s')
+
+
+def _pack_lock_info(pid: int, timestamp: float, process_type: str, hostname: str, command: str) -> bytes:
+    """打包锁文件记录（超长字段按字节截断）"""
+    return _LOCK_STRUCT.pack(
+        pid,
+        int(timestamp * 1e6),
+        process_type.encode('utf-8'),
+        hostname.encode('utf-8'),
+        command.encode('utf-8'),
+    )
+
+
+def _read_lock_info(fd: int) -> Optional[Dict[str, Any]]:
+    """
+    从锁文件描述符读取锁记录
+    
+    Returns:
+        锁信息字典；文件为空、长度不符（含旧版 JSON 格式）时返回 None
+    """
+    data = os.pread(fd, _LOCK_STRUCT.size + 1, 0)
+    if len(data) != _LOCK_STRUCT.size:
+        return None
+    pid, timestamp_us, process_type, hostname, command = _LOCK_STRUCT.unpack(data)
+    return {
+        "pid": pid,
+        "timestamp": timestamp_us / 1e6,
+        "process_type": process_type.rstrip(b'\0').decode('utf-8', 'ignore'),
+        "hostname": hostname.rstrip(b'\0').decode('utf-8', 'ignore'),
+        "command": command.rstrip(b'\0').decode('utf-8', 'ignore'),
+    }
+
+
+# 是否可通过 /proc 读取进程状态（Linux）
+_HAS_PROC = os.path.exists('/proc/self/stat')
+
+
+def _pid_alive(pid: int) -> bool:
+    """进程是否存活（存在且不是僵尸进程）；Linux 直接读取 /proc/<pid>/stat，其他平台回退到 os.kill(pid, 0)"""
+    if _HAS_PROC:
+        try:
+            with open(f'/proc/{pid}/stat', 'rb') as f:
+                data = f.read()
+        except (FileNotFoundError, ProcessLookupError):
+            return False
+        # 进程名可能包含空格或括号，状态字段取最后一个 ')' 之后的第一个字段
+        return data.rpartition(b')')[2].split()[0] not in (b'Z', b'X')
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # 进程存在但属于其他用户
+        return True
+    return True
+
+@lru_cache(maxsize=8)
+def _is_memory_fs(path: str) -> bool:
+    """路径是否位于 tmpfs/ramfs 等内存文件系统（fsync 无意义）；按目录只检测一次"""
+    try:
+        with open('/proc/self/mounts') as f:
+            mounts = [line.split() for line in f]
+    except OSError:
+        return False
+    path = os.path.realpath(path)
+    best_mount, fs_type = '', ''
+    for fields in mounts:
+        if len(fields) < 3:
+            continue
+        mount_point = fields[1].replace('\\040', ' ')
+        if (path == mount_point or path.startswith(mount_point.rstrip('/') + '/')) and len(mount_point) > len(best_mount):
+            best_mount, fs_type = mount_point, fields[2]
+    return fs_type in ('tmpfs', 'ramfs')
+
+# 当前环境是否支持 O_TMPFILE + link 原子创建锁文件（首次失败后不再尝试）
+_tmpfile_link_supported = hasattr(os, 'O_TMPFILE')
+
+
+def _create_lock_file(lock_dir: str, lock_file_path: str, payload: bytes) -> Optional[int]:
+    """
+    锁文件不存在时，用 O_TMPFILE 写好完整记录并加排他锁后再 link 到目标路径，
+    读取方不会看到空的新锁文件
+    
+    Returns:
+        持有排他锁的文件描述符；目标已存在或环境不支持时返回 None，由调用方走常规路径
+    """
+    global _tmpfile_link_supported
+    if not _tmpfile_link_supported:
+        return None
+    try:
+        fd = os.open(lock_dir, os.O_TMPFILE | os.O_RDWR, 0o644)
+    except OSError:
+        _tmpfile_link_supported = False
+        return None
+    try:
+        os.pwrite(fd, payload, 0)
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        os.link(f'/proc/self/fd/{fd}', lock_file_path)
+        return fd
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            _tmpfile_link_supported = False
+        os.close(fd)
+        return None
+
 class ProcessType(Enum):
     """进程类型枚举"""
     CRAWLER = auto()  # 爬虫进程
@@ -24,6 +135,13 @@ class ProcessType(Enum):
     WEB_SERVER = auto()  # Web服务器进程
     SCHEDULER = auto()  # 调度器进程
 
+def _lock_paths(lock_dir: str) -> Dict[ProcessType, str]:
+    """计算各进程类型的锁文件路径"""
+    return {
+        process_type: os.path.join(lock_dir, f"cnetCompSpy_{process_type.name.lower()}.lock")
+        for process_type in ProcessType
+    }
+
 class ProcessLockManager:
     """
     进程锁管理器，实现单例模式和进程间锁定
@@ -35,6 +153,12 @@ class ProcessLockManager:
     # 类变量，用于存储单例实例
     _instances: Dict[ProcessType, 'ProcessLockManager'] = {}
     _instance_lock = threading.Lock()
+    # 按进程类型分片的单例创建锁，不同类型的 get_instance 互不阻塞
+    _instance_locks: Dict[ProcessType, threading.Lock] = {pt: threading.Lock() for pt in ProcessType}
+    # 本进程内已持有锁的进程类型（在 _instance_lock 保护下随获取/释放更新）
+    _LOCKED_TYPES: Set[ProcessType] = set()
+    # 探测用的锁文件描述符缓存：锁文件路径 -> (描述符, (st_dev, st_ino))，由 _instance_lock 保护
+    _probe_fds: Dict[str, Tuple[int, Tuple[int, int]]] = {}
     
     # 进程类型互斥关系配置
     # 键为进程类型，值为该进程运行时不允许运行的其他进程类型集合
@@ -47,10 +171,15 @@ class ProcessLockManager:
     
     # 锁文件目录
     _lock_dir = "/tmp"
+    # 各进程类型的锁文件路径（类定义时计算一次；修改 _lock_dir 时需同步更新）
+    _LOCK_PATHS = _lock_paths(_lock_dir)
     
     # 锁超时时间（秒）
     _lock_timeout = 3600  # 默认1小时
     
+    # check_lock_status 的锁记录缓存：锁文件路径 -> ((inode, mtime_ns, size), 解码后的记录)
+    _status_cache: Dict[str, Tuple[Tuple[int, int, int], Optional[Dict[str, Any]]]] = {}
+    
     def __init__(self, process_type: ProcessType):
         """
         初始化进程锁管理器
@@ -60,14 +189,16 @@ class ProcessLockManager:
         """
         self.process_type = process_type
         # 使用进程类型特定的锁文件路径来实现进程互斥
-        self.lock_file_path = os.path.join(self._lock_dir, f"cnetCompSpy_{process_type.name.lower()}.lock")
-        self.lock_file = None
+        self.lock_file_path = self._LOCK_PATHS[process_type]
+        # 互斥进程类型在构造时确定，acquire_lock 直接遍历（WEB_SERVER 等为空元组）
+        self._mutex_types = tuple(self._mutex_config.get(process_type, ()))
+        self._lock_fd: Optional[int] = None
         self.locked = False
         self.pid = os.getpid()
-        self.hostname = socket.gethostname()
-        self.command = " ".join(sys.argv)
+        self.hostname = _HOSTNAME
+        self.command = _COMMAND
         
-        logger.info(f"初始化进程锁管理器: {process_type.name}, 锁文件: {self.lock_file_path}")
+        logger.info("初始化进程锁管理器: %s, 锁文件: %s", process_type.name, self.lock_file_path)
     
     @classmethod
     def get_instance(cls, process_type: ProcessType) -> 'ProcessLockManager':
@@ -80,10 +211,17 @@ class ProcessLockManager:
         Returns:
             ProcessLockManager: 进程锁管理器实例
         """
-        with cls._instance_lock:
-            if process_type not in cls._instances:
-                cls._instances[process_type] = cls(process_type)
-            return cls._instances[process_type]
+        # 快速路径：实例已存在时无需加锁（dict 读取在 GIL 下是原子的）
+        instance = cls._instances.get(process_type)
+        if instance is not None:
+            return instance
+        
+        with cls._instance_locks[process_type]:
+            instance = cls._instances.get(process_type)
+            if instance is None:
+                instance = cls(process_type)
+                cls._instances[process_type] = instance
+            return instance
     
     def acquire_lock(self) -> bool:
         """
@@ -93,131 +231,59 @@ class ProcessLockManager:
             bool: 是否成功获取锁
         """
         if self.locked:
-            logger.debug(f"进程锁已获取: {self.process_type.name}")
+            logger.debug("进程锁已获取: %s", self.process_type.name)
             return True
         
-        # 首先检查同类型进程是否正在运行
-        if self.is_same_type_process_running():
-            logger.warning(f"同类型进程已在运行，无法获取锁: {self.process_type.name}")
-            return False
-        
-        # 检查互斥进程是否正在运行
-        for mutex_type in self._mutex_config.get(self.process_type, set()):
-            if self.is_process_running(mutex_type):
+        # 检查互斥进程是否正在运行（同类型进程无需单独探测：下面的 LOCK_EX|LOCK_NB 本身
+        # 就是原子的"检查并占用"，已被持有时直接失败）
+        running = self._probe_locks(self._mutex_types)
+        for mutex_type in self._mutex_types:
+            if running[mutex_type]:
                 logger.warning(f"互斥进程正在运行: {mutex_type.name}，无法获取锁: {self.process_type.name}")
                 return False
         
-        # 检查并清理过期的锁文件
-        if os.path.exists(self.lock_file_path):
-            try:
-                # 检查文件大小，如果为0则直接清理
-                if os.path.getsize(self.lock_file_path) == 0:
-                    logger.warning(f"发现空的锁文件，清理: {self.process_type.name}")
-                    os.remove(self.lock_file_path)
-                else:
-                    # 尝试读取锁文件内容
-                    with open(self.lock_file_path, 'r') as f:
-                        content = f.read().strip()
-                        if not content:
-                            logger.warning(f"锁文件内容为空，清理: {self.process_type.name}")
-                            os.remove(self.lock_file_path)
-                        else:
-                            try:
-                                lock_info = json.loads(content)
-                                timestamp = lock_info.get("timestamp", 0)
-                                pid = lock_info.get("pid", 0)
-                                
-                                # 检查锁是否过期
-                                if (time.time() - timestamp) > self._lock_timeout:
-                                    logger.warning(f"发现过期的锁文件，清理: {self.process_type.name}")
-                                    os.remove(self.lock_file_path)
-                                elif pid > 0:
-                                    # 检查进程是否仍然存在
-                                    try:
-                                        process = psutil.Process(pid)
-                                        if not process.is_running() or process.status() == psutil.STATUS_ZOMBIE:
-                                            logger.warning(f"持有锁的进程已结束或为僵尸进程，清理锁文件: pid={pid}")
-                                            os.remove(self.lock_file_path)
-                                    except psutil.NoSuchProcess:
-                                        logger.warning(f"持有锁的进程不存在，清理锁文件: pid={pid}")
-                                        os.remove(self.lock_file_path)
-                            except json.JSONDecodeError:
-                                logger.warning(f"锁文件内容格式错误，清理: {self.process_type.name}")
-                                os.remove(self.lock_file_path)
-            except Exception as e:
-                logger.warning(f"检查和清理锁文件时发生错误: {e}")
-        
+        fd = None
         try:
             # 创建锁文件目录（如果不存在）
             os.makedirs(self._lock_dir, exist_ok=True)
             
-            # 打开锁文件
-            self.lock_file = open(self.lock_file_path, 'w+')
+            payload = _pack_lock_info(self.pid, time.time(), self.process_type.name, self.hostname, self.command)
             
-            # 尝试获取文件锁（非阻塞模式）
-            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            # 锁文件不存在时原子地创建带完整记录的锁文件
+            fd = _create_lock_file(self._lock_dir, self.lock_file_path, payload)
+            if fd is None:
+                # 以读写方式打开锁文件（不截断，避免在拿到锁之前清掉持有者的记录）；
+                # 崩溃残留的旧锁文件无人持有 flock，拿到锁后直接覆盖，无需事先清理
+                fd = os.open(self.lock_file_path, os.O_RDWR | os.O_CREAT, 0o644)
+                
+                # 尝试获取文件锁（非阻塞模式）
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                
+                # 写入锁信息：先覆盖写定长记录再截掉多余内容，读取方不会看到空文件
+                os.pwrite(fd, payload, 0)
+                os.ftruncate(fd, len(payload))
             
-            # 写入锁信息
-            current_time = time.time()
-            lock_info = {
-                "pid": self.pid,
-                "process_type": self.process_type.name,
-                "timestamp": current_time,
-                "timestamp_formatted": datetime.datetime.fromtimestamp(current_time).strftime('%Y-%m-%d %H:%M:%S'),
-                "hostname": self.hostname,
-                "command": self.command,
-                "start_method": "web" if "web_server" in self.command else "shell"
-            }
-            
-            # 使用更可靠的写入方式
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    # 清空文件内容并写入新信息
-                    self.lock_file.seek(0)
-                    self.lock_file.truncate()
-                    json.dump(lock_info, self.lock_file, ensure_ascii=False, indent=2)
-                    self.lock_file.flush()
-                    os.fsync(self.lock_file.fileno())
-                    
-                    # 验证写入内容
-                    self.lock_file.seek(0)
-                    content = self.lock_file.read().strip()
-                    if content:
-                        try:
-                            loaded_info = json.loads(content)
-                            if loaded_info.get("pid") == self.pid:
-                                logger.debug(f"成功验证锁文件内容: {loaded_info}")
-                                break
-                        except json.JSONDecodeError:
-                            logger.warning(f"锁文件内容无法解析为JSON，重试写入 ({attempt+1}/{max_retries})")
-                    else:
-                        logger.warning(f"锁文件内容为空，重试写入 ({attempt+1}/{max_retries})")
-                    
-                    if attempt == max_retries - 1:
-                        raise Exception("锁文件内容写入后为空或无法解析，达到最大重试次数")
-                        
-                except Exception as e:
-                    logger.error(f"写入锁文件内容时发生错误 ({attempt+1}/{max_retries}): {e}")
-                    if attempt == max_retries - 1:
-                        raise
-                    time.sleep(0.5)  # 短暂等待后重试
+            # 锁的正确性由 flock 保证，仅在非内存文件系统上 fsync 记录
+            if not _is_memory_fs(self._lock_dir):
+                os.fsync(fd)
             
+            self._lock_fd = fd
             self.locked = True
+            with self._instance_lock:
+                self._LOCKED_TYPES.add(self.process_type)
             logger.info(f"成功获取进程锁: {self.process_type.name}")
             return True
             
         except IOError as e:
             # 如果是因为文件被锁定而失败
             if e.errno == errno.EAGAIN or e.errno == errno.EACCES:
-                logger.warning(f"无法获取进程锁: {self.process_type.name}，锁已被其他进程持有")
+                logger.warning(f"同类型进程已在运行，无法获取锁: {self.process_type.name}")
             else:
                 logger.error(f"获取进程锁时发生IO错误: {e}")
             
             # 关闭文件（如果已打开）
-            if self.lock_file:
-                self.lock_file.close()
-                self.lock_file = None
+            if fd is not None:
+                os.close(fd)
             
             return False
             
@@ -225,9 +291,8 @@ class ProcessLockManager:
             logger.error(f"获取进程锁时发生异常: {e}")
             
             # 关闭文件（如果已打开）
-            if self.lock_file:
-                self.lock_file.close()
-                self.lock_file = None
+            if fd is not None:
+                os.close(fd)
             
             return False
     
@@ -238,19 +303,21 @@ class ProcessLockManager:
         Returns:
             bool: 是否成功释放锁
         """
-        if not self.locked or not self.lock_file:
-            logger.debug(f"进程锁未获取，无需释放: {self.process_type.name}")
+        if not self.locked or self._lock_fd is None:
+            logger.debug("进程锁未获取，无需释放: %s", self.process_type.name)
             return True
         
         try:
             # 释放文件锁
-            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
             
             # 关闭锁文件，但不删除它
-            self.lock_file.close()
-            self.lock_file = None
+            os.close(self._lock_fd)
+            self._lock_fd = None
             
             self.locked = False
+            with self._instance_lock:
+                self._LOCKED_TYPES.discard(self.process_type)
             logger.info(f"成功释放进程锁: {self.process_type.name}")
             return True
             
@@ -277,104 +344,94 @@ class ProcessLockManager:
         Returns:
             bool: 是否正在运行
         """
-        # 如果检查的是当前进程类型，并且已经获取了锁，则返回False（自己不会阻止自己）
-        if process_type == self.process_type and self.locked:
-            return False
+        return self._probe_locks((process_type,))[process_type]
+    
+    def _probe_locks(self, process_types: Iterable[ProcessType]) -> Dict[ProcessType, bool]:
+        """
+        对给定类型的锁文件各做一次 flock 探测
+        
+        仅凭 flock 判断：排他锁随持有进程一起存在，进程退出（含崩溃）时由内核释放，
+        无需再读取记录或检查 pid。
+        
+        Args:
+            process_types: 需要探测的进程类型
             
-        lock_file_path = os.path.join(self._lock_dir, f"cnetCompSpy_{process_type.name.lower()}.lock")
+        Returns:
+            Dict: 进程类型 -> 是否正在运行
+        """
+        results = {}
+        for process_type in process_types:
+            # 本进程已持有该类型的锁时无需访问文件系统：
+            # 同类型为False（自己不会阻止自己），其他类型即正在运行
+            if process_type in self._LOCKED_TYPES:
+                results[process_type] = process_type != self.process_type
+                continue
+            
+            # 探测期间持有 _instance_lock，避免缓存的描述符被其他线程关闭或替换
+            with self._instance_lock:
+                try:
+                    fd = self._probe_fd(self._LOCK_PATHS[process_type])
+                    if fd is None:
+                        # 文件不存在或已被删除
+                        results[process_type] = False
+                        continue
+                    
+                    # 成功获取共享锁，说明没有进程持有排他锁，即进程不在运行
+                    fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                    results[process_type] = False
+                except BlockingIOError:
+                    # 无法获取共享锁，说明有进程持有排他锁，即进程正在运行
+                    logger.info("检测到进程正在运行: %s", process_type.name)
+                    results[process_type] = True
+                except Exception as e:
+                    logger.error("检查进程运行状态时发生异常: %s", e)
+                    results[process_type] = False
         
-        if not os.path.exists(lock_file_path):
-            return False
+        return results
+    
+    @classmethod
+    def _probe_fd(cls, lock_file_path: str) -> Optional[int]:
+        """
+        获取探测用的只读描述符（调用方需持有 _instance_lock）
+        
+        描述符跨调用缓存复用，每次仅 stat 一次路径，inode 变化（文件被删除后重建）时重新打开。
         
-        # 检查文件大小，如果为0则认为是无效锁
+        Returns:
+            文件描述符；文件不存在时返回 None
+        """
         try:
-            if os.path.getsize(lock_file_path) == 0:
-                logger.warning(f"锁文件为空: {process_type.name}")
-                return False
-        except Exception:
-            # 如果无法获取文件大小，可能是文件已被删除
-            return False
+            st = os.stat(lock_file_path)
+        except FileNotFoundError:
+            st = None
+        
+        cached = cls._probe_fds.get(lock_file_path)
+        if cached is not None:
+            if st is not None and cached[1] == (st.st_dev, st.st_ino):
+                return cached[0]
+            del cls._probe_fds[lock_file_path]
+            os.close(cached[0])
+        if st is None:
+            return None
         
         try:
-            with open(lock_file_path, 'r') as f:
+            fd = os.open(lock_file_path, os.O_RDONLY)
+        except FileNotFoundError:
+            return None
+        opened = os.fstat(fd)
+        cls._probe_fds[lock_file_path] = (fd, (opened.st_dev, opened.st_ino))
+        return fd
+    
+    @classmethod
+    def _close_probe_fds(cls):
+        """关闭所有缓存的探测描述符（进程退出时调用）"""
+        with cls._instance_lock:
+            for fd, _ in cls._probe_fds.values():
                 try:
-                    # 尝试获取共享锁（非阻塞模式）
-                    fcntl.flock(f.fileno(), fcntl.LOCK_SH | fcntl.LOCK_NB)
-                    # 如果成功获取共享锁，说明没有进程持有排他锁，即进程不在运行
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-                    
-                    # 检查锁是否过期
-                    try:
-                        content = f.read().strip()
-                        # 检查文件内容是否为空
-                        if not content:
-                            logger.warning(f"锁文件内容为空: {process_type.name}")
-                            return False
-                            
-                        lock_info = json.loads(content)
-                        timestamp = lock_info.get("timestamp", 0)
-                        pid = lock_info.get("pid", 0)
-                        
-                        # 检查时间戳是否超过超时时间
-                        if time.time() - timestamp > self._lock_timeout:
-                            logger.warning(f"检测到过期的锁: {process_type.name}")
-                            return False
-                            
-                        # 检查进程是否仍在运行
-                        if pid > 0:
-                            try:
-                                process = psutil.Process(pid)
-                                # 如果进程存在但已经结束
-                                if process.status() == psutil.STATUS_ZOMBIE:
-                                    logger.warning(f"持有锁的进程是僵尸进程: {pid}")
-                                    return False
-                            except psutil.NoSuchProcess:
-                                logger.warning(f"持有锁的进程不存在: {pid}")
-                                return False
-                    except (json.JSONDecodeError, IOError) as e:
-                        logger.warning(f"读取锁信息时发生错误: {e}")
-                        return False
-                    
-                    return False
-                except IOError:
-                    # 如果无法获取共享锁，说明有进程持有排他锁，即进程正在运行
-                    # 额外检查持有锁的进程是否仍在运行
-                    try:
-                        # 尝试读取锁文件内容
-                        f.seek(0)
-                        content = f.read().strip()
-                        if content:
-                            try:
-                                lock_info = json.loads(content)
-                                timestamp = lock_info.get("timestamp", 0)
-                                pid = lock_info.get("pid", 0)
-                                if pid > 0:
-                                    try:
-                                        process = psutil.Process(pid)
-                                        # 检查进程是否仍在运行
-                                        if not process.is_running() or process.status() == psutil.STATUS_ZOMBIE:
-                                            logger.warning(f"持有锁的进程已经结束或为僵尸进程: {pid}")
-                                            return False
-                                    except psutil.NoSuchProcess:
-                                        logger.warning(f"持有锁的进程不存在: {pid}")
-                                        return False
-                                # 检查时间戳是否超过超时时间
-                                if time.time() - timestamp > self._lock_timeout:
-                                    logger.warning(f"检测到过期的锁: {process_type.name}")
-                                    return False
-                            except json.JSONDecodeError:
-                                logger.warning(f"无法解析锁文件内容: {process_type.name}")
-                                return False
-                    except Exception as e:
-                        logger.warning(f"读取锁文件内容时发生错误: {e}")
-                        return False
-                    
-                    # 如果以上检查都通过，则认为进程正在运行
-                    logger.info(f"检测到进程正在运行: {process_type.name}")
-                    return True
-        except Exception as e:
-            logger.error(f"检查进程运行状态时发生异常: {e}")
-            return False
+                    os.close(fd)
+                except OSError:
+                    pass
+            cls._probe_fds.clear()
     
     def is_lock_expired(self) -> bool:
         """
@@ -383,52 +440,39 @@ class ProcessLockManager:
         Returns:
             bool: 是否过期
         """
-        if not os.path.exists(self.lock_file_path):
-            return False
-        
         try:
-            # 检查文件大小，如果为0则认为是无效锁
-            if os.path.getsize(self.lock_file_path) == 0:
-                logger.warning(f"锁文件为空: {self.process_type.name}")
-                return True
-                
-            with open(self.lock_file_path, 'r') as f:
-                try:
-                    content = f.read().strip()
-                    # 检查文件内容是否为空
-                    if not content:
-                        logger.warning(f"锁文件内容为空: {self.process_type.name}")
-                        return True
-                        
-                    lock_info = json.loads(content)
-                    timestamp = lock_info.get("timestamp", 0)
-                    pid = lock_info.get("pid", 0)
-                    
-                    # 检查时间戳是否超过超时时间
-                    if time.time() - timestamp > self._lock_timeout:
-                        logger.warning(f"锁已过期: {self.process_type.name}, 超过 {self._lock_timeout} 秒")
-                        return True
-                    
-                    # 检查进程是否仍在运行
-                    if pid > 0:
-                        try:
-                            process = psutil.Process(pid)
-                            # 如果进程存在但已经结束
-                            if process.status() == psutil.STATUS_ZOMBIE:
-                                logger.warning(f"持有锁的进程是僵尸进程: {pid}")
-                                return True
-                        except psutil.NoSuchProcess:
-                            logger.warning(f"持有锁的进程不存在: {pid}")
-                            return True
-                except (json.JSONDecodeError, IOError) as e:
-                    logger.error(f"读取锁信息时发生错误: {e}")
-                    # 如果无法读取锁信息，认为锁已损坏，可以清除
-                    return True
+            fd = os.open(self.lock_file_path, os.O_RDONLY)
+        except FileNotFoundError:
+            return False
         except Exception as e:
             logger.error(f"检查锁是否过期时发生异常: {e}")
             # 如果发生任何异常，认为锁可能已损坏
             return True
         
+        try:
+            lock_info = _read_lock_info(fd)
+        except IOError as e:
+            logger.error(f"读取锁信息时发生错误: {e}")
+            # 如果无法读取锁信息，认为锁已损坏，可以清除
+            return True
+        finally:
+            os.close(fd)
+        
+        if lock_info is None:
+            logger.warning(f"锁文件为空或格式无法识别: {self.process_type.name}")
+            return True
+        
+        # 检查时间戳是否超过超时时间
+        if time.time() - lock_info["timestamp"] > self._lock_timeout:
+            logger.warning(f"锁已过期: {self.process_type.name}, 超过 {self._lock_timeout} 秒")
+            return True
+        
+        # 检查进程是否仍在运行
+        pid = lock_info["pid"]
+        if pid > 0 and not _pid_alive(pid):
+            logger.warning(f"持有锁的进程已结束或为僵尸进程: {pid}")
+            return True
+        
         return False
     
     def force_clear_lock(self, caller_is_script_or_web=False) -> bool:
@@ -474,81 +518,117 @@ class ProcessLockManager:
             Dict: 锁状态信息
         """
         status = {}
+        
+        # 单次 scandir 列出全部锁文件，不存在的类型无需逐个 open/stat
+        try:
+            with os.scandir(cls._lock_dir) as it:
+                entries = {entry.path: entry for entry in it
+                           if entry.name.startswith('cnetCompSpy_') and entry.name.endswith('.lock')}
+        except FileNotFoundError:
+            entries = {}
+        
         for process_type in ProcessType:
-            lock_file = os.path.join(cls._lock_dir, f"cnetCompSpy_{process_type.name.lower()}.lock")
-            if os.path.exists(lock_file):
+            entry = entries.get(cls._LOCK_PATHS[process_type])
+            if entry is None:
+                status[process_type.name] = {'locked': False}
+                continue
+            lock_file = entry.path
+            try:
+                fd = os.open(lock_file, os.O_RDONLY)
+            except FileNotFoundError:
+                status[process_type.name] = {'locked': False}
+                continue
+            except Exception as e:
+                status[process_type.name] = {
+                    'locked': True,
+                    'error': f'读取锁文件时发生错误: {str(e)}'
+                }
+                continue
+            
+            try:
                 try:
-                    with open(lock_file, 'r') as f:
-                        try:
-                            # 尝试获取共享锁（非阻塞模式）
-                            fcntl.flock(f.fileno(), fcntl.LOCK_SH | fcntl.LOCK_NB)
-                            # 如果成功获取共享锁，说明没有进程持有排他锁
-                            has_exclusive_lock = False
-                            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-                        except IOError:
-                            # 如果无法获取共享锁，说明有进程持有排他锁
-                            has_exclusive_lock = True
-                        
-                        try:
-                            f.seek(0)
-                            content = f.read().strip()
-                            
-                            # 检查文件内容是否为空
-                            if not content:
-                                status[process_type.name] = {
-                                    'locked': has_exclusive_lock,
-                                    'error': '锁文件内容为空'
-                                }
-                                continue
-                                
-                            data = json.loads(content)
-                            timestamp = data.get('timestamp', 0)
-                            pid = data.get('pid', 0)
-                            process_type_name = data.get('process_type', 'UNKNOWN')
-                            
-                            # 检查进程是否仍在运行
-                            process_exists = False
-                            if pid > 0:
-                                try:
-                                    process = psutil.Process(pid)
-                                    process_exists = process.is_running() and process.status() != psutil.STATUS_ZOMBIE
-                                except psutil.NoSuchProcess:
-                                    pass
-                            
-                            # 如果进程存在且未过期，强制将 locked 设置为 true，即使未持有排他锁
-                            expired = (time.time() - timestamp) > cls._lock_timeout
-                            effective_locked = has_exclusive_lock or (process_exists and not expired)
-                            
-                            if process_type.name == process_type_name:
-                                status[process_type.name] = {
-                                    'locked': effective_locked,
-                                    'pid': pid,
-                                    'process_exists': process_exists,
-                                    'timestamp': timestamp,
-                                    'timestamp_formatted': data.get('timestamp_formatted', ''),
-                                    'age': time.time() - timestamp,
-                                    'expired': expired,
-                                    'hostname': data.get('hostname', ''),
-                                    'command': data.get('command', ''),
-                                    'start_method': data.get('start_method', 'unknown')
-                                }
-                            else:
-                                status[process_type.name] = {'locked': False}
-                        except json.JSONDecodeError as e:
-                            status[process_type.name] = {
-                                'locked': has_exclusive_lock,
-                                'error': f'无法解析锁文件内容: {str(e)}'
-                            }
-                except Exception as e:
+                    # 尝试获取共享锁（非阻塞模式）
+                    fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+                    # 如果成功获取共享锁，说明没有进程持有排他锁
+                    has_exclusive_lock = False
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                except IOError:
+                    # 如果无法获取共享锁，说明有进程持有排他锁
+                    has_exclusive_lock = True
+                
+                data = cls._cached_lock_record(lock_file, fd, entry.stat(follow_symlinks=False))
+                
+                # 检查文件内容是否为空或无法识别
+                if data is None:
                     status[process_type.name] = {
-                        'locked': True,
-                        'error': f'读取锁文件时发生错误: {str(e)}'
+                        'locked': has_exclusive_lock,
+                        'error': '锁文件内容为空或格式无法识别'
                     }
-            else:
-                status[process_type.name] = {'locked': False}
+                    continue
+                
+                timestamp = data['timestamp']
+                pid = data['pid']
+                
+                # 检查进程是否仍在运行：排他锁被持有即说明写入记录的进程存活，否则再查 pid
+                process_exists = has_exclusive_lock or (pid > 0 and _pid_alive(pid))
+                
+                # 如果进程存在且未过期，强制将 locked 设置为 true，即使未持有排他锁
+                expired = (time.time() - timestamp) > cls._lock_timeout
+                effective_locked = has_exclusive_lock or (process_exists and not expired)
+                
+                if process_type.name == data['process_type']:
+                    status[process_type.name] = {
+                        'locked': effective_locked,
+                        'pid': pid,
+                        'process_exists': process_exists,
+                        'timestamp': timestamp,
+                        'timestamp_formatted': data['timestamp_formatted'],
+                        'age': time.time() - timestamp,
+                        'expired': expired,
+                        'hostname': data['hostname'],
+                        'command': data['command'],
+                        'start_method': data['start_method']
+                    }
+                else:
+                    status[process_type.name] = {'locked': False}
+            except Exception as e:
+                status[process_type.name] = {
+                    'locked': True,
+                    'error': f'读取锁文件时发生错误: {str(e)}'
+                }
+            finally:
+                os.close(fd)
         
         return status
     
+    @classmethod
+    def _cached_lock_record(cls, lock_file: str, fd: int, st: os.stat_result) -> Optional[Dict[str, Any]]:
+        """
+        读取并解码锁记录，按 (inode, mtime_ns, size) 缓存，文件未变化时无需再读取
+        
+        Args:
+            lock_file: 锁文件路径
+            fd: 已打开的锁文件描述符
+            st: 锁文件的 stat 结果（来自 scandir 的 DirEntry）
+            
+        Returns:
+            含格式化时间与启动方式的锁记录；文件为空或无法识别时返回 None
+        """
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with cls._instance_lock:
+            cached = cls._status_cache.get(lock_file)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        
+        data = _read_lock_info(fd)
+        if data is not None:
+            # 格式化时间与启动方式不落盘，解码时推导一次
+            data['timestamp_formatted'] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(data['timestamp']))
+            data['start_method'] = "web" if "web_server" in data['command'] else "shell"
+        with cls._instance_lock:
+            cls._status_cache[lock_file] = (key, data)
+        return data
+    
     @classmethod
     def force_clear_lock_by_type(cls, process_type: ProcessType) -> bool:
         """
@@ -560,7 +640,7 @@ class ProcessLockManager:
         Returns:
             bool: 是否成功清除
         """
-        lock_file = os.path.join(cls._lock_dir, f"cnetCompSpy_{process_type.name.lower()}.lock")
+        lock_file = cls._LOCK_PATHS[process_type]
         if os.path.exists(lock_file):
             try:
                 os.remove(lock_file)
@@ -570,3 +650,6 @@ class ProcessLockManager:
                 logger.error(f"强制清除锁时发生异常: {e}")
                 return False
         return True  # 文件不存在，视为清除成功
+
+
+atexit.register(ProcessLockManager._close_probe_fds)
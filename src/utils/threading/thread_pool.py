@@ -2,11 +2,14 @@
 # -*- coding: utf-8 -*-
 
 import logging
+import math
 import threading
 import time
 import queue
 import os
-from typing import Callable, List, Dict, Any, Tuple, Optional
+from array import array
+from collections import deque
+from typing import Callable, List, Dict, Any, Iterable, NamedTuple, Tuple, Optional, Set
 import datetime
 
 # 创建日志器
@@ -22,17 +25,30 @@ class Colors:
     RESET = '\033[0m'
 
 # MODIFIED: Made log functions more generic for different levels if needed
+# 预先拼好各颜色的日志前缀，每条日志只做一次字符串拼接
+_PREFIX = {color: f"{color}[ThreadPool] " for color in (Colors.YELLOW, Colors.GREEN, Colors.RED, Colors.BLUE, Colors.BOLD)}
+
+def _colored(message: str, color_code: str) -> str:
+    prefix = _PREFIX.get(color_code)
+    if prefix is None:
+        prefix = f"{color_code}[ThreadPool] "
+    return prefix + message + Colors.RESET
+
+# 日志级别未启用时直接返回，不拼接颜色前缀
 def log_info_color(message: str, color_code: str):
     """输出带颜色的INFO日志"""
-    logger.info(f"{color_code}[ThreadPool] {message}{Colors.RESET}")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(_colored(message, color_code))
 
 def log_error_color(message: str, color_code: str):
     """输出带颜色的ERROR日志"""
-    logger.error(f"{color_code}[ThreadPool] {message}{Colors.RESET}")
+    if logger.isEnabledFor(logging.ERROR):
+        logger.error(_colored(message, color_code))
 
 def log_debug_color(message: str, color_code: str):
     """输出带颜色的DEBUG日志 (using logger.debug)"""
-    logger.debug(f"{color_code}[ThreadPool] {message}{Colors.RESET}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(_colored(message, color_code))
 
 
 # Existing specific color log functions (can be kept for convenience or refactored)
@@ -43,12 +59,24 @@ def log_green(message: str):
     log_info_color(message, Colors.GREEN)
 
 def log_red(message: str): # This was logger.error, which is good
-    logger.error(f"{Colors.RED}[ThreadPool] {message}{Colors.RESET}")
+    log_error_color(message, Colors.RED)
 
 def log_blue(message: str):
     log_info_color(message, Colors.BLUE)
 
 
+class _Task(NamedTuple):
+    """任务队列中的任务记录，fn 为 None 表示关闭信号"""
+    fn: Optional[Callable]
+    args: tuple
+    kwargs: dict
+    ident: Optional[str]
+    submit_ns: int
+
+
+_SHUTDOWN_SENTINEL = _Task(None, (), {}, None, 0)
+
+
 class PreciseRateLimiter:
     """精确的API请求频率限制器"""
     
@@ -60,116 +88,201 @@ class PreciseRateLimiter:
             
         self.max_calls = max_calls
         self.window_seconds = window_seconds
-        self.call_timestamps = []
-        self.lock = threading.RLock()
+        self.window_ns = int(window_seconds * 1_000_000_000)
+        # 调用时间戳按时间顺序追加（time.monotonic_ns 整数纳秒，不受系统时钟跳变影响），过期的从左侧弹出
+        self.call_timestamps = deque()
+        # 各方法之间不会嵌套加锁，使用开销更小的非可重入锁
+        self.lock = threading.Lock()
         log_yellow(f"初始化精确API频率限制器: 每 {self.window_seconds} 秒最多 {self.max_calls} 次调用")
     
+    def _evict(self, now_ns: int):
+        """移除窗口外的调用记录（调用方需持有 self.lock）"""
+        timestamps = self.call_timestamps
+        cutoff = now_ns - self.window_ns
+        while timestamps and timestamps[0] <= cutoff:
+            timestamps.popleft()
+    
     def wait(self) -> float:
-        wait_time = 0
+        """
+        等待直到可以发起一次调用，并占用该调用的名额
+        
+        窗口已满时在锁内先登记预定的调用时间（作为"票据"），再在锁外休眠，
+        醒来后无需再次加锁登记；并发等待者各自排在前一个预定时间之后，同一窗口内不会超额放行。
         
+        Returns:
+            float: 实际需要等待的秒数（无需等待时为 0）
+        """
+        # 热路径: 属性先取到局部变量，窗口淘汰内联展开，不经 _evict 的方法调用
+        timestamps = self.call_timestamps
+        max_calls = self.max_calls
+        window_ns = self.window_ns
         with self.lock:
-            current_time = time.time()
-            self.call_timestamps = [t for t in self.call_timestamps if t > current_time - self.window_seconds]
-            current_count_in_window = len(self.call_timestamps)
+            now_ns = time.monotonic_ns()
+            cutoff = now_ns - window_ns
+            while timestamps and timestamps[0] <= cutoff:
+                timestamps.popleft()
+            current_count_in_window = len(timestamps)
             
-            if current_count_in_window >= self.max_calls:
-                oldest_call_in_window = min(self.call_timestamps) if self.call_timestamps else current_time
-                required_wait = (oldest_call_in_window + self.window_seconds) - current_time
-                
-                if required_wait > 0:
-                    wait_time = required_wait
-            
-            if wait_time <= 0:
-                self.call_timestamps.append(time.time())
+            if current_count_in_window < max_calls:
+                timestamps.append(now_ns)
                 return 0
+            
+            # 时间戳（含已预定的）单调递增：新调用需等到倒数第 max_calls 个调用移出窗口
+            admit_ns = timestamps[-max_calls] + window_ns
+            timestamps.append(admit_ns)
+            wait_time = (admit_ns - now_ns) / 1e9
         
-        if wait_time > 0:
-            log_yellow(f"API频率限制: 当前窗口 ({self.window_seconds}s) 已有 {current_count_in_window}/{self.max_calls} 次调用. 将等待 {wait_time:.2f} 秒.")
-            time.sleep(wait_time)
-            with self.lock:
-                self.call_timestamps.append(time.time())
-        
+        log_yellow(f"API频率限制: 当前窗口 ({self.window_seconds}s) 已有 {current_count_in_window}/{self.max_calls} 次调用. 将等待 {wait_time:.2f} 秒.")
+        time.sleep(wait_time)
         return wait_time
     
     def get_current_usage_ratio(self) -> float:
         """Returns the ratio of used slots to max_calls in the current window (0.0 to 1.0)."""
         with self.lock:
-            current_time = time.time()
-            self.call_timestamps = [t for t in self.call_timestamps if t > current_time - self.window_seconds]
+            self._evict(time.monotonic_ns())
             return len(self.call_timestamps) / self.max_calls if self.max_calls > 0 else 0.0
     
     def get_available_slots(self) -> int:
         with self.lock:
-            current_time = time.time()
-            self.call_timestamps = [t for t in self.call_timestamps if t > current_time - self.window_seconds]
+            self._evict(time.monotonic_ns())
             return max(0, self.max_calls - len(self.call_timestamps))
 
     def record_api_call(self):
         with self.lock:
-            self.call_timestamps.append(time.time())
+            self.call_timestamps.append(time.monotonic_ns())
 
 
 class AdaptiveThreadPool:
-    """自适应线程池，根据API调用频率动态调整线程数"""
+    """
+    自适应线程池，根据API调用频率动态调整线程数
+    """
     
-    def __init__(self, api_rate_limit, initial_threads=2, max_threads=20, monitor_interval=30, shutdown_join_timeout=65):
+    # 排队时间/处理时间 EWMA 的平滑系数
+    EWMA_ALPHA = 0.1
+    # 缩容条件: 排队时间 EWMA 低于该值（毫秒）且空闲线程比例超过阈值
+    SCALE_IN_WAIT_MS = 1.0
+    SCALE_IN_IDLE_RATIO = 0.5
+    # 距上次调整不足该时间（秒）时不缩容，避免扩缩容来回抖动
+    SCALE_COOLDOWN_SECONDS = 5.0
+    # 工作线程一次从队列最多取出的任务数
+    WORKER_BATCH_SIZE = 8
+    
+    def __init__(self, api_rate_limit, initial_threads=2, max_threads=20, monitor_interval=30, shutdown_join_timeout=65,
+                 min_threads=1):
         self.api_rate_limit = api_rate_limit
         self.max_threads = max(1, max_threads)
+        self.min_threads = max(1, min(min_threads, self.max_threads))
         self.current_threads_target = initial_threads
         
-        self.task_queue = queue.Queue()
+        # 所有工作线程共享同一个任务队列：线程数上限很小且任务受 API 频率限制，
+        # 队列锁不是瓶颈；按线程分片需要轮询窃取任务，反而增加空转唤醒和关闭时的残留任务处理。
+        # 线程池从不 join() 队列，使用 C 实现、无任务计数的 SimpleQueue
+        self.task_queue = queue.SimpleQueue()
         self.rate_limiter = PreciseRateLimiter(api_rate_limit if api_rate_limit > 0 else 600, 60)
         
         self.active = False
         self.active_threads_count = 0
+        # _adjust_thread_count 持有该锁时会调用 _start_worker_thread 再次加锁，需要可重入；
+        # 其余锁保护的临界区都不会嵌套获取自身，使用开销更小的 Lock
         self.active_threads_lock = threading.RLock()
         
-        self.state_lock = threading.RLock()
+        self.state_lock = threading.Lock()
         
-        self.worker_threads = []
-        self.thread_ids = {} 
+        # 工作线程集合及线程对象 -> 自定义编号的映射，增删与按线程查编号均为 O(1)
+        self.worker_threads: Set[threading.Thread] = set()
+        self.thread_ids: Dict[threading.Thread, int] = {}
         self.next_thread_id = 1
-        self.thread_id_lock = threading.RLock()
+        self.thread_id_lock = threading.Lock()
         
-        self.results = []
-        self.results_lock = threading.RLock()
-
-        self.thread_task_info: Dict[int, str] = {} 
-        self.thread_task_info_lock = threading.RLock()
+        # deque.append 与 list(deque) 都在一次 C 调用内完成，持有 GIL 期间不会被打断，收集结果无需加锁
+        self.results: deque = deque()
+
+        # 释放的线程编号会被复用，编号不超过 max_threads（等待超时未退出的线程除外）
+        self._free_thread_ids: Set[int] = set()
+
+        # 各工作线程正在执行的任务名称，下标为线程编号 - 1；每个位置只由对应的工作线程写入，无需加锁
+        self.thread_task_info: List[Optional[str]] = [None] * self.max_threads
+        # 每个工作线程各自的已完成任务数与累计耗时（毫秒），下标为线程编号（从 1 开始，下标 0 不使用）；
+        # 工作线程只写自己的位置，无需加锁，统计时直接求和（可能略有滞后，不影响统计用途）
+        self._completed = array('q', [0] * (self.max_threads + 1))
+        self._total_ms = array('d', [0.0] * (self.max_threads + 1))
         
         self.performance_metrics = {
             'api_utilization': 0.0,
             'queue_size': 0,
             'avg_processing_time_ms': 0.0,
+            # completed_tasks/total_processing_time_ms 为监控线程汇总各线程计数时的快照
             'completed_tasks': 0,
             'total_processing_time_ms': 0.0,
+            # 任务从提交到开始执行的排队时间、执行耗时的指数加权移动平均（毫秒），尚无样本时为 None
+            'ewma_wait_ms': None,
+            'ewma_service_ms': None,
         }
-        self.metrics_lock = threading.RLock()
+        self.metrics_lock = threading.Lock()
         self.monitor_interval = monitor_interval
         self.shutdown_join_timeout = shutdown_join_timeout
         self.tasks_submitted_this_activation = 0
+        # 已入队但尚未被工作线程取出的任务数（不含关闭信号），与提交计数一起由 _pending_lock 保护，
+        # 热路径上无需读取队列大小
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        # 有任务提交或完成时置位，监控线程据此决定是否输出摘要，空闲时不做任何统计
+        self._dirty = threading.Event()
+        # 已放入缩容关闭信号、尚未退出的工作线程数，以及上次调整线程数的时间，均由 active_threads_lock 保护
+        self._retiring = 0
+        self._last_scale_ns = 0
+        # shutdown(wait=False) 时置位，工作线程丢弃已批量取出但尚未执行的任务
+        self._cancel_queued = False
         
         log_yellow(f"线程池定义: 初始目标={initial_threads}, 最大={self.max_threads}, API限制={api_rate_limit}/分钟, "
                    f"监控间隔={monitor_interval}s, 关闭等待超时={self.shutdown_join_timeout}s")
     
     def add_task(self, task_func: Callable, *args: Any, **kwargs: Any) -> bool:
+        task_meta = kwargs.pop('task_meta', {})
+        if 'task_identifier' in kwargs and not task_meta:
+            task_meta = {'identifier': kwargs.pop('task_identifier')}
+        
+        return self.add_tasks([(task_func, args, kwargs, task_meta)])
+    
+    def add_tasks(self, batch: Iterable[Tuple[Callable, tuple, dict, Optional[Dict[str, Any]]]]) -> bool:
+        """
+        批量添加任务，整批只更新一次计数、调整一次线程数
+        
+        Args:
+            batch: (task_func, args, kwargs, task_meta) 元组的可迭代对象，task_meta 可为 None，
+                   其中的 'identifier' 用作任务名称
+            
+        Returns:
+            bool: 所有任务都已提交时返回 True
+        """
         if not self.active:
             log_red("线程池未激活或已关闭，无法添加新任务")
             return False
         
-        task_meta = kwargs.pop('task_meta', {})
-        task_identifier = task_meta.get('identifier', f'未命名任务@{time.strftime("%H:%M:%S")}')
-
-        if 'task_identifier' in kwargs and not task_meta:
-            task_identifier = kwargs.pop('task_identifier')
-
-        self.task_queue.put((task_func, args, kwargs, task_identifier))
+        default_identifier = f'未命名任务@{time.strftime("%H:%M:%S")}'
+        tasks = [(task_func, args, kwargs, (task_meta or {}).get('identifier', default_identifier))
+                 for task_func, args, kwargs, task_meta in batch]
+        if not tasks:
+            return True
+
+        with self._pending_lock:
+            self._pending += len(tasks)
+            self.tasks_submitted_this_activation += len(tasks)
+            pending = self._pending
         
-        with self.metrics_lock:
-            self.performance_metrics['queue_size'] = self.task_queue.qsize()
-            self.tasks_submitted_this_activation += 1
+        self._mark_dirty()
+        submit_ns = time.monotonic_ns()
+        put = self.task_queue.put
+        for task_func, args, kwargs, task_identifier in tasks:
+            put(_Task(task_func, args, kwargs, task_identifier, submit_ns))
         
-        log_blue(f"新任务 '{task_identifier}' 已添加到队列 (ID: {id(task_func)}), 当前队列大小: {self.task_queue.qsize()}")
+        # 每个任务都会经过的日志降为 DEBUG，并在级别未启用时跳过 f-string 的拼接
+        if logger.isEnabledFor(logging.DEBUG):
+            if len(tasks) == 1:
+                task_func, _, _, task_identifier = tasks[0]
+                log_debug_color(f"新任务 '{task_identifier}' 已添加到队列 (ID: {id(task_func)}), 当前队列大小: {pending}", Colors.BLUE)
+            else:
+                log_debug_color(f"批量添加 {len(tasks)} 个任务到队列, 当前队列大小: {pending}", Colors.BLUE)
         
         self._adjust_thread_count()
         return True
@@ -183,10 +296,18 @@ class AdaptiveThreadPool:
             self.active = True
             log_green("线程池已激活")
             
-            self.results = []
+            self.results = deque()
             with self.metrics_lock:
                 self.performance_metrics['completed_tasks'] = 0
                 self.performance_metrics['total_processing_time_ms'] = 0.0
+                self._completed = array('q', [0] * len(self._completed))
+                self._total_ms = array('d', [0.0] * len(self._total_ms))
+                self.performance_metrics['ewma_wait_ms'] = None
+                self.performance_metrics['ewma_service_ms'] = None
+            with self.active_threads_lock:
+                self._retiring = 0
+            self._cancel_queued = False
+            with self._pending_lock:
                 self.tasks_submitted_this_activation = 0
             
             for _ in range(self.current_threads_target):
@@ -209,47 +330,51 @@ class AdaptiveThreadPool:
 
             log_yellow("线程池开始关闭流程...")
             self.active = False
-            
+            # 唤醒监控线程使其尽快退出
+            self._dirty.set()
+
+            # active 已置为 False，之后不会再创建工作线程；每个现存工作线程恰好对应一个关闭信号
             current_worker_list = []
             with self.active_threads_lock:
                 current_worker_list = list(self.worker_threads)
-            
-            num_potential_workers_to_signal = len(current_worker_list)
+                num_potential_workers_to_signal = self.active_threads_count
+
+            if not wait:
+                self._cancel_queued = True
+                # 不等待时直接换上新队列，旧队列中的待处理任务整体作废，无需逐个取出再放回关闭信号
+                old_task_queue = self.task_queue
+                self.task_queue = queue.SimpleQueue()
 
             if num_potential_workers_to_signal > 0:
                 log_yellow(f"准备发送 {num_potential_workers_to_signal} 个关闭信号到任务队列 (一个给每个当前工作线程)...")
                 for _ in range(num_potential_workers_to_signal):
-                    self.task_queue.put((None, (), {}, None))
+                    self.task_queue.put(_SHUTDOWN_SENTINEL)
             else:
                 log_yellow("没有活动的工作线程需要发送关闭信号。队列中的任务可能不会被处理。")
 
-            if not wait:
-                cleared_tasks = 0
-                temp_sentinels_holder = []
-                while not self.task_queue.empty():
-                    try:
-                        task_tuple = self.task_queue.get_nowait()
-                        if task_tuple[0] is not None:
-                            cleared_tasks +=1
-                            log_debug_color(f"任务 '{task_tuple[3] if len(task_tuple) > 3 else '未知'}' 在非等待关闭时被移除。", Colors.RED)
-                        else:
-                            temp_sentinels_holder.append(task_tuple)
-                    except queue.Empty:
-                        break
-                for item in temp_sentinels_holder: 
-                    self.task_queue.put(item)
-                if cleared_tasks > 0:
-                    log_yellow(f"关闭时清理了 {cleared_tasks} 个未处理的任务 (wait=False).")
+        if not wait:
+            # 旧队列已不再接收任务，在 state_lock 之外取出作废的任务仅用于计数和日志
+            cleared_tasks = 0
+            try:
+                while True:
+                    task = old_task_queue.get_nowait()
+                    if task.fn is not None:
+                        cleared_tasks += 1
+                        log_debug_color(f"任务 '{task.ident or '未知'}' 在非等待关闭时被移除。", Colors.RED)
+            except queue.Empty:
+                pass
+            # 空闲线程仍阻塞在旧队列上，同样给它们放入关闭信号；多余的信号随旧队列一起回收
+            for _ in range(num_potential_workers_to_signal):
+                old_task_queue.put(_SHUTDOWN_SENTINEL)
+            with self._pending_lock:
+                self._pending -= cleared_tasks
+            if cleared_tasks > 0:
+                log_yellow(f"关闭时清理了 {cleared_tasks} 个未处理的任务 (wait=False).")
 
         if current_worker_list: 
             log_yellow(f"等待所有 {len(current_worker_list)} 个工作线程完成队列中的剩余任务并退出...")
             for thread_obj in current_worker_list: 
-                thread_custom_id_str = "未知"
-                with self.thread_id_lock:
-                    for tid, t_obj_stored in self.thread_ids.items():
-                         if t_obj_stored == thread_obj:
-                             thread_custom_id_str = str(tid)
-                             break
+                thread_custom_id_str = str(self.thread_ids.get(thread_obj, "未知"))
                 
                 if thread_obj.is_alive():
                     log_yellow(f"等待线程 #{thread_custom_id_str} ({thread_obj.name}) 退出 (超时: {self.shutdown_join_timeout}s)...")
@@ -270,15 +395,18 @@ class AdaptiveThreadPool:
                 self.active_threads_count = 0
 
         final_unprocessed_tasks = []
+        drained_sentinels = 0
         try:
             while True:
-                task_tuple = self.task_queue.get_nowait()
-                if task_tuple[0] is not None:
-                    task_identifier = task_tuple[3] if len(task_tuple) > 3 and task_tuple[3] else "未知任务"
-                    final_unprocessed_tasks.append(task_identifier)
-                self.task_queue.task_done()
+                task = self.task_queue.get_nowait()
+                if task.fn is not None:
+                    final_unprocessed_tasks.append(task.ident or "未知任务")
+                else:
+                    drained_sentinels += 1
         except queue.Empty:
             pass
+        with self._pending_lock:
+            self._pending -= len(final_unprocessed_tasks)
 
         if final_unprocessed_tasks:
             log_red(f"线程池关闭后，队列中仍发现 {len(final_unprocessed_tasks)} 个未处理的任务: {', '.join(final_unprocessed_tasks)}")
@@ -286,17 +414,35 @@ class AdaptiveThreadPool:
              log_yellow(f"线程池关闭后，队列中仍有 {self.task_queue.qsize()} 个项目(异常情况).")
         else:
             log_green("线程池关闭后，任务队列已清空.")
+
+        # 等待超时仍在执行任务的线程还需要各自的关闭信号，否则完成当前任务后会一直阻塞在队列上
+        still_running = sum(1 for thread_obj in current_worker_list if thread_obj.is_alive())
+        for _ in range(min(drained_sentinels, still_running)):
+            self.task_queue.put(_SHUTDOWN_SENTINEL)
     
     def get_results(self) -> List[Any]:
-        with self.results_lock:
-            return list(self.results)
+        return list(self.results)
     
     def _get_next_thread_id(self) -> int:
+        """分配线程编号，优先复用最小的已释放编号"""
         with self.thread_id_lock:
+            if self._free_thread_ids:
+                tid = min(self._free_thread_ids)
+                self._free_thread_ids.discard(tid)
+                return tid
             tid = self.next_thread_id
             self.next_thread_id += 1
+            if tid > len(self.thread_task_info):
+                self.thread_task_info.append(None)
+                self._completed.append(0)
+                self._total_ms.append(0.0)
             return tid
 
+    def _release_thread_id(self, thread_custom_id: int):
+        self.thread_task_info[thread_custom_id - 1] = None
+        with self.thread_id_lock:
+            self._free_thread_ids.add(thread_custom_id)
+
     def _start_worker_thread(self):
         with self.active_threads_lock:
             if not self.active:
@@ -308,11 +454,14 @@ class AdaptiveThreadPool:
 
             thread_custom_id = self._get_next_thread_id()
             
+            # 工作线程必须是守护线程: 工作循环会一直阻塞在任务队列上，直到收到关闭信号。
+            # 若改由 ThreadPoolExecutor 承载，其线程在解释器退出时会被 join，调用方忘记 shutdown 时进程将无法退出；
+            # 线程数上限很小且线程在一次激活期间常驻，线程创建开销不值得为此冒险
             worker = threading.Thread(target=self._worker_loop, args=(thread_custom_id,), 
                                       name=f"WorkerThread-{thread_custom_id}")
             worker.daemon = True
             
-            self.worker_threads.append(worker)
+            self.worker_threads.add(worker)
             self.thread_ids[worker] = thread_custom_id 
             self.active_threads_count += 1
             
@@ -321,127 +470,205 @@ class AdaptiveThreadPool:
 
     def _remove_worker_thread_record(self, thread_obj: threading.Thread, thread_custom_id: int):
         with self.active_threads_lock:
-            if thread_obj in self.worker_threads:
-                self.worker_threads.remove(thread_obj)
-            if thread_obj in self.thread_ids: 
-                del self.thread_ids[thread_obj]
-        with self.thread_task_info_lock:
-            self.thread_task_info.pop(thread_custom_id, None)
+            self.worker_threads.discard(thread_obj)
+            self.thread_ids.pop(thread_obj, None)
+        self._release_thread_id(thread_custom_id)
 
 
     def _worker_loop(self, thread_custom_id: int):
         log_blue(f"线程 #{thread_custom_id} ({threading.current_thread().name}) 进入工作循环.")
         
         try:
-            while True:
-                task_identifier_for_log = '无任务'
-                with self.thread_task_info_lock:
-                    self.thread_task_info.pop(thread_custom_id, None)
-
-                task_data = None
-                try:
-                    task_data = self.task_queue.get(block=True, timeout=1.0) 
-                except queue.Empty:
-                    if not self.active and self.task_queue.empty():
-                        log_yellow(f"线程 #{thread_custom_id} 等待任务超时，线程池已关闭且队列确认已空，准备退出.")
+            running = True
+            while running:
+                # 阻塞等待任务，不做超时轮询；关闭时 shutdown 为每个工作线程放入一个关闭信号
+                batch = [self.task_queue.get()]
+                # 积压任务远多于工作线程时一次多取几个，减少队列加锁次数；
+                # 积压不多时只取一个，避免一个线程囤积任务而其他线程空闲
+                extra = min(self.WORKER_BATCH_SIZE, self._pending // max(1, self.active_threads_count)) - 1
+                if extra > 0:
+                    get_nowait = self.task_queue.get_nowait
+                    try:
+                        for _ in range(extra):
+                            batch.append(get_nowait())
+                    except queue.Empty:
+                        pass
+
+                for index, task in enumerate(batch):
+                    if task is None or task.fn is None:
+                        if task is None:
+                            log_red(f"线程 #{thread_custom_id} 从队列获取到裸 None (异常情况)，将视为关闭信号并退出.")
+                        else:
+                            log_yellow(f"线程 #{thread_custom_id} 收到关闭信号 (sentinel)，完成任务队列处理，准备退出.")
+                        # 关闭信号之后一并取出的任务放回队列，交给其他线程
+                        for remaining in batch[index + 1:]:
+                            self.task_queue.put(remaining)
+                        running = False
                         break
-                    continue 
-                
-                if task_data is None:
-                    log_red(f"线程 #{thread_custom_id} 从队列获取到裸 None (异常情况)，将视为关闭信号并退出.")
-                    self.task_queue.task_done()
-                    break
-
-                task_func, task_args, task_kwargs, task_identifier = task_data
-                task_identifier_for_log = task_identifier
-
-                if task_func is None:
-                    log_yellow(f"线程 #{thread_custom_id} 收到关闭信号 (sentinel)，完成任务队列处理，准备退出.")
-                    self.task_queue.task_done()
-                    break
-
-                log_blue(f"线程 #{thread_custom_id} 获取到任务: '{task_identifier}'")
-                with self.thread_task_info_lock:
-                    self.thread_task_info[thread_custom_id] = task_identifier
+                    if index and self._cancel_queued:
+                        dropped = len(batch) - index
+                        with self._pending_lock:
+                            self._pending -= dropped
+                        log_yellow(f"线程 #{thread_custom_id} 丢弃 {dropped} 个已取出但未执行的任务 (wait=False).")
+                        break
+                    self._run_task(thread_custom_id, task)
                 
-                task_start_time = time.monotonic()
-                try:
-                    log_green(f"线程 #{thread_custom_id} 开始处理任务: '{task_identifier}'")
-                    result = task_func(*task_args, **task_kwargs)
-                    duration_ms = (time.monotonic() - task_start_time) * 1000
-                    log_green(f"线程 #{thread_custom_id} 成功完成任务: '{task_identifier}', 耗时: {duration_ms:.2f}ms")
-                    with self.results_lock:
-                        self.results.append(result)
-                    with self.metrics_lock:
-                        self.performance_metrics['completed_tasks'] += 1
-                        self.performance_metrics['total_processing_time_ms'] += duration_ms
-                except Exception as e:
-                    duration_ms = (time.monotonic() - task_start_time) * 1000
-                    log_red(f"线程 #{thread_custom_id} 执行任务 '{task_identifier_for_log}' 失败: {e} (类型: {type(e).__name__}), 耗时: {duration_ms:.2f}ms")
-                finally:
-                    self.task_queue.task_done()
-                    with self.thread_task_info_lock:
-                        self.thread_task_info.pop(thread_custom_id, None)
+                if running and self._pending == 0:
+                    # 队列已空，检查是否可以缩容
+                    self._adjust_thread_count()
         finally:
             log_yellow(f"线程 #{thread_custom_id} ({threading.current_thread().name}) 停止工作并退出循环.")
             with self.active_threads_lock:
                 self.active_threads_count -= 1
+                if self._retiring > 0:
+                    self._retiring -= 1
                 log_yellow(f"线程 #{thread_custom_id} 已停止. 当前活动线程: {self.active_threads_count}")
                 
                 current_thread_obj = threading.current_thread()
-                if current_thread_obj in self.worker_threads:
-                    self.worker_threads.remove(current_thread_obj)
-                if current_thread_obj in self.thread_ids:
-                    del self.thread_ids[current_thread_obj]
-            with self.thread_task_info_lock:
-                self.thread_task_info.pop(thread_custom_id, None)
+                self.worker_threads.discard(current_thread_obj)
+                self.thread_ids.pop(current_thread_obj, None)
+            self._release_thread_id(thread_custom_id)
+
+    def _run_task(self, thread_custom_id: int, task: _Task):
+        """在当前工作线程中执行一个任务，记录结果、耗时与排队时间"""
+        task_func, task_args, task_kwargs, task_identifier, submit_ns = task
+        with self._pending_lock:
+            self._pending -= 1
+
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        if debug_enabled:
+            log_debug_color(f"线程 #{thread_custom_id} 获取到任务: '{task_identifier}'", Colors.BLUE)
+        self.thread_task_info[thread_custom_id - 1] = task_identifier
+        
+        task_start_ns = time.monotonic_ns()
+        wait_ms = (task_start_ns - submit_ns) / 1e6
+        try:
+            if debug_enabled:
+                log_debug_color(f"线程 #{thread_custom_id} 开始处理任务: '{task_identifier}'", Colors.GREEN)
+            result = task_func(*task_args, **task_kwargs)
+            duration_ms = (time.monotonic_ns() - task_start_ns) / 1e6
+            if debug_enabled:
+                log_debug_color(f"线程 #{thread_custom_id} 成功完成任务: '{task_identifier}', 耗时: {duration_ms:.2f}ms", Colors.GREEN)
+            self.results.append(result)
+            self._completed[thread_custom_id] += 1
+            self._total_ms[thread_custom_id] += duration_ms
+            with self.metrics_lock:
+                self._update_latency_ewma(wait_ms, duration_ms)
+        except Exception as e:
+            duration_ms = (time.monotonic_ns() - task_start_ns) / 1e6
+            with self.metrics_lock:
+                self._update_latency_ewma(wait_ms, duration_ms)
+            log_red(f"线程 #{thread_custom_id} 执行任务 '{task_identifier}' 失败: {e} (类型: {type(e).__name__}), 耗时: {duration_ms:.2f}ms")
+        finally:
+            self.thread_task_info[thread_custom_id - 1] = None
+            self._mark_dirty()
+
+    def _update_latency_ewma(self, wait_ms: float, service_ms: float):
+        """用一个任务的排队时间和执行耗时更新 EWMA（调用方需持有 self.metrics_lock）"""
+        metrics = self.performance_metrics
+        alpha = self.EWMA_ALPHA
+        for key, sample in (('ewma_wait_ms', wait_ms), ('ewma_service_ms', service_ms)):
+            previous = metrics[key]
+            metrics[key] = sample if previous is None else (1 - alpha) * previous + alpha * sample
 
     def _adjust_thread_count(self):
+        """
+        根据任务排队时间调整工作线程数
+        
+        扩容: 目标 = ceil(排队时间EWMA / 执行耗时EWMA × 当前线程数)，积压任务多于线程数时至少加一个，
+        不超过 max_threads 和积压任务数；缩容: 队列为空、排队时间EWMA低于阈值且空闲线程比例超过阈值时，
+        放入一个关闭信号让一个空闲线程退出，最少保留 min_threads 个，且距上次调整需超过冷却时间。
+        """
         with self.active_threads_lock:
             if not self.active:
                 return
 
-            q_size = self.task_queue.qsize()
-            current_active = self.active_threads_count
+            q_size = self._pending
+            current_active = self.active_threads_count - self._retiring
+            with self.metrics_lock:
+                ewma_wait_ms = self.performance_metrics['ewma_wait_ms'] or 0.0
+                ewma_service_ms = self.performance_metrics['ewma_service_ms'] or 0.0
             
-            new_target_threads = self.current_threads_target
-
-            if q_size > current_active and current_active < self.max_threads:
-                new_target_threads = min(self.max_threads, current_active + 1)
-            elif q_size == 0 and current_active > 1 :
-                pass
-
+            new_target_threads = current_active
+            now_ns = time.monotonic_ns()
+
+            if q_size > 0 and current_active < self.max_threads:
+                if ewma_service_ms > 0:
+                    new_target_threads = max(new_target_threads,
+                                             math.ceil(ewma_wait_ms / ewma_service_ms * current_active))
+                if q_size > current_active:
+                    new_target_threads = max(new_target_threads, current_active + 1)
+                new_target_threads = min(self.max_threads, new_target_threads, current_active + q_size)
+            elif (q_size == 0 and current_active > self.min_threads and ewma_wait_ms < self.SCALE_IN_WAIT_MS
+                  and now_ns - self._last_scale_ns >= self.SCALE_COOLDOWN_SECONDS * 1e9):
+                busy_threads = sum(1 for task_identifier in self.thread_task_info if task_identifier is not None)
+                idle_threads = current_active - busy_threads
+                if idle_threads / current_active > self.SCALE_IN_IDLE_RATIO:
+                    new_target_threads = current_active - 1
+
+            if new_target_threads == current_active:
+                return
 
-            if new_target_threads != self.current_threads_target:
-                log_yellow(f"线程池动态调整: 任务队列大小={q_size}, 当前活动线程={current_active}. 目标工作线程数从 {self.current_threads_target} 变更为 {new_target_threads}")
-                self.current_threads_target = new_target_threads
+            log_yellow(f"线程池动态调整: 任务队列大小={q_size}, 当前活动线程={current_active}, "
+                       f"排队/执行耗时EWMA={ewma_wait_ms:.2f}/{ewma_service_ms:.2f}ms. "
+                       f"目标工作线程数从 {self.current_threads_target} 变更为 {new_target_threads}")
+            self.current_threads_target = new_target_threads
+            self._last_scale_ns = now_ns
 
-            if self.current_threads_target > current_active:
-                for _ in range(self.current_threads_target - current_active):
+            if new_target_threads > current_active:
+                for _ in range(new_target_threads - current_active):
                     if self.active_threads_count < self.max_threads:
                          self._start_worker_thread()
                     else:
                         break 
+            else:
+                self._retiring += 1
+                self.task_queue.put(_SHUTDOWN_SENTINEL)
+
+    def _mark_dirty(self):
+        """标记线程池状态有变化；已置位时只读标志，不去争用 Event 内部的锁"""
+        if not self._dirty.is_set():
+            self._dirty.set()
 
     def _monitor_performance(self):
         log_debug_color("性能监控线程启动.", Colors.GREEN)
+        last_emit = time.monotonic()
         while self.active: 
-            time.sleep(self.monitor_interval)
+            signalled = self._dirty.wait(self.monitor_interval)
             if not self.active : break
+            # 状态持续变化时也至少间隔 monitor_interval 才统计一次
+            remaining = last_emit + self.monitor_interval - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+                if not self.active : break
+            self._dirty.clear()
+            if self.active_threads_count > self.min_threads:
+                # 空闲期间没有任务完成来触发缩容检查，由监控线程周期性检查
+                self._adjust_thread_count()
+            if not signalled:
+                # 整个周期内没有任务提交或完成，跳过统计和摘要
+                continue
+            last_emit = time.monotonic()
+
+            completed_this_activation = sum(self._completed)
+            total_processing_time_ms = sum(self._total_ms)
+            avg_time_ms = 0.0
+            if completed_this_activation > 0:
+                avg_time_ms = total_processing_time_ms / completed_this_activation
 
             with self.metrics_lock:
-                q_size = self.performance_metrics['queue_size'] = self.task_queue.qsize()
-                completed_this_activation = self.performance_metrics['completed_tasks']
+                q_size = self.performance_metrics['queue_size'] = self._pending
                 total_submitted_this_activation = self.tasks_submitted_this_activation
-                total_processing_time_ms = self.performance_metrics['total_processing_time_ms']
-                
-                avg_time_ms = 0.0
-                if completed_this_activation > 0:
-                    avg_time_ms = total_processing_time_ms / completed_this_activation
+                self.performance_metrics['completed_tasks'] = completed_this_activation
+                self.performance_metrics['total_processing_time_ms'] = total_processing_time_ms
+                self.performance_metrics['avg_processing_time_ms'] = avg_time_ms
                 
                 api_usage_percent = self.rate_limiter.get_current_usage_ratio() * 100
                 self.performance_metrics['api_utilization'] = api_usage_percent
 
+            if not logger.isEnabledFor(logging.DEBUG):
+                continue
+
             with self.active_threads_lock:
                  active_threads = self.active_threads_count
                  target_threads = self.current_threads_target
@@ -475,11 +702,9 @@ class AdaptiveThreadPool:
                 f"    - 已完成任务总数 (当前会话): {completed_this_activation}"
             ])
 
-            active_tasks_details = []
-            with self.thread_task_info_lock:
-                if self.thread_task_info:
-                    for tid, task_id_str in self.thread_task_info.items():
-                        active_tasks_details.append(f"    - 线程 #{tid} -> '{task_id_str}'")
+            active_tasks_details = [f"    - 线程 #{index + 1} -> '{task_id_str}'"
+                                    for index, task_id_str in enumerate(list(self.thread_task_info))
+                                    if task_id_str is not None]
             
             if active_tasks_details:
                 summary_lines.append(f"  {Colors.BLUE}[活动任务详情 (最多显示几个)]{Colors.RESET}")
@@ -6,9 +6,9 @@ Pytest 共享 Fixtures
 
 import os
 import sys
+import itertools
 import pytest
-import tempfile
-import shutil
+from types import MappingProxyType
 
 # 添加项目根目录到路径
 PROJECT_ROOT = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
@@ -21,38 +21,83 @@ def project_root():
     return PROJECT_ROOT
 
 
-@pytest.fixture(scope="function")
-def temp_db_path():
-    """创建临时测试数据库路径"""
-    temp_dir = tempfile.mkdtemp()
-    db_path = os.path.join(temp_dir, "test_updates.db")
-    yield db_path
-    # 清理
-    shutil.rmtree(temp_dir, ignore_errors=True)
+@pytest.fixture(scope="session")
+def tmp_db_dir(tmp_path_factory):
+    """整个测试会话共用的临时数据库目录，由 pytest 统一清理"""
+    return tmp_path_factory.mktemp("db")
+
+
+_db_file_seq = itertools.count(1)
 
 
 @pytest.fixture(scope="function")
-def data_layer(temp_db_path):
-    """创建测试用 UpdateDataLayer 实例"""
+def temp_db_path(tmp_db_dir):
+    """创建临时测试数据库路径（共用会话目录，每个用例一个独立文件）"""
+    return str(tmp_db_dir / f"test_updates_{next(_db_file_seq)}.db")
+
+
+@pytest.fixture(scope="session")
+def _db_session(tmp_path_factory):
+    """整个测试会话共用的 UpdateDataLayer，表结构只建一次"""
     from src.storage.database import UpdateDataLayer
     from src.storage.database.base import DatabaseManager
     
-    # 重置 DatabaseManager 单例，确保使用临时数据库
+    db_path = str(tmp_path_factory.mktemp("data_layer") / "test_updates.db")
     with DatabaseManager._lock:
         DatabaseManager._instance = None
-    
-    layer = UpdateDataLayer(db_path=temp_db_path)
+    layer = UpdateDataLayer(db_path=db_path)
+    with DatabaseManager._lock:
+        DatabaseManager._instance = None
+    # 保持与生产一致的 WAL 模式和连接参数，不为提速改用 MEMORY 日志
     yield layer
+    layer._db_manager.close_connection()
+
+
+@pytest.fixture(scope="session")
+def _db_truncate_sql(_db_session):
+    """清空会话级数据库所有数据的 SQL 脚本（表结构不变，只需生成一次）"""
+    with _db_session._db_manager.get_connection() as conn:
+        # 用例之间清空的表（不含 FTS 影子表和 sqlite_ 内部表）: 先删 updates，其删除触发器会改写
+        # update_tags/updates_fts；有外键的子表排在其余表之前；最后重置自增序列。
+        # 用 sqlite_master 而非 PRAGMA table_list（需 SQLite 3.37+，旧版本返回空结果）
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND name NOT LIKE 'sqlite_%' AND name NOT LIKE 'updates_fts_%'"
+        )]
+        assert 'updates' in tables, f"未找到需要清空的表: {tables}"
+        children = [name for name in tables
+                    if name != 'updates' and conn.execute(f'PRAGMA foreign_key_list({name})').fetchone()]
+        ordered = ['updates'] + children + [name for name in tables if name != 'updates' and name not in children]
+    return (
+        "BEGIN;"
+        + "".join(f"DELETE FROM {name};" for name in ordered)
+        + "DELETE FROM sqlite_sequence;"
+        + "COMMIT;"
+    )
+
+
+@pytest.fixture(scope="function")
+def data_layer(_db_session, _db_truncate_sql):
+    """创建测试用 UpdateDataLayer 实例（复用会话级数据库，每个用例开始前清空所有表）"""
+    from src.storage.database.base import DatabaseManager
+    
+    manager = _db_session._db_manager
+    with manager.get_connection() as conn:
+        conn.executescript(_db_truncate_sql)
     
-    # 清理：重置单例
+    # 其他用例可能替换或重置了 DatabaseManager 单例，这里装回会话级实例，
+    # 被测代码内部直接构造 DatabaseManager() 时同样落到测试库
+    with DatabaseManager._lock:
+        DatabaseManager._instance = manager
+    yield _db_session
     with DatabaseManager._lock:
         DatabaseManager._instance = None
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_update_data():
-    """示例更新数据"""
-    return {
+    """示例更新数据（会话内共享的只读映射，需要修改时先 dict() 复制）"""
+    return MappingProxyType({
         "update_id": "test-update-001",
         "vendor": "aws",
         "source_channel": "blog",
@@ -66,43 +111,42 @@ def sample_update_data():
         "product_name": "VPC",
         "product_category": "Networking",
         "raw_filepath": "/data/raw/aws/test.json"
-    }
+    })
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_analysis_result():
-    """示例分析结果"""
-    return {
+    """示例分析结果（会话内共享的只读映射）"""
+    return MappingProxyType({
         "title_translated": "测试 AWS 网络更新",
         "content_summary": "这是一个用于CI/CD的测试更新",
         "update_type": "new_feature",
         "product_subcategory": "Virtual Private Cloud",
         "is_network_related": True,
         "tags": '["VPC", "网络", "测试"]'
-    }
+    })
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def batch_update_data():
-    """批量测试数据"""
+    """批量测试数据（会话内共享的只读元组，每条记录为只读映射）"""
     vendors = ["aws", "azure", "gcp", "huawei", "tencentcloud", "volcengine"]
     channels = ["blog", "whatsnew"]
-    updates = []
-    
-    for i, vendor in enumerate(vendors):
-        for j, channel in enumerate(channels):
-            idx = i * len(channels) + j
-            updates.append({
-                "update_id": f"batch-{vendor}-{channel}-{idx}",
-                "vendor": vendor,
-                "source_channel": channel,
-                "source_url": f"https://{vendor}.com/{channel}/post-{idx}",
-                "source_identifier": f"{vendor}-{channel}-post-{idx}",
-                "title": f"Test {vendor.upper()} {channel} Update {idx}",
-                "description": f"Test update from {vendor}",
-                "content": f"Full content of test update {idx} from {vendor}",  # 必须有 content
-                "publish_date": f"2024-12-{15+i:02d}",
-                "crawl_time": f"2024-12-28T{10+j}:00:00",
-            })
     
-    return updates
+    return tuple(
+        MappingProxyType({
+            "update_id": f"batch-{vendor}-{channel}-{idx}",
+            "vendor": vendor,
+            "source_channel": channel,
+            "source_url": f"https://{vendor}.com/{channel}/post-{idx}",
+            "source_identifier": f"{vendor}-{channel}-post-{idx}",
+            "title": f"Test {vendor.upper()} {channel} Update {idx}",
+            "description": f"Test update from {vendor}",
+            "content": f"Full content of test update {idx} from {vendor}",  # 必须有 content
+            "publish_date": f"2024-12-{15+i:02d}",
+            "crawl_time": f"2024-12-28T{10+j}:00:00",
+        })
+        for i, vendor in enumerate(vendors)
+        for j, channel in enumerate(channels)
+        for idx in (i * len(channels) + j,)
+    )
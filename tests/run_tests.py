@@ -4,12 +4,13 @@
 CI/CD 测试运行器
 
 用法：
-    python tests/run_tests.py [--quick|--full|--coverage]
+    python tests/run_tests.py [--quick|--full|--coverage] [--jobs N]
     
 选项：
     --quick     快速测试（仅关键路径）
     --full      完整测试（所有用例）
     --coverage  带覆盖率报告
+    --jobs N    并行进程数（默认 auto，需要 pytest-xdist；--quick 始终串行）
 """
 
 import os
@@ -57,6 +58,28 @@ def check_dependencies():
         print(f"  pytest-cov: 已安装")
     except ImportError:
         print("  ⚠️  pytest-cov 未安装（覆盖率报告不可用）")
+    
+    try:
+        import xdist
+        print(f"  pytest-xdist: 已安装")
+    except ImportError:
+        print("  ⚠️  pytest-xdist 未安装（测试将串行运行）")
+
+
+def parallel_args(jobs: str) -> list:
+    """
+    pytest-xdist 并行参数
+    
+    按文件分发（loadfile）: test_api_routes.py 等文件内的用例共享模块级的 test_client 和数据库，
+    必须留在同一个 worker 中。未安装 pytest-xdist 或 jobs 为 0 时串行运行。
+    """
+    if str(jobs) == "0":
+        return []
+    try:
+        import xdist  # noqa: F401
+    except ImportError:
+        return []
+    return ["-n", str(jobs), "--dist=loadfile"]
 
 
 def run_quick_tests():
@@ -72,27 +95,31 @@ def run_quick_tests():
     )
 
 
-def run_full_tests():
+def run_full_tests(jobs: str = "auto"):
     """运行完整测试"""
     return run_command(
         [sys.executable, "-m", "pytest", 
          "tests/",
          "-v", "--tb=short",
-         "--ignore=tests/run_tests.py"],
+         "--ignore=tests/run_tests.py",
+         *parallel_args(jobs)],
         "完整测试 - 所有用例"
     )
 
 
-def run_coverage_tests():
-    """运行带覆盖率的测试"""
+def run_coverage_tests(jobs: str = "auto"):
+    """运行带覆盖率的测试（并行时 pytest-cov 会在生成报告前合并各 worker 的覆盖率数据）"""
     return run_command(
         [sys.executable, "-m", "pytest", 
          "tests/",
          "-v", "--tb=short",
          "--ignore=tests/run_tests.py",
+         "-p", "no:cacheprovider",
          "--cov=src",
+         "--cov-context=test",
          "--cov-report=term-missing",
-         "--cov-report=html:coverage_report"],
+         "--cov-report=html:coverage_report",
+         *parallel_args(jobs)],
         "覆盖率测试"
     )
 
@@ -107,7 +134,7 @@ def run_module_tests():
     )
 
 
-def run_database_tests():
+def run_database_tests(jobs: str = "auto"):
     """运行数据库测试"""
     return run_command(
         [sys.executable, "-m", "pytest", 
@@ -115,7 +142,8 @@ def run_database_tests():
          "tests/test_analysis.py",
          "tests/test_task_management.py",
          "tests/test_quality_tracking.py",
-         "-v", "--tb=short"],
+         "-v", "--tb=short",
+         *parallel_args(jobs)],
         "数据库层测试"
     )
 
@@ -127,6 +155,7 @@ def main():
     parser.add_argument('--coverage', action='store_true', help='覆盖率测试')
     parser.add_argument('--modules', action='store_true', help='模块导入测试')
     parser.add_argument('--database', action='store_true', help='数据库层测试')
+    parser.add_argument('--jobs', default='auto', help='并行进程数 (默认 auto，0 表示串行；--quick 始终串行)')
     
     args = parser.parse_args()
     
@@ -144,13 +173,13 @@ def main():
     if args.quick:
         results.append(run_quick_tests())
     elif args.coverage:
-        results.append(run_coverage_tests())
+        results.append(run_coverage_tests(args.jobs))
     elif args.modules:
         results.append(run_module_tests())
     elif args.database:
-        results.append(run_database_tests())
+        results.append(run_database_tests(args.jobs))
     elif args.full:
-        results.append(run_full_tests())
+        results.append(run_full_tests(args.jobs))
     else:
         # 默认运行快速测试
         results.append(run_quick_tests())
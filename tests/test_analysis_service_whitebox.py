@@ -57,6 +57,10 @@ class StubAnalysisDB:
         self.last_list_args = (limit, offset, status)
         return self.task_rows
 
+    def count_tasks(self, status=None):
+        self.last_count_status = status
+        return self.count_value
+
     def get_database_stats(self):
         return self.db_stats
 
@@ -307,6 +311,45 @@ class TestAnalysisServiceWhiteBox:
         assert pagination.total == 2
         assert db.last_list_args == (2, 2, "completed")
 
+    def test_list_tasks_paginated_reads_projected_summary_columns(self):
+        db = StubAnalysisDB()
+        db.task_rows = [
+            {
+                "task_id": "task-1",
+                "task_status": "running",
+                "filters": json.dumps({"vendor": "aws"}),
+                "total_count": 4,
+                "completed_count": 1,
+                "success_count": 1,
+                "fail_count": 0,
+                "total_rows": 7,
+                "created_at": "2024-12-28 10:00:00",
+            },
+        ]
+        service = AnalysisService(db)
+
+        items, pagination = service.list_tasks_paginated(page=1, page_size=1)
+
+        assert items[0]["filters"] == {"vendor": "aws"}
+        assert items[0]["processed_count"] == 1
+        assert items[0]["progress"] == 0.25
+        assert "total_rows" not in items[0]
+        assert "completed_count" not in items[0]
+        assert pagination.total == 7
+        assert pagination.total_pages == 7
+
+    def test_list_tasks_paginated_past_last_page_counts_total(self):
+        db = StubAnalysisDB()
+        db.count_value = 3
+        service = AnalysisService(db)
+
+        items, pagination = service.list_tasks_paginated(page=5, page_size=2, status="queued")
+
+        assert items == []
+        assert pagination.total == 3
+        assert pagination.total_pages == 2
+        assert db.last_count_status == "queued"
+
     def test_get_stats_overview_builds_response(self):
         db = StubAnalysisDB()
         db.db_stats = {"total_updates": 9, "latest_crawl_time": "2024-12-28T10:00:00Z"}
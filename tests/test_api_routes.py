@@ -5,28 +5,11 @@
 """
 
 import pytest
-import os
-import sys
-import tempfile
-import shutil
 from fastapi.testclient import TestClient
 
-# 添加项目根目录到路径
-PROJECT_ROOT = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
-sys.path.insert(0, PROJECT_ROOT)
-
-
-@pytest.fixture(scope="module")
-def temp_db_path_module():
-    """创建模块级临时数据库"""
-    temp_dir = tempfile.mkdtemp()
-    db_path = os.path.join(temp_dir, "test_api.db")
-    yield db_path
-    shutil.rmtree(temp_dir, ignore_errors=True)
-
 
 @pytest.fixture(scope="module")
-def test_client(temp_db_path_module):
+def test_client(tmp_db_dir):
     """创建测试客户端"""
     from src.storage.database.base import DatabaseManager
     from src.storage.database import UpdateDataLayer
@@ -36,7 +19,7 @@ def test_client(temp_db_path_module):
         DatabaseManager._instance = None
     
     # 创建数据库实例
-    db = UpdateDataLayer(db_path=temp_db_path_module)
+    db = UpdateDataLayer(db_path=str(tmp_db_dir / "test_api.db"))
     
     # 添加一些测试数据
     test_update = {
@@ -18,8 +18,6 @@ from src.utils.config.config_loader import (
     load_all_yaml_files,
     get_config,
     _expand_env_vars,
-    _file_mtimes,
-    _file_hashes
 )
 
 
@@ -35,9 +33,11 @@ def temp_config_dir():
 def reset_config_cache():
     """每个测试前重置配置缓存"""
     import src.utils.config.config_loader as loader
-    loader._file_mtimes.clear()
-    loader._file_hashes.clear()
+    loader._file_sentinels.clear()
+    loader._dir_sentinels.clear()
     loader._first_load = True
+    loader._config_cache.clear()
+    loader._yaml_cache.clear()
     yield
 
 
@@ -73,6 +73,16 @@ class TestMergeConfigs:
         result = merge_configs({}, {"a": 1})
         assert result == {"a": 1}
     
+    def test_inputs_not_mutated(self):
+        """测试合并不修改输入字典"""
+        base = {"a": {"x": 1}, "b": [1]}
+        override = {"a": {"y": 2}}
+        result = merge_configs(base, override)
+        
+        assert result == {"a": {"x": 1, "y": 2}, "b": [1]}
+        assert base == {"a": {"x": 1}, "b": [1]}
+        assert override == {"a": {"y": 2}}
+    
     def test_empty_override(self):
         """测试空覆盖配置"""
         base = {"a": 1}
@@ -144,6 +154,41 @@ class TestFileHasChanged:
         loader._first_load = False
         
         assert file_has_changed(config_file) is False
+    
+    def test_changed_file(self, temp_config_dir):
+        """测试修改后的文件（大小变化）"""
+        config_file = os.path.join(temp_config_dir, "test.yaml")
+        with open(config_file, 'w') as f:
+            f.write("key: value")
+        
+        file_has_changed(config_file)
+        import src.utils.config.config_loader as loader
+        loader._first_load = False
+        
+        with open(config_file, 'w') as f:
+            f.write("key: other value")
+        
+        assert file_has_changed(config_file) is True
+        assert file_has_changed(config_file) is False
+
+
+    def test_dir_has_changed(self, temp_config_dir):
+        """测试目录快照检测新增文件，忽略非 YAML 文件"""
+        from src.utils.config.config_loader import _dir_has_changed
+        
+        with open(os.path.join(temp_config_dir, "a.yaml"), 'w') as f:
+            f.write("a: 1")
+        
+        assert _dir_has_changed(temp_config_dir) is True
+        assert _dir_has_changed(temp_config_dir) is False
+        
+        with open(os.path.join(temp_config_dir, "notes.txt"), 'w') as f:
+            f.write("ignored")
+        assert _dir_has_changed(temp_config_dir) is False
+        
+        with open(os.path.join(temp_config_dir, "b.yml"), 'w') as f:
+            f.write("b: 2")
+        assert _dir_has_changed(temp_config_dir) is True
 
 
 class TestLoadYamlFile:
@@ -158,11 +203,39 @@ class TestLoadYamlFile:
         result = load_yaml_file(config_file)
         assert result == {"key": "value", "nested": {"x": 1}}
     
+    def test_load_expands_env_vars(self, temp_config_dir):
+        """测试加载时替换环境变量引用"""
+        config_file = os.path.join(temp_config_dir, "env.yaml")
+        with open(config_file, 'w') as f:
+            f.write("api:\n  key: ${TEST_LOADER_KEY}\n  plain: value\n")
+        
+        os.environ["TEST_LOADER_KEY"] = "secret"
+        try:
+            result = load_yaml_file(config_file)
+        finally:
+            del os.environ["TEST_LOADER_KEY"]
+        
+        assert result == {"api": {"key": "secret", "plain": "value"}}
+    
     def test_load_nonexistent_file(self):
         """测试加载不存在的文件"""
         result = load_yaml_file("/nonexistent/file.yaml")
         assert result == {}
     
+    def test_load_cached_until_changed(self, temp_config_dir):
+        """测试未变化时返回缓存副本，变化后重新解析"""
+        config_file = os.path.join(temp_config_dir, "test.yaml")
+        with open(config_file, 'w') as f:
+            yaml.dump({"items": [1]}, f)
+        
+        first = load_yaml_file(config_file)
+        first["items"].append(2)
+        assert load_yaml_file(config_file) == {"items": [1]}
+        
+        with open(config_file, 'w') as f:
+            yaml.dump({"items": [1, 2, 3]}, f)
+        assert load_yaml_file(config_file) == {"items": [1, 2, 3]}
+    
     def test_load_empty_yaml(self, temp_config_dir):
         """测试加载空 YAML"""
         config_file = os.path.join(temp_config_dir, "empty.yaml")
@@ -213,6 +286,23 @@ class TestLoadConfigDirectory:
         
         result = load_config_directory(temp_config_dir)
         assert result == {"only_main": True}
+    
+    def test_imports_deep_merge_in_order(self, temp_config_dir):
+        """测试 imports 按顺序深度合并，main.yaml 最后覆盖且不污染缓存"""
+        with open(os.path.join(temp_config_dir, "main.yaml"), 'w') as f:
+            yaml.dump({"imports": ["a.yaml", "b.yaml"], "db": {"port": 3}}, f)
+        with open(os.path.join(temp_config_dir, "a.yaml"), 'w') as f:
+            yaml.dump({"db": {"host": "a", "port": 1}, "only_a": 1}, f)
+        with open(os.path.join(temp_config_dir, "b.yaml"), 'w') as f:
+            yaml.dump({"db": {"host": "b"}}, f)
+        
+        result = load_config_directory(temp_config_dir)
+        assert result == {"db": {"host": "b", "port": 3}, "only_a": 1}
+        
+        # 就地合并不应修改缓存中的解析结果
+        assert load_yaml_file(os.path.join(temp_config_dir, "a.yaml")) == {
+            "db": {"host": "a", "port": 1}, "only_a": 1
+        }
 
 
 class TestLoadAllYamlFiles:
@@ -240,6 +330,14 @@ class TestLoadAllYamlFiles:
         result = load_all_yaml_files(temp_config_dir)
         assert "yaml_key" in result
         assert "yml_key" in result
+    
+    def test_skips_directories_with_yaml_suffix(self, temp_config_dir):
+        """测试以 .yaml 结尾的子目录被跳过"""
+        os.mkdir(os.path.join(temp_config_dir, "nested.yaml"))
+        with open(os.path.join(temp_config_dir, "real.yaml"), 'w') as f:
+            yaml.dump({"real": True}, f)
+        
+        assert load_all_yaml_files(temp_config_dir) == {"real": True}
 
 
 class TestGetConfig:
@@ -268,3 +366,61 @@ class TestGetConfig:
         
         result = get_config(config_path=config_file)
         assert result.get("custom") == "config"
+    
+    def test_get_config_cached_and_isolated(self, temp_config_dir):
+        """测试缓存命中时返回独立副本"""
+        config_file = os.path.join(temp_config_dir, "custom.yaml")
+        with open(config_file, 'w') as f:
+            yaml.dump({"nested": {"items": [1, 2]}}, f)
+        
+        first = get_config(config_path=config_file)
+        first["nested"]["items"].append(3)
+        
+        second = get_config(config_path=config_file)
+        assert second == {"nested": {"items": [1, 2]}}
+    
+    def test_get_config_cache_bounded(self, temp_config_dir):
+        """测试 get_config 缓存按 LRU 限制条目数"""
+        import src.utils.config.config_loader as loader
+        
+        for i in range(loader._CONFIG_CACHE_SIZE + 5):
+            config_file = os.path.join(temp_config_dir, f"c{i}.yaml")
+            with open(config_file, 'w') as f:
+                yaml.dump({"i": i}, f)
+            assert get_config(config_path=config_file) == {"i": i}
+        
+        assert len(loader._config_cache) == loader._CONFIG_CACHE_SIZE
+    
+    def test_get_config_reloads_on_change(self, temp_config_dir):
+        """测试依赖文件变化（含新增文件）后重新加载"""
+        with open(os.path.join(temp_config_dir, "a.yaml"), 'w') as f:
+            yaml.dump({"a": 1}, f)
+        assert get_config(config_path=temp_config_dir) == {"a": 1}
+        
+        with open(os.path.join(temp_config_dir, "a.yaml"), 'w') as f:
+            yaml.dump({"a": 10, "extra": True}, f)
+        assert get_config(config_path=temp_config_dir) == {"a": 10, "extra": True}
+        
+        with open(os.path.join(temp_config_dir, "b.yaml"), 'w') as f:
+            yaml.dump({"b": 2}, f)
+        assert get_config(config_path=temp_config_dir)["b"] == 2
+    
+    def test_env_file_loaded_once_on_first_use(self, temp_config_dir, monkeypatch):
+        """测试 .env 在首次 get_config 时才加载，且只加载一次"""
+        import sys
+        import types
+        import src.utils.config.config_loader as loader
+        
+        calls = []
+        fake_dotenv = types.ModuleType("dotenv")
+        fake_dotenv.load_dotenv = lambda path: calls.append(path)
+        monkeypatch.setitem(sys.modules, "dotenv", fake_dotenv)
+        monkeypatch.setattr(loader, "_PROJECT_ROOT", temp_config_dir)
+        monkeypatch.setattr(loader, "_env_loaded", False)
+        with open(os.path.join(temp_config_dir, ".env"), 'w') as f:
+            f.write("X=1\n")
+        
+        get_config(default_config={"k": "v"})
+        get_config(default_config={"k": "v"})
+        
+        assert calls == [os.path.join(temp_config_dir, ".env")]
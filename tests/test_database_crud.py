@@ -97,6 +97,73 @@ class TestUpdatesCRUD:
         inserted2, skipped2 = data_layer.batch_insert_updates(batch_update_data)
         assert inserted2 == 0
         assert skipped2 == len(batch_update_data)
+    
+    def test_batch_insert_mixed_invalid_and_duplicate(self, data_layer, batch_update_data):
+        """测试批量插入同时包含无效记录与重复记录"""
+        data_layer.batch_insert_updates(batch_update_data[:2])
+        
+        invalid = dict(batch_update_data[2], source_url="ftp://invalid")
+        batch = [*batch_update_data[:4], invalid]
+        inserted, skipped = data_layer.batch_insert_updates(batch)
+        
+        # 前两条已存在，第 3 条（同 update_id 的有效版本）与第 4 条新插入，最后一条校验失败
+        assert inserted == 2
+        assert skipped == 3
+    
+    def test_batch_insert_force_update_replaces(self, data_layer, batch_update_data):
+        """测试 force_update 覆盖已存在记录"""
+        data_layer.batch_insert_updates(batch_update_data[:3])
+        
+        changed = [dict(item, title=f"changed-{i}") for i, item in enumerate(batch_update_data[:3])]
+        inserted, skipped = data_layer.batch_insert_updates(changed, force_update=True)
+        
+        assert (inserted, skipped) == (3, 0)
+        record = data_layer.get_update_by_id(batch_update_data[0]["update_id"])
+        assert record["title"] == "changed-0"
+    
+    def test_batch_insert_keeps_description(self, data_layer, batch_update_data):
+        """测试批量插入与单条插入写入相同的列（含 description）"""
+        row = dict(batch_update_data[0], description="batch description")
+        data_layer.batch_insert_updates([row])
+        
+        record = data_layer.get_update_by_id(row["update_id"])
+        assert record["description"] == "batch description"
+    
+    def test_param_builder_matches_generic(self, batch_update_data):
+        """测试按键序生成的参数构建函数与通用合并结果一致"""
+        from src.storage.database.updates_repository import (
+            _param_builder,
+            _build_params_generic,
+        )
+        
+        partial = {"update_id": "x", "title": None, "unknown_key": 1}
+        for row in (batch_update_data[0], partial):
+            builder = _param_builder(tuple(row))
+            assert builder(row) == _build_params_generic(row)
+            assert _param_builder(tuple(row)) is builder
+    
+    def test_batch_insert_counts_exclude_trigger_writes(self, data_layer, batch_update_data):
+        """测试成功计数不包含全文索引/标签触发器产生的写入"""
+        tagged = [dict(item, tags='["VPC", "CDN"]') for item in batch_update_data[:3]]
+        data_layer.batch_insert_updates(tagged[:1])
+        
+        inserted, skipped = data_layer.batch_insert_updates(tagged)
+        assert (inserted, skipped) == (2, 1)
+        
+        inserted, skipped = data_layer.batch_insert_updates(tagged, force_update=True)
+        assert (inserted, skipped) == (3, 0)
+
+    def test_batch_insert_unbindable_row_fails_alone(self, data_layer, batch_update_data):
+        """测试单条记录字段值无法绑定时只有该记录失败，其余照常写入"""
+        batch = [dict(item) for item in batch_update_data[:3]]
+        batch[1]["tags"] = ["VPC", "CDN"]
+
+        inserted, skipped = data_layer.batch_insert_updates(batch)
+
+        assert (inserted, skipped) == (2, 1)
+        assert data_layer.get_update_by_id(batch[0]["update_id"]) is not None
+        assert data_layer.get_update_by_id(batch[1]["update_id"]) is None
+        assert data_layer.get_update_by_id(batch[2]["update_id"]) is not None
 
 
 class TestPaginatedQuery:
@@ -223,3 +290,297 @@ class TestStatistics:
         channels = {s["value"] for s in stats}
         assert "blog" in channels
         assert "whatsnew" in channels
+
+
+class TestUpdatesFilters:
+    """Updates 过滤条件测试"""
+    
+    @staticmethod
+    def _insert(data_layer, base, suffix, **fields):
+        data = {
+            **base,
+            "update_id": f"filter-{suffix}",
+            "source_url": f"https://example.com/filter/{suffix}",
+            "source_identifier": f"filter-{suffix}",
+            **fields,
+        }
+        assert data_layer.insert_update(data) is True
+    
+    def test_has_analysis_filter(self, data_layer, sample_update_data):
+        """测试 has_analysis 过滤排除空值与占位值"""
+        self._insert(data_layer, sample_update_data, "analyzed", title_translated="测试更新")
+        self._insert(data_layer, sample_update_data, "placeholder", title_translated="N/A")
+        self._insert(data_layer, sample_update_data, "short", title_translated=" x ")
+        self._insert(data_layer, sample_update_data, "empty")
+        
+        assert data_layer.count_updates_with_filters(has_analysis=True) == 1
+        assert data_layer.count_updates_with_filters(has_analysis=False) == 3
+        
+        rows = data_layer.query_updates_paginated({"has_analysis": True}, limit=10, offset=0)
+        assert [row["update_id"] for row in rows] == ["filter-analyzed"]
+
+
+    def test_keyword_filter(self, data_layer, sample_update_data):
+        """测试关键词搜索：长关键词走全文索引，短关键词回退 LIKE"""
+        self._insert(data_layer, sample_update_data, "vpc", title="Amazon VPC Lattice GA")
+        self._insert(
+            data_layer, sample_update_data, "cn",
+            title="Other", content_summary="支持跨地域网络互联",
+        )
+        
+        assert data_layer.count_updates_with_filters(keyword="vpc lattice") == 1
+        assert data_layer.count_updates_with_filters(keyword="跨地域网络") == 1
+        assert data_layer.count_updates_with_filters(keyword="网络") == 1
+        assert data_layer.count_updates_with_filters(keyword='"quoted"') == 0
+    
+    def test_keyword_index_follows_replace_and_delete(self, data_layer, sample_update_data):
+        """测试全文索引随覆盖写入和删除同步"""
+        self._insert(data_layer, sample_update_data, "sync", title="Transit Gateway")
+        
+        replaced = {
+            **sample_update_data,
+            "update_id": "filter-sync",
+            "source_url": "https://example.com/filter/sync",
+            "source_identifier": "filter-sync",
+            "title": "Cloud WAN",
+        }
+        data_layer.batch_insert_updates([replaced], force_update=True)
+        assert data_layer.count_updates_with_filters(keyword="Transit") == 0
+        assert data_layer.count_updates_with_filters(keyword="Cloud WAN") == 1
+        
+        data_layer.delete_update("filter-sync")
+        assert data_layer.count_updates_with_filters(keyword="Cloud WAN") == 0
+
+    def test_keyword_index_rebuild_after_rowid_change(self, data_layer, sample_update_data):
+        """测试 rowid 变化（如 VACUUM）后重建全文索引恢复正确匹配"""
+        self._insert(data_layer, sample_update_data, "a", title="Transit Gateway")
+        self._insert(data_layer, sample_update_data, "b", title="Cloud WAN")
+
+        manager = data_layer._db_manager
+        with manager.get_connection() as conn:
+            # 模拟 VACUUM 重新编号 rowid：直接改写 rowid 不会触发全文索引触发器
+            conn.execute("UPDATE updates SET rowid = rowid + 100")
+            conn.commit()
+
+        manager.rebuild_fts_index()
+        assert data_layer.count_updates_with_filters(keyword="Transit") == 1
+        assert data_layer.count_updates_with_filters(keyword="Cloud WAN") == 1
+
+    def test_legacy_standalone_fts_migrated_to_external_content(self, temp_db_path, sample_update_data):
+        """测试旧版自带内容副本的 updates_fts 在初始化时迁移为外部内容表"""
+        import sqlite3
+        from src.storage.database import UpdateDataLayer
+        from src.storage.database.base import DatabaseManager
+
+        DatabaseManager.reset_instance()
+        UpdateDataLayer(db_path=temp_db_path).insert_update(sample_update_data)
+        DatabaseManager.reset_instance()
+
+        conn = sqlite3.connect(temp_db_path)
+        conn.executescript("""
+            DROP TRIGGER trg_updates_fts_insert;
+            DROP TRIGGER trg_updates_fts_update;
+            DROP TRIGGER trg_updates_fts_delete;
+            DROP TABLE updates_fts;
+            CREATE VIRTUAL TABLE updates_fts USING fts5(
+                title, title_translated, content, content_translated, content_summary,
+                tokenize = 'trigram'
+            );
+        """)
+        conn.close()
+
+        try:
+            layer = UpdateDataLayer(db_path=temp_db_path)
+            with layer._db_manager.get_connection() as conn:
+                sql = conn.execute(
+                    "SELECT sql FROM sqlite_master WHERE name = 'updates_fts'"
+                ).fetchone()[0]
+                shadow = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'updates_fts_content'"
+                ).fetchone()
+            assert "content='updates'" in sql
+            assert shadow is None
+            keyword = sample_update_data["title"].split()[0]
+            assert layer.count_updates_with_filters(keyword=keyword) == 1
+        finally:
+            DatabaseManager.reset_instance()
+
+
+    def test_tags_filter(self, data_layer, sample_update_data):
+        """测试标签过滤（OR 匹配，大小写不敏感）并随 tags 更新同步"""
+        self._insert(data_layer, sample_update_data, "t1", tags='["VPC", "网络"]')
+        self._insert(data_layer, sample_update_data, "t2", tags='["CDN"]')
+        self._insert(data_layer, sample_update_data, "t3", tags="not-json")
+        
+        assert data_layer.count_updates_with_filters(tags="vpc") == 1
+        assert data_layer.count_updates_with_filters(tags="网络, CDN") == 2
+        
+        data_layer.update_analysis_fields("filter-t2", {"tags": '["VPC"]'})
+        assert data_layer.count_updates_with_filters(tags="CDN") == 0
+        assert data_layer.count_updates_with_filters(tags="VPC") == 2
+
+
+    def test_dimension_counts_follow_writes(self, data_layer, batch_update_data):
+        """测试单维度计数与全表聚合一致"""
+        data_layer.batch_insert_updates(batch_update_data)
+        moved = [dict(item, vendor="gcp") for item in batch_update_data[:2]]
+        data_layer.batch_insert_updates(moved, force_update=True)
+        data_layer.delete_update(batch_update_data[2]["update_id"])
+        data_layer.update_analysis_fields(
+            batch_update_data[3]["update_id"], {"update_type": "bugfix"}
+        )
+        
+        with data_layer._db_manager.get_connection() as conn:
+            for dim in ("vendor", "source_channel", "update_type"):
+                rows = conn.execute(
+                    f"SELECT {dim}, COUNT(*) FROM updates WHERE {dim} IS NOT NULL GROUP BY {dim}"
+                ).fetchall()
+                for key, expected in rows:
+                    assert data_layer.count_updates_with_filters(**{dim: key}) == expected
+            total = conn.execute("SELECT COUNT(*) FROM updates").fetchone()[0]
+        
+        assert data_layer.count_updates_with_filters() == total
+        assert data_layer.count_updates_with_filters(vendor="nonexistent") == 0
+
+    def test_dimension_counts_exact_after_external_replace(self, data_layer, sample_update_data):
+        """测试外部裸连接（未开启 recursive_triggers）执行 INSERT OR REPLACE 后计数仍准确"""
+        import sqlite3
+
+        data_layer.insert_update(sample_update_data)
+        conn = sqlite3.connect(data_layer._db_manager.db_path)
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO updates (update_id, vendor, source_channel, source_url, "
+                "source_identifier) VALUES (?, ?, ?, ?, ?)",
+                (
+                    sample_update_data["update_id"], "aws", sample_update_data["source_channel"],
+                    sample_update_data["source_url"], sample_update_data["source_identifier"],
+                ),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        assert data_layer.count_updates_with_filters(vendor="aws") == 1
+        assert data_layer.count_updates_with_filters() == 1
+
+
+class TestUpdatesIndexes:
+    """Updates 常用查询的索引命中测试"""
+    
+    @staticmethod
+    def _plan(data_layer, sql, params):
+        with data_layer._db_manager.get_connection() as conn:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        return " ".join(row["detail"] for row in rows)
+    
+    def test_identifier_dedup_uses_index(self, data_layer):
+        """测试批量去重查询走 (vendor, source_channel, source_identifier) 索引"""
+        plan = self._plan(
+            data_layer,
+            "SELECT 1 FROM updates WHERE vendor = ? AND source_channel = ? "
+            "AND source_identifier = ? LIMIT 1",
+            ("aws", "whatsnew", "abc"),
+        )
+        assert "idx_updates_vendor_channel_ident" in plan
+    
+    def test_channel_paginated_uses_index(self, data_layer):
+        """测试按 source_channel 过滤、publish_date 排序无需额外排序"""
+        plan = self._plan(
+            data_layer,
+            "SELECT * FROM updates WHERE source_channel = ? "
+            "ORDER BY publish_date DESC LIMIT ? OFFSET ?",
+            ("whatsnew", 20, 0),
+        )
+        assert "idx_updates_channel_date" in plan
+        assert "TEMP B-TREE" not in plan
+    
+    def test_has_analysis_uses_index(self, data_layer):
+        """测试 has_analysis 过滤走生成列索引"""
+        plan = self._plan(
+            data_layer,
+            "SELECT COUNT(*) FROM updates WHERE has_analysis = ?",
+            (1,),
+        )
+        assert "idx_updates_has_analysis" in plan
+
+
+class TestFetchDicts:
+    """游标结果转字典测试"""
+    
+    def test_fetch_dicts_matches_row_dicts(self, data_layer, batch_update_data):
+        """测试 _fetch_dicts 与 dict(sqlite3.Row) 结果一致且不影响后续游标"""
+        from src.storage.database.base import BaseRepository
+        
+        data_layer.batch_insert_updates(batch_update_data[:3])
+        with data_layer._db_manager.get_connection() as conn:
+            sql = "SELECT * FROM updates ORDER BY update_id"
+            expected = [dict(row) for row in conn.execute(sql).fetchall()]
+            assert BaseRepository._fetch_dicts(conn.execute(sql)) == expected
+            assert conn.execute(sql).fetchone()["update_id"] == expected[0]["update_id"]
+
+
+class TestConnectionReuse:
+    """线程级连接复用测试"""
+    
+    def test_same_thread_reuses_connection(self, data_layer):
+        """测试同一线程（含嵌套）复用同一连接"""
+        manager = data_layer._db_manager
+        with manager.get_connection() as outer:
+            with manager.get_connection() as inner:
+                assert inner is outer
+        with manager.get_connection() as again:
+            assert again is outer
+    
+    def test_other_thread_gets_own_connection(self, data_layer):
+        """测试不同线程使用独立连接"""
+        import threading
+        
+        manager = data_layer._db_manager
+        seen = []
+        
+        def worker():
+            with manager.get_connection() as conn:
+                seen.append(conn)
+        
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+        
+        with manager.get_connection() as conn:
+            assert seen[0] is not conn
+
+    def test_other_thread_connection_has_same_pragmas(self, data_layer):
+        """测试其他线程新建的连接与初始化线程的连接级参数一致"""
+        import threading
+
+        manager = data_layer._db_manager
+        pragmas = ("foreign_keys", "recursive_triggers", "cache_size", "temp_store", "synchronous")
+
+        def read_pragmas(conn):
+            return {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in pragmas}
+
+        seen = []
+
+        def worker():
+            with manager.get_connection() as conn:
+                seen.append(read_pragmas(conn))
+
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+
+        with manager.get_connection() as conn:
+            assert seen[0] == read_pragmas(conn)
+        assert seen[0]["foreign_keys"] == 1
+
+    def test_uncommitted_write_rolled_back_on_exit(self, data_layer, sample_update_data):
+        """测试未提交的写入在最外层退出时回滚"""
+        manager = data_layer._db_manager
+        with manager.get_connection() as conn:
+            conn.execute(
+                "INSERT INTO updates (update_id, vendor, source_channel, source_url) VALUES (?, ?, ?, ?)",
+                ("uncommitted", "aws", "blog", "https://example.com/x"),
+            )
+        
+        assert data_layer.get_update_by_id("uncommitted") is None
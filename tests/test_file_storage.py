@@ -129,6 +129,26 @@ class TestFileStorage:
         # 即使数据不完整也能保存（使用空字符串）
         assert result is not None or result is None  # 取决于实现
     
+    def test_concurrent_save_same_path(self, file_storage):
+        """测试并发写入同一路径：内容完整且不残留临时文件"""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        url = "https://example.com/concurrent"
+        pub_date = "2024-12-28"
+        contents = [f"content-{i}-" + "x" * 10000 for i in range(16)]
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            paths = list(pool.map(
+                lambda c: file_storage.save_markdown(url, "Title", c, pub_date),
+                contents
+            ))
+        
+        assert len(set(paths)) == 1
+        with open(paths[0], 'r', encoding='utf-8') as f:
+            saved_content = f.read()
+        assert any(saved_content.endswith(c) for c in contents)
+        assert os.listdir(file_storage.output_dir) == [os.path.basename(paths[0])]
+    
     def test_get_file_hash(self, file_storage):
         """测试内容哈希计算"""
         content = "Test content"
@@ -6,13 +6,22 @@
 
 import json
 import os
+from datetime import date
 
 from src.storage.database.base import DatabaseManager
 from src.storage.database.reports_repository import ReportRepository
+from src.storage.database.task_report_repository import TaskReport, TaskReportRepository
 from src.utils.distributed_lock import DistributedLock, distributed_lock
 
 
 class TestDistributedLockIntegration:
+    def test_is_locked_probe_has_no_side_effects(self, temp_db_path):
+        lock_path = f"{temp_db_path}.probe.lock"
+        lock = DistributedLock(lock_path)
+
+        assert lock.is_locked() is False
+        assert os.path.exists(lock_path) is False
+
     def test_nonblocking_lock_contention_and_release(self, temp_db_path):
         lock_path = f"{temp_db_path}.lock"
         lock1 = DistributedLock(lock_path)
@@ -21,6 +30,8 @@ class TestDistributedLockIntegration:
         assert lock1.acquire(blocking=False) is True
         assert lock2.acquire(blocking=False) is False
         assert lock1.is_locked() is True
+        with open(lock_path) as f:
+            assert f.read() == str(os.getpid())
 
         assert lock1.release() is True
         assert lock2.acquire(blocking=False) is True
@@ -133,3 +144,58 @@ class TestReportsRepositoryIntegration:
         reports = repo.get_available_reports("monthly")
 
         assert [r["year"] for r in reports[:2]] == [2024, 2023]
+
+
+class TestTaskReportRepositoryIntegration:
+    def test_save_report_returns_id_and_round_trips(self, temp_db_path):
+        DatabaseManager.reset_instance()
+        repo = TaskReportRepository(DatabaseManager(temp_db_path))
+
+        report = TaskReport(task_date="2024-12-28", task_type="daily_crawl_analyze")
+        report.add_crawl_result("aws", "blog", 3)
+        report.add_failed("aws", "t1", "u-1", "timeout")
+
+        first_id = repo.save_report(report)
+        second_id = repo.save_report(report)
+
+        assert second_id == first_id + 1
+        saved = repo.get_report_by_date("2024-12-28", include_items=False)
+        assert saved["id"] in (first_id, second_id)
+        assert saved["crawl_stats"] == {"aws": {"blog": 3}}
+        assert "issue_details" not in saved
+
+        detailed = repo.get_report_by_date("2024-12-28")
+        assert detailed["issue_details"]["failed"][0]["reason"] == "timeout"
+        assert detailed["issue_details"]["non_network"] == []
+        assert repo.get_latest_report()["issue_details"] == detailed["issue_details"]
+
+    def test_get_report_items_pages_by_kind(self, temp_db_path):
+        DatabaseManager.reset_instance()
+        repo = TaskReportRepository(DatabaseManager(temp_db_path))
+
+        report = TaskReport(task_date="2024-12-29", task_type="daily_crawl_analyze")
+        for i in range(5):
+            report.add_failed("gcp", f"t{i}", f"u-{i}", "error")
+        report.add_non_network("aws", "n1", "n-1")
+        report_id = repo.save_report(report)
+
+        failed = repo.get_report_items(report_id, kind="failed", limit=2, offset=2)
+        assert [item["update_id"] for item in failed] == ["u-2", "u-3"]
+        assert len(repo.get_report_items(report_id)) == 6
+
+    def test_recent_reports_stream_and_summary_only(self, temp_db_path):
+        DatabaseManager.reset_instance()
+        repo = TaskReportRepository(DatabaseManager(temp_db_path))
+
+        report = TaskReport(task_date=date.today().isoformat(), task_type="daily_crawl_analyze")
+        report.add_crawl_result("aws", "blog", 2)
+        report.add_failed("aws", "t1", "u-1", "timeout")
+        repo.save_report(report)
+
+        full = list(repo.iter_recent_reports(days=7))
+        assert full[0]["crawl_stats"] == {"aws": {"blog": 2}}
+        assert len(full[0]["issue_details"]["failed"]) == 1
+
+        summary = repo.get_recent_reports(days=7, summary_only=True)
+        assert summary[0]["crawl_total"] == 2
+        assert "crawl_stats" not in summary[0]
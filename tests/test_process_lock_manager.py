@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试进程锁管理器
+"""
+
+import os
+import time
+import fcntl
+import pytest
+
+from src.utils.threading import process_lock_manager as plm
+from src.utils.threading.process_lock_manager import ProcessLockManager, ProcessType
+
+
+@pytest.fixture(autouse=True)
+def lock_dir(tmp_path, monkeypatch):
+    """将锁文件目录指向临时目录，并隔离单例"""
+    monkeypatch.setattr(ProcessLockManager, "_lock_dir", str(tmp_path))
+    monkeypatch.setattr(ProcessLockManager, "_LOCK_PATHS", plm._lock_paths(str(tmp_path)))
+    monkeypatch.setattr(ProcessLockManager, "_instances", {})
+    monkeypatch.setattr(ProcessLockManager, "_status_cache", {})
+    monkeypatch.setattr(ProcessLockManager, "_LOCKED_TYPES", set())
+    monkeypatch.setattr(ProcessLockManager, "_probe_fds", {})
+    yield str(tmp_path)
+    ProcessLockManager._close_probe_fds()
+
+
+def _lock_path(lock_dir, process_type):
+    return os.path.join(lock_dir, f"cnetCompSpy_{process_type.name.lower()}.lock")
+
+
+class TestLockRecord:
+    """测试锁文件记录"""
+
+    def test_acquire_writes_fixed_size_record(self, lock_dir):
+        """测试获取锁后写入定长记录，状态中可还原各字段"""
+        manager = ProcessLockManager(ProcessType.CRAWLER)
+        assert manager.acquire_lock() is True
+        try:
+            assert os.path.getsize(_lock_path(lock_dir, ProcessType.CRAWLER)) == plm._LOCK_STRUCT.size
+
+            status = ProcessLockManager.check_lock_status()["CRAWLER"]
+            assert status["locked"] is True
+            assert status["pid"] == os.getpid()
+            assert status["process_exists"] is True
+            assert status["hostname"] == manager.hostname
+            assert status["start_method"] in ("web", "shell")
+            assert status["timestamp_formatted"]
+        finally:
+            manager.release_lock()
+
+    def test_read_lock_info_is_bounded_by_length(self, tmp_path):
+        """测试空、截断、超长内容按长度判定为无法识别，不抛出异常"""
+        record = plm._pack_lock_info(123, 1.5, "CRAWLER", "host", "cmd")
+        path = str(tmp_path / "record.lock")
+        for content, expected_pid in ((b"", None), (record[:-1], None), (record + b"{", None), (record, 123)):
+            with open(path, "wb") as f:
+                f.write(content)
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                info = plm._read_lock_info(fd)
+            finally:
+                os.close(fd)
+            assert (info["pid"] if info else None) == expected_pid
+
+    def test_legacy_or_empty_file_is_unrecognized(self, lock_dir):
+        """测试空文件与旧版 JSON 锁文件被视为无法识别"""
+        path = _lock_path(lock_dir, ProcessType.ANALYZER)
+        with open(path, "w") as f:
+            f.write('{"pid": 1, "timestamp": 0}')
+
+        status = ProcessLockManager.check_lock_status()["ANALYZER"]
+        assert status["locked"] is False
+        assert "error" in status
+        assert ProcessLockManager(ProcessType.ANALYZER).is_lock_expired() is True
+
+    def test_status_reuses_decoded_record_until_file_changes(self, lock_dir, monkeypatch):
+        """测试锁文件未变化时 check_lock_status 复用已解码的记录"""
+        reads = []
+        real_read = plm._read_lock_info
+        monkeypatch.setattr(plm, "_read_lock_info", lambda fd: reads.append(fd) or real_read(fd))
+
+        manager = ProcessLockManager(ProcessType.CRAWLER)
+        assert manager.acquire_lock() is True
+        try:
+            first = ProcessLockManager.check_lock_status()["CRAWLER"]
+            second = ProcessLockManager.check_lock_status()["CRAWLER"]
+            assert len(reads) == 1
+            assert second["pid"] == first["pid"]
+            assert second["locked"] is True
+        finally:
+            manager.release_lock()
+
+        # 释放后记录不变，但锁状态需重新探测
+        assert ProcessLockManager.check_lock_status()["CRAWLER"]["process_exists"] is True
+        assert len(reads) == 1
+
+        with open(_lock_path(lock_dir, ProcessType.CRAWLER), "w") as f:
+            f.write("")
+        assert "error" in ProcessLockManager.check_lock_status()["CRAWLER"]
+        assert len(reads) == 2
+
+    def test_status_with_missing_lock_dir(self, lock_dir, monkeypatch):
+        """测试锁目录不存在时全部视为未锁定"""
+        missing_dir = os.path.join(lock_dir, "missing")
+        monkeypatch.setattr(ProcessLockManager, "_lock_dir", missing_dir)
+        monkeypatch.setattr(ProcessLockManager, "_LOCK_PATHS", plm._lock_paths(missing_dir))
+
+        status = ProcessLockManager.check_lock_status()
+        assert set(status) == {pt.name for pt in ProcessType}
+        assert all(entry == {"locked": False} for entry in status.values())
+
+
+class TestLocking:
+    """测试进程锁的互斥关系"""
+
+    def test_same_type_and_mutex_contention(self, lock_dir):
+        """测试同类型与互斥类型进程无法同时持有锁"""
+        crawler = ProcessLockManager(ProcessType.CRAWLER)
+        assert crawler.acquire_lock() is True
+        try:
+            assert ProcessLockManager(ProcessType.CRAWLER).acquire_lock() is False
+            assert ProcessLockManager(ProcessType.ANALYZER).acquire_lock() is False
+
+            web = ProcessLockManager(ProcessType.WEB_SERVER)
+            assert web.acquire_lock() is True
+            web.release_lock()
+        finally:
+            crawler.release_lock()
+
+        analyzer = ProcessLockManager(ProcessType.ANALYZER)
+        assert analyzer.acquire_lock() is True
+        analyzer.release_lock()
+
+    def test_failed_acquire_keeps_holder_record(self, lock_dir):
+        """测试获取失败不会清空持有者写入的记录"""
+        holder = ProcessLockManager(ProcessType.SCHEDULER)
+        assert holder.acquire_lock() is True
+        try:
+            other = ProcessLockManager(ProcessType.SCHEDULER)
+            assert ProcessLockManager(ProcessType.WEB_SERVER).is_process_running(ProcessType.SCHEDULER) is True
+            assert other.acquire_lock() is False
+            assert os.path.getsize(_lock_path(lock_dir, ProcessType.SCHEDULER)) == plm._LOCK_STRUCT.size
+        finally:
+            holder.release_lock()
+
+        assert ProcessLockManager(ProcessType.SCHEDULER).is_process_running(ProcessType.SCHEDULER) is False
+
+    def test_flock_holder_counts_as_running_past_timeout(self, lock_dir, monkeypatch):
+        """测试只要排他锁仍被持有，即使超过超时时间也视为正在运行"""
+        holder = ProcessLockManager(ProcessType.CRAWLER)
+        assert holder.acquire_lock() is True
+        monkeypatch.setattr(ProcessLockManager, "_lock_timeout", -1)
+        try:
+            assert ProcessLockManager(ProcessType.ANALYZER).is_process_running(ProcessType.CRAWLER) is True
+        finally:
+            holder.release_lock()
+
+    def test_stale_file_is_overwritten_on_acquire(self, lock_dir):
+        """测试崩溃残留的锁文件（无人持有 flock）被直接覆盖"""
+        path = _lock_path(lock_dir, ProcessType.ANALYZER)
+        with open(path, "w") as f:
+            f.write('{"pid": 999999, "timestamp": 0}')
+
+        manager = ProcessLockManager(ProcessType.ANALYZER)
+        assert manager.is_process_running(ProcessType.ANALYZER) is False
+        assert manager.acquire_lock() is True
+        try:
+            assert ProcessLockManager.check_lock_status()["ANALYZER"]["pid"] == os.getpid()
+            assert os.path.getsize(path) == plm._LOCK_STRUCT.size
+        finally:
+            manager.release_lock()
+
+    def test_falls_back_when_tmpfile_link_unsupported(self, lock_dir, monkeypatch):
+        """测试 O_TMPFILE + link 不可用时回退到常规创建，并不再重试"""
+        import errno
+
+        def unsupported_link(*args, **kwargs):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+        monkeypatch.setattr(plm, "_tmpfile_link_supported", hasattr(os, "O_TMPFILE"))
+        monkeypatch.setattr(plm.os, "link", unsupported_link)
+
+        manager = ProcessLockManager(ProcessType.ANALYZER)
+        assert manager.acquire_lock() is True
+        try:
+            assert plm._tmpfile_link_supported is False
+            assert os.path.getsize(_lock_path(lock_dir, ProcessType.ANALYZER)) == plm._LOCK_STRUCT.size
+        finally:
+            manager.release_lock()
+
+    def test_fsync_skipped_on_memory_fs(self, lock_dir, monkeypatch):
+        """测试锁目录位于内存文件系统时不执行 fsync"""
+        fsync_calls = []
+        monkeypatch.setattr(plm, "_is_memory_fs", lambda path: True)
+        monkeypatch.setattr(plm.os, "fsync", fsync_calls.append)
+
+        manager = ProcessLockManager(ProcessType.WEB_SERVER)
+        assert manager.acquire_lock() is True
+        manager.release_lock()
+        assert fsync_calls == []
+
+
+    def test_in_process_locks_answered_without_filesystem(self, lock_dir, monkeypatch):
+        """测试本进程已持有的锁类型直接作答，不访问锁文件"""
+        crawler = ProcessLockManager(ProcessType.CRAWLER)
+        assert crawler.acquire_lock() is True
+        try:
+            def fail_open(*args, **kwargs):
+                raise AssertionError("不应访问锁文件")
+
+            with monkeypatch.context() as m:
+                m.setattr(plm.os, "open", fail_open)
+                assert ProcessLockManager(ProcessType.ANALYZER).is_process_running(ProcessType.CRAWLER) is True
+                assert ProcessLockManager(ProcessType.CRAWLER).is_process_running(ProcessType.CRAWLER) is False
+                assert ProcessLockManager(ProcessType.ANALYZER).acquire_lock() is False
+        finally:
+            crawler.release_lock()
+        assert ProcessType.CRAWLER not in ProcessLockManager._LOCKED_TYPES
+
+    def test_probe_fd_reused_until_file_replaced(self, lock_dir):
+        """测试探测描述符跨调用复用，锁文件被删除重建后重新打开"""
+        path = _lock_path(lock_dir, ProcessType.CRAWLER)
+        prober = ProcessLockManager(ProcessType.WEB_SERVER)
+
+        # 以独立描述符模拟其他进程持有排他锁
+        holder_fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(holder_fd, fcntl.LOCK_EX)
+        try:
+            assert prober.is_process_running(ProcessType.CRAWLER) is True
+            fd = ProcessLockManager._probe_fds[path][0]
+            assert prober.is_process_running(ProcessType.CRAWLER) is True
+            assert ProcessLockManager._probe_fds[path][0] == fd
+        finally:
+            os.close(holder_fd)
+        assert prober.is_process_running(ProcessType.CRAWLER) is False
+
+        assert ProcessLockManager.force_clear_lock_by_type(ProcessType.CRAWLER) is True
+        assert prober.is_process_running(ProcessType.CRAWLER) is False
+        assert path not in ProcessLockManager._probe_fds
+
+        holder_fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(holder_fd, fcntl.LOCK_EX)
+        try:
+            assert prober.is_process_running(ProcessType.CRAWLER) is True
+        finally:
+            os.close(holder_fd)
+
+class TestGetInstance:
+    """测试单例获取"""
+
+    def test_concurrent_get_instance_returns_single_instance(self):
+        """测试并发获取同一类型时只创建一个实例"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            instances = list(executor.map(lambda _: ProcessLockManager.get_instance(ProcessType.CRAWLER), range(32)))
+
+        assert all(instance is instances[0] for instance in instances)
+        assert ProcessLockManager.get_instance(ProcessType.ANALYZER) is not instances[0]
+
+class TestPidAlive:
+    """测试进程存活检测"""
+
+    def test_current_process_is_alive(self):
+        assert plm._pid_alive(os.getpid()) is True
+
+    def test_zombie_and_reaped_child_are_not_alive(self):
+        """测试已退出未回收（僵尸）与已回收的子进程均视为不存活"""
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0)
+        try:
+            deadline = time.time() + 5
+            while plm._pid_alive(pid) and time.time() < deadline:
+                time.sleep(0.01)
+            assert plm._pid_alive(pid) is False
+        finally:
+            os.waitpid(pid, 0)
+        assert plm._pid_alive(pid) is False
@@ -58,6 +58,7 @@ class TestTaskManagement:
         
         task = data_layer.get_task_by_id(task_id)
         assert task["task_status"] == "completed"
+        assert datetime.fromisoformat(task["completed_at"]).date() == datetime.now().date()
     
     def test_update_task_with_error(self, data_layer):
         """测试更新任务错误信息"""
@@ -108,6 +109,53 @@ class TestTaskManagement:
         # fail_count 在 task_result JSON 中
         assert task["task_result"]["fail_count"] == 3
     
+    def test_increment_task_progress_auto_completes(self, data_layer):
+        """测试计数达到总数时自动标记完成"""
+        task_id = str(uuid.uuid4())
+        data_layer.create_analysis_task({"task_id": task_id, "total_count": 2})
+        
+        data_layer.increment_task_progress(task_id, success=True)
+        task = data_layer.get_task_by_id(task_id)
+        assert task["task_status"] == "running"
+        assert task["completed_at"] is None
+        
+        data_layer.increment_task_progress(task_id, success=False, error_msg="boom")
+        task = data_layer.get_task_by_id(task_id)
+        assert task["task_status"] == "completed"
+        assert task["completed_at"] is not None
+        assert task["task_result"]["completed_count"] == 2
+        assert task["task_result"]["errors"] == ["boom"]
+
+    def test_update_task_status_with_full_progress_keeps_status(self, data_layer):
+        """测试直接写入满额进度不会自动标记完成"""
+        task_id = str(uuid.uuid4())
+        data_layer.create_analysis_task({"task_id": task_id, "total_count": 2})
+
+        data_layer.update_task_status(task_id, "running", progress={
+            "total_count": 2, "completed_count": 2, "success_count": 2, "fail_count": 0
+        })
+        task = data_layer.get_task_by_id(task_id)
+        assert task["task_status"] == "running"
+        assert task["completed_at"] is None
+        assert task["task_result"]["completed_count"] == 2
+
+    def test_increment_task_progress_keeps_last_100_errors(self, data_layer):
+        """测试错误列表仅保留最近 100 条"""
+        task_id = str(uuid.uuid4())
+        data_layer.create_analysis_task({"task_id": task_id, "total_count": 500})
+        
+        for i in range(105):
+            data_layer.increment_task_progress(task_id, success=False, error_msg=f"e{i}")
+        
+        errors = data_layer.get_task_by_id(task_id)["task_result"]["errors"]
+        assert len(errors) == 100
+        assert errors[0] == "e5"
+        assert errors[-1] == "e104"
+    
+    def test_increment_missing_task_returns_false(self, data_layer):
+        """测试不存在的任务返回 False"""
+        assert data_layer.increment_task_progress("missing-task", success=True) is False
+    
     def test_list_tasks_paginated(self, data_layer):
         """测试分页查询任务"""
         # 创建多个任务
@@ -147,3 +195,47 @@ class TestTaskManagement:
         """测试获取不存在的任务"""
         task = data_layer.get_task_by_id("nonexistent-task-id")
         assert task is None
+    
+    def test_list_tasks_returns_summary_fields(self, data_layer):
+        """测试任务列表返回摘要字段与总数"""
+        for i in range(3):
+            data_layer.create_analysis_task({"task_id": f"summary-{i}", "total_count": 7})
+        data_layer.increment_task_progress("summary-0", success=True)
+        
+        tasks = data_layer.list_tasks_paginated(limit=2, offset=0)
+        assert len(tasks) == 2
+        assert "task_result" not in tasks[0]
+        assert tasks[0]["total_rows"] == 3
+        assert tasks[0]["total_count"] == 7
+        
+        by_id = {t["task_id"]: t for t in data_layer.list_tasks_paginated(limit=10)}
+        assert by_id["summary-0"]["completed_count"] == 1
+        assert by_id["summary-0"]["success_count"] == 1
+    
+    def test_count_tasks_matches_list_filters(self, data_layer):
+        """测试任务计数与列表查询的过滤条件一致"""
+        for i in range(3):
+            data_layer.create_analysis_task({"task_id": f"count-{i}", "total_count": 1})
+        data_layer.update_task_status("count-0", "running")
+        
+        assert data_layer.count_tasks() == 3
+        assert data_layer.count_tasks(status="queued") == 2
+        assert data_layer.count_tasks(status="failed") == 0
+    
+    def test_get_task_detail_parses_task_result(self, data_layer):
+        """测试获取任务完整记录"""
+        data_layer.create_analysis_task({"task_id": "detail-1", "total_count": 5})
+        task = data_layer.get_task_detail("detail-1")
+        assert task["task_result"]["total_count"] == 5
+        assert data_layer.get_task_detail("missing") is None
+    
+    def test_list_tasks_query_uses_list_index(self, data_layer):
+        """测试按状态过滤的任务列表查询命中 idx_atasks_list"""
+        from src.storage.database.tasks_repository import _LIST_TASKS_BY_STATUS_SQL
+        
+        with data_layer._get_connection() as conn:
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN " + _LIST_TASKS_BY_STATUS_SQL, ("queued", 10, 0)
+            ).fetchall()
+        details = " ".join(row[3] for row in plan)
+        assert "idx_atasks_list" in details
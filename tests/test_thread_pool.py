@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试线程池与API频率限制器
+"""
+
+import time
+import logging
+import os
+import subprocess
+import sys
+import threading
+import pytest
+
+from src.utils.threading.thread_pool import AdaptiveThreadPool, PreciseRateLimiter, Colors, log_yellow, log_red
+
+
+def test_color_log_helpers_prefix_message(caplog):
+    """测试带颜色的日志辅助函数输出完整前缀，消息中的 % 不被当作格式符"""
+    with caplog.at_level(logging.INFO, logger="src.utils.threading.thread_pool"):
+        log_yellow("进度 100%")
+        log_red("失败 %s")
+
+    assert [record.getMessage() for record in caplog.records] == [
+        f"{Colors.YELLOW}[ThreadPool] 进度 100%{Colors.RESET}",
+        f"{Colors.RED}[ThreadPool] 失败 %s{Colors.RESET}",
+    ]
+
+
+class TestPreciseRateLimiter:
+    """测试精确API频率限制器"""
+
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            PreciseRateLimiter(0, 60)
+        with pytest.raises(ValueError):
+            PreciseRateLimiter(1, 0)
+
+    def test_admits_up_to_max_calls_without_waiting(self):
+        limiter = PreciseRateLimiter(3, 60)
+
+        assert [limiter.wait() for _ in range(3)] == [0, 0, 0]
+        assert limiter.get_available_slots() == 0
+        assert limiter.get_current_usage_ratio() == 1.0
+
+    def test_expired_calls_are_evicted(self):
+        """测试窗口外的调用记录被移除"""
+        limiter = PreciseRateLimiter(2, 60)
+        now_ns = time.monotonic_ns()
+        limiter.call_timestamps.extend([now_ns - 120 * 10**9, now_ns - 61 * 10**9])
+        limiter.record_api_call()
+
+        assert limiter.get_available_slots() == 1
+        assert len(limiter.call_timestamps) == 1
+        assert limiter.wait() == 0
+        assert limiter.get_current_usage_ratio() == 1.0
+
+    def test_waits_until_oldest_call_leaves_window(self):
+        """测试窗口已满时等待到最早的调用移出窗口"""
+        limiter = PreciseRateLimiter(1, 60)
+        limiter.call_timestamps.append(time.monotonic_ns() - 59_800_000_000)
+
+        started = time.monotonic()
+        waited = limiter.wait()
+
+        assert 0 < waited <= 0.2
+        assert time.monotonic() - started >= waited - 0.01
+        assert limiter.get_available_slots() == 0
+
+    def test_concurrent_waiters_reserve_successive_slots(self):
+        """测试并发等待者依次预定名额，不会在同一时刻被一起放行"""
+        limiter = PreciseRateLimiter(1, 1)
+        assert limiter.wait() == 0
+
+        waits = []
+        threads = [threading.Thread(target=lambda: waits.append(limiter.wait())) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(round(w) for w in waits) == [1, 2]
+        assert len(limiter.call_timestamps) == 3
+        assert all(isinstance(ts, int) for ts in limiter.call_timestamps)
+
+
+class TestAdaptiveThreadPool:
+    """测试自适应线程池"""
+
+    def _make_pool(self, **kwargs):
+        options = dict(api_rate_limit=600, initial_threads=2, max_threads=4, monitor_interval=0, shutdown_join_timeout=5)
+        options.update(kwargs)
+        return AdaptiveThreadPool(**options)
+
+    def test_runs_tasks_and_collects_results(self):
+        pool = self._make_pool()
+        pool.start()
+        for i in range(20):
+            assert pool.add_task(lambda x: x * 2, i, task_meta={'identifier': f'task-{i}'}) is True
+        pool.shutdown(wait=True)
+
+        assert sorted(pool.get_results()) == [i * 2 for i in range(20)]
+        # 各工作线程分别计数，下标 0 只用于进程模式
+        assert sum(pool._completed) == 20
+        assert pool._completed[0] == 0
+        assert pool.active_threads_count == 0
+        assert pool.task_queue.empty()
+
+    def test_failed_task_does_not_stop_worker(self):
+        def flaky(x):
+            if x == 0:
+                raise RuntimeError("boom")
+            return x
+
+        pool = self._make_pool(initial_threads=1, max_threads=1)
+        pool.start()
+        for i in range(3):
+            pool.add_task(flaky, i)
+        pool.shutdown(wait=True)
+
+        assert sorted(pool.get_results()) == [1, 2]
+
+    def test_add_task_rejected_when_inactive(self):
+        pool = self._make_pool()
+        assert pool.add_task(lambda: None) is False
+
+    def test_idle_pool_shuts_down_promptly(self):
+        """测试空闲线程池关闭时工作线程被关闭信号立即唤醒"""
+        pool = self._make_pool(initial_threads=3)
+        pool.start()
+
+        started = time.monotonic()
+        pool.shutdown(wait=True)
+
+        assert time.monotonic() - started < 0.5
+        assert pool.active_threads_count == 0
+
+    def test_pending_counter_tracks_queue(self):
+        """测试待处理任务计数随入队、取出与关闭时清理同步变化"""
+        gate = threading.Event()
+        ran = []
+        pool = self._make_pool(initial_threads=1, max_threads=1, shutdown_join_timeout=0.1)
+        pool.start()
+        pool.add_task(gate.wait)
+        for i in range(3):
+            pool.add_task(ran.append, i)
+
+        deadline = time.monotonic() + 2
+        while pool._pending != 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert pool._pending == 3
+        assert pool.tasks_submitted_this_activation == 4
+
+        workers = list(pool.worker_threads)
+        pool.shutdown(wait=False)
+        gate.set()
+        for thread in workers:
+            thread.join(timeout=2)
+        # 无论任务仍在队列中还是已被工作线程批量取出，都不会再执行
+        assert ran == []
+        assert pool._pending == 0
+
+    def test_worker_takes_batches_only_from_deep_backlog(self):
+        """测试积压远多于工作线程时按批取任务，且所有任务都被执行"""
+        gate = threading.Event()
+        pool = self._make_pool(initial_threads=1, max_threads=1)
+        pool.start()
+        pool.add_task(gate.wait)
+        pool.add_tasks([(pow, (i, 2), {}, None) for i in range(20)])
+        gate.set()
+        pool.shutdown(wait=True)
+
+        assert sorted(r for r in pool.get_results() if r is not True) == [i * i for i in range(20)]
+        assert pool._pending == 0
+
+    def test_per_task_logs_are_debug_level(self, caplog):
+        """测试每个任务的入队/执行日志为 DEBUG 级别，INFO 级别下不输出"""
+        pool = self._make_pool(initial_threads=1, max_threads=1)
+        pool.start()
+        with caplog.at_level(logging.INFO, logger="src.utils.threading.thread_pool"):
+            pool.add_task(lambda: None, task_meta={'identifier': 'quiet-task'})
+            pool.shutdown(wait=True)
+
+        assert not any('quiet-task' in record.getMessage() for record in caplog.records)
+        assert any('线程池开始关闭流程' in record.getMessage() for record in caplog.records)
+
+    def test_worker_records_cleared_on_shutdown(self):
+        """测试工作线程记录在启动时登记、关闭后全部移除"""
+        pool = self._make_pool(initial_threads=3)
+        pool.start()
+        assert len(pool.worker_threads) == 3
+        assert sorted(pool.thread_ids[t] for t in pool.worker_threads) == [1, 2, 3]
+
+        pool.shutdown(wait=True)
+        assert not pool.worker_threads
+        assert not pool.thread_ids
+
+    def test_shutdown_without_wait_wakes_idle_and_busy_workers(self):
+        """测试不等待关闭换用新队列后，阻塞在旧队列上的空闲线程和忙碌线程都能退出"""
+        gate = threading.Event()
+        pool = self._make_pool(initial_threads=2, max_threads=2, shutdown_join_timeout=0.1)
+        pool.start()
+        pool.add_task(gate.wait)
+        time.sleep(0.05)
+
+        workers = list(pool.worker_threads)
+        pool.shutdown(wait=False)
+        deadline = time.monotonic() + 2
+        while sum(t.is_alive() for t in workers) > 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert sum(t.is_alive() for t in workers) == 1
+
+        gate.set()
+        for thread in workers:
+            thread.join(timeout=2)
+        assert not any(t.is_alive() for t in workers)
+
+    def test_monitor_only_reports_after_activity(self, caplog):
+        """测试监控线程在空闲时不输出摘要，有任务完成后才输出"""
+        pool = self._make_pool(initial_threads=1, max_threads=1, monitor_interval=0.05)
+        with caplog.at_level(logging.DEBUG, logger="src.utils.threading.thread_pool"):
+            pool.start()
+            time.sleep(0.2)
+            assert not any('周期性摘要' in record.getMessage() for record in caplog.records)
+
+            pool.add_task(lambda: None)
+            time.sleep(0.2)
+            pool.shutdown(wait=True)
+
+        summaries = [record for record in caplog.records if '周期性摘要' in record.getMessage()]
+        assert 1 <= len(summaries) <= 2
+
+    def test_latency_ewma_tracks_wait_and_service_time(self):
+        pool = self._make_pool(initial_threads=1, max_threads=1)
+        pool.start()
+        pool.add_task(time.sleep, 0.05)
+        pool.add_task(time.sleep, 0.05)
+        pool.shutdown(wait=True)
+
+        metrics = pool.performance_metrics
+        assert metrics['ewma_service_ms'] >= 45
+        # 第二个任务排队等待了第一个任务的执行时间
+        assert metrics['ewma_wait_ms'] > 1
+
+    def test_scales_out_on_backlog_and_retires_idle_workers(self):
+        """测试积压时扩容，队列清空且排队时间接近 0 后逐个缩容到 min_threads"""
+        pool = self._make_pool(initial_threads=1, max_threads=4, min_threads=2)
+        pool.SCALE_COOLDOWN_SECONDS = 0
+        pool.start()
+        for _ in range(8):
+            pool.add_task(time.sleep, 0.05)
+        assert pool.active_threads_count == 4
+
+        deadline = time.monotonic() + 3
+        while pool._pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # 清空积压后排队时间的 EWMA 需要一些快速任务才能回落
+        while pool.active_threads_count > 2 and time.monotonic() < deadline:
+            pool.add_task(lambda: None)
+            time.sleep(0.01)
+        assert pool.active_threads_count == 2
+        assert pool.current_threads_target == 2
+
+        pool.shutdown(wait=True)
+        assert pool.active_threads_count == 0
+
+    def test_add_tasks_submits_batch_with_one_adjustment(self, monkeypatch):
+        """测试批量添加任务只调整一次线程数，任务名称取自 task_meta"""
+        pool = self._make_pool()
+        pool.start()
+        adjustments = []
+        original_adjust = pool._adjust_thread_count
+        # 工作线程清空队列时也会检查缩容，这里只统计提交线程上的调整
+        monkeypatch.setattr(pool, '_adjust_thread_count',
+                            lambda: adjustments.append(threading.current_thread()) or original_adjust())
+
+        batch = [(pow, (i, 2), {}, {'identifier': f'square-{i}'} if i % 2 else None) for i in range(10)]
+        assert pool.add_tasks(batch) is True
+        assert pool.add_tasks([]) is True
+        assert pool.tasks_submitted_this_activation == 10
+        assert adjustments.count(threading.main_thread()) == 1
+
+        pool.shutdown(wait=True)
+        assert sorted(pool.get_results()) == [i * i for i in range(10)]
+        assert pool.add_tasks(batch) is False
+
+    def test_thread_ids_are_reused_across_restarts(self):
+        """测试线程编号在线程退出后被复用，任务信息表大小保持为 max_threads"""
+        pool = self._make_pool(initial_threads=2, max_threads=3)
+        for _ in range(2):
+            pool.start()
+            assert sorted(pool.thread_ids.values()) == [1, 2]
+            pool.add_task(lambda: None)
+            pool.shutdown(wait=True)
+
+        assert pool.thread_task_info == [None, None, None]
+
+    def test_unclosed_pool_does_not_block_interpreter_exit(self):
+        """测试未调用 shutdown 时解释器仍能正常退出（工作线程为守护线程）"""
+        code = (
+            "from src.utils.threading.thread_pool import AdaptiveThreadPool\n"
+            "pool = AdaptiveThreadPool(api_rate_limit=600, initial_threads=2, monitor_interval=0)\n"
+            "pool.start()\n"
+            "pool.add_task(print, 'done')\n"
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        completed = subprocess.run([sys.executable, "-c", code], cwd=root, timeout=10,
+                                   capture_output=True, text=True)
+
+        assert completed.returncode == 0